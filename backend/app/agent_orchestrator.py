@@ -30,6 +30,8 @@ from typing import List, Dict, Any, Optional, Tuple
 from enum import Enum
 
 from .models import ProductResult, PlatformType
+from .outbound import Flow, begin_flow, join_flow
+from .tracing import span
 
 
 # ============================================================
@@ -56,6 +58,7 @@ class AgentLog:
         self.products_found: int = 0
         self.error: Optional[str] = None
         self.data_source: str = "live"  # "live", "cache", "synthetic"
+        self.queue_wait_ms: Optional[float] = None  # time queued for outbound slots
 
     def start(self):
         self.status = AgentStatus.RUNNING
@@ -87,6 +90,7 @@ class AgentLog:
             "products_found": self.products_found,
             "data_source": self.data_source,
             "error": self.error,
+            "queue_wait_ms": self.queue_wait_ms,
         }
 
 
@@ -287,12 +291,15 @@ class OrchestratorAgent:
     """
     Master agent that coordinates all sourcing agents, runs them in parallel,
     and passes results through the normalizer for NLP matching.
+    Scrapes run under `flow` when given (a batch shares one across its items),
+    else under a new flow for this search.
     """
 
-    def __init__(self, query: str, pincode: str, country: str):
+    def __init__(self, query: str, pincode: str, country: str, flow: Optional[Flow] = None):
         self.query = query
         self.pincode = pincode
         self.country = country
+        self.flow = flow
         self.agent_logs: List[AgentLog] = []
         self.normalizer = NormalizerAgent()
         self.started_at = time.time()
@@ -316,13 +323,16 @@ class OrchestratorAgent:
         # --- Phase 1: Sourcing Agents (parallel) ---
         scrape_log = AgentLog("ScrapingOrchestrator", "primary")
         scrape_log.start()
+        flow = join_flow(self.flow) if self.flow is not None else begin_flow(f"search:{self.query}")
 
         try:
-            products = await scrape_fn(self.query, self.pincode, country_enum)
+            with span("scrape"):
+                products = await scrape_fn(self.query, self.pincode, country_enum)
             scrape_log.succeed(len(products), "live")
         except Exception as e:
             products = []
             scrape_log.fail(str(e))
+        scrape_log.queue_wait_ms = flow.queue_wait_ms
 
         self.agent_logs.append(scrape_log)
 
@@ -342,9 +352,10 @@ class OrchestratorAgent:
                     mid = len(prices) // 2
                     reference_price = prices[mid] if len(prices) % 2 == 1 else (prices[mid - 1] + prices[mid]) / 2
 
-            qc_products = quick_commerce_fn(
-                self.query, self.pincode, country_enum, reference_price=reference_price
-            )
+            with span("quick_commerce"):
+                qc_products = quick_commerce_fn(
+                    self.query, self.pincode, country_enum, reference_price=reference_price
+                )
             products.extend(qc_products)
             qc_log.succeed(len(qc_products), "synthetic")
         except Exception as e:
@@ -357,7 +368,8 @@ class OrchestratorAgent:
         self.total_products = len(products)
 
         # --- Phase 4: NormalizerAgent ---
-        products = self.normalizer.normalize(products)
+        with span("normalize"):
+            products = self.normalizer.normalize(products)
         self.agent_logs.append(self.normalizer.log)
 
         # --- Build telemetry report ---
@@ -366,6 +378,21 @@ class OrchestratorAgent:
 
         return products, telemetry
 
+    def serve_cached(self, products: List[ProductResult]) -> Tuple[List[ProductResult], Dict]:
+        """Report a cache hit (L1 or shared L2) through the same telemetry shape."""
+        global _last_orchestration
+
+        cache_log = AgentLog("CacheAgent", "cache")
+        cache_log.start()
+        cache_log.succeed(len(products), "cache")
+        cache_log.status = AgentStatus.CACHED
+        self.agent_logs.append(cache_log)
+        self.total_products = len(products)
+
+        telemetry = self._build_telemetry()
+        _last_orchestration = telemetry
+        return products, telemetry
+
     def _build_telemetry(self) -> Dict:
         """Build the agent telemetry report."""
         total_time = round((time.time() - self.started_at) * 1000, 1)
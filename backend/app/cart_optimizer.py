@@ -9,6 +9,7 @@ from .scrapers import (
     enrich_results_with_unit_price, calculate_dynamic_fees
 )
 from .matcher import find_best_match
+from .outbound import begin_flow
 
 async def fetch_results_for_query(query: str, pincode: str, country: CountryCode) -> List[ProductResult]:
     # Parallel fetch: Scrape Real Platforms + Mock Quick Commerce
@@ -24,7 +25,9 @@ async def fetch_results_for_query(query: str, pincode: str, country: CountryCode
     return enrich_results_with_unit_price(all_results)
 
 async def optimize_cart(queries: List[str], pincode: str, country: CountryCode) -> CartOptimizationResponse:
-    # 1. Fetch all data in parallel
+    # 1. Fetch all data in parallel (one outbound flow for the whole cart, so
+    #    its 12 x items scrapes queue fairly against concurrent searches)
+    begin_flow(f"cart:{len(queries)}")
     tasks = [fetch_results_for_query(q, pincode, country) for q in queries]
     all_results_list = await asyncio.gather(*tasks) # List of List[ProductResult]
     
@@ -0,0 +1,244 @@
+"""
+Response Compression — brotli / gzip for the large JSON endpoints
+A /search response with insights is tens to hundreds of KB of highly
+repetitive JSON; it compresses 8-15x. CompressionMiddleware encodes the
+responses of COMPRESSED_PATHS according to the client's Accept-Encoding:
+
+  - brotli (if the optional `brotli` package is installed), then gzip
+  - bodies under COMPRESSION_MIN_BYTES are sent as-is (not worth the CPU)
+  - streamed responses and responses that are already encoded pass through
+
+/search bodies are never byte-identical: system health, the trace, the
+persona and reorder suggestions change with every request. Their cacheable
+part (one page of a result set) is therefore compressed once and kept with
+the result set as a GzipPrefix — a gzip stream cut at a byte-aligned sync
+flush — and each response splices the small per-request tail onto it.
+Such responses arrive here already encoded and pass through untouched.
+
+For the other paths (CACHED_PATHS), encoded variants are kept in a small
+content-addressed cache (sha1 of the body -> {encoding: bytes}), so a body
+that is served again — a client retry, the same cart — is never recompressed.
+
+Configuration (environment):
+  COMPRESSION_MIN_BYTES       smallest body worth compressing  (1024)
+  COMPRESSION_CACHE_MB        encoded-variant cache size       (32)
+"""
+
+import gzip
+import hashlib
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+
+COMPRESSED_PATHS = ("/search", "/insights", "/cart/optimize")
+# Paths whose bodies repeat byte for byte, so caching encoded variants pays off
+CACHED_PATHS = ("/insights", "/cart/optimize")
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # dynamic content: q5 is ~gzip-9 size at gzip-6 speed
+
+
+def supported_encodings() -> List[str]:
+    """Server preference order."""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def accept_weights(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept / Accept-Encoding header into {token: q}."""
+    weights: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token:
+            weights[token] = q
+    return weights
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best encoding the client accepts (q-values honoured), or None."""
+    if not accept_encoding:
+        return None
+    weights = accept_weights(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+# Fixed gzip member header: deflate, no name, no mtime, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def _raw_deflater():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+
+class GzipPrefix:
+    """
+    The start of a body, compressed once. The deflate stream ends on a sync
+    flush (byte-aligned, not final), so any tail compressed later with a fresh
+    deflater can follow it; the gzip trailer's CRC-32 continues from the
+    prefix's, so the tail is the only new input ever read.
+    """
+
+    __slots__ = ("deflated", "crc", "size")
+
+    def __init__(self, data: bytes):
+        deflater = _raw_deflater()
+        self.deflated = deflater.compress(data) + deflater.flush(zlib.Z_SYNC_FLUSH)
+        self.crc = zlib.crc32(data)
+        self.size = len(data)
+
+    def finish(self, tail: bytes) -> bytes:
+        """A complete gzip body: this prefix followed by `tail`."""
+        deflater = _raw_deflater()
+        return b"".join((
+            _GZIP_HEADER,
+            self.deflated,
+            deflater.compress(tail) + deflater.flush(zlib.Z_FINISH),
+            struct.pack("<II", zlib.crc32(tail, self.crc), (self.size + len(tail)) & 0xFFFFFFFF),
+        ))
+
+
+class EncodedBodyCache:
+    """LRU of compressed variants keyed by the identity body's digest."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "uncached": 0, "spliced": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def encode_uncached(self, body: bytes, encoding: str) -> bytes:
+        """Compress a body that will not be served again (nothing to look up or keep)."""
+        encoded = compress(body, encoding)
+        self.stats["uncached"] += 1
+        self.stats["bytes_in"] += len(body)
+        self.stats["bytes_out"] += len(encoded)
+        return encoded
+
+    def record_spliced(self, prefix: GzipPrefix, tail: bytes, encoded: bytes):
+        """Account for a body built by GzipPrefix.finish (see perform_search)."""
+        self.stats["spliced"] += 1
+        self.stats["bytes_in"] += prefix.size + len(tail)
+        self.stats["bytes_out"] += len(encoded)
+
+    def encode(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.sha1(body).hexdigest(), encoding)
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        else:
+            encoded = compress(body, encoding)
+            self.stats["misses"] += 1
+            self._entries[key] = encoded
+            self._bytes += len(encoded)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        self.stats["bytes_in"] += len(body)
+        self.stats["bytes_out"] += len(encoded)
+        return encoded
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "encodings": supported_encodings(),
+            "ratio": round(self.stats["bytes_in"] / self.stats["bytes_out"], 2)
+            if self.stats["bytes_out"] else None,
+            "cached_variants": len(self._entries),
+            "cache_bytes": self._bytes,
+        }
+
+
+# Global instance
+encoded_body_cache = EncodedBodyCache(int(os.environ.get("COMPRESSION_CACHE_MB", 32)) * 1024 * 1024)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: buffers single-message bodies and encodes them."""
+
+    def __init__(self, app, paths=COMPRESSED_PATHS, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 cached_paths=CACHED_PATHS):
+        self.app = app
+        # Exact paths: /search/batch streams and must not be buffered like /search
+        self.paths = frozenset(paths)
+        self.minimum_size = minimum_size
+        self.cached_paths = frozenset(cached_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        cache_variants = scope["path"] in self.cached_paths
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if start_message is not None:
+                response_headers = start_message.get("headers") or []
+                body = message.get("body", b"")
+                already_encoded = any(k.lower() == b"content-encoding" for k, _ in response_headers)
+                if message.get("more_body") or already_encoded or len(body) < self.minimum_size:
+                    # Streamed, pre-encoded or tiny: send untouched
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                if cache_variants:
+                    encoded = encoded_body_cache.encode(body, encoding)
+                else:
+                    encoded = encoded_body_cache.encode_uncached(body, encoding)
+                vary = [v for k, v in response_headers if k.lower() == b"vary"] + [b"Accept-Encoding"]
+                response_headers = [
+                    (k, v) for k, v in response_headers
+                    if k.lower() not in (b"content-length", b"vary")
+                ] + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(encoded)).encode()),
+                    (b"vary", b", ".join(vary)),
+                ]
+                await send({**start_message, "headers": response_headers})
+                start_message = None
+                await send({"type": "http.response.body", "body": encoded})
+
+        await self.app(scope, receive, send_wrapper)
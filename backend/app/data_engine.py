@@ -12,8 +12,9 @@ Architecture:
   │          HybridDataEngine                │
   │  ┌─────────────┐  ┌──────────────────┐   │
   │  │ LiveScraper  │  │  PriceCache      │   │
-  │  │ (Primary)    │──│  (Redis-like)    │   │
-  │  └──────┬───────┘  └───────┬──────────┘   │
+  │  │ (Primary)    │──│  L1 dict + L2    │   │
+  │  └──────┬───────┘  │  SharedStore     │   │
+  │         │          └───────┬──────────┘   │
   │         │                  │              │
   │  ┌──────▼──────────────────▼──────────┐   │
   │  │        CircuitBreaker              │   │
@@ -31,57 +32,159 @@ import hashlib
 import json
 import asyncio
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
 
-from .models import ProductResult, PlatformType
+from .models import ProductResult, PlatformType, CountryCode
+from .shared_store import SharedStore, shared_store, schedule_write
+from .zones import result_zone, platform_zone
+from .latency import LatencyRegistry
+from .metrics import metrics_registry
+from .matcher import canonicalize_query
 
 
 # ============================================================
-# IN-MEMORY PRICE CACHE (simulates Redis)
+# TWO-TIER PRICE CACHE (L1 in-process dict, L2 shared store)
 # ============================================================
 
+# Per-platform freshness: quick-commerce stock moves in minutes,
+# marketplace and fashion catalogs in hours
+PLATFORM_TTL_SECONDS: Dict[PlatformType, int] = {
+    PlatformType.BLINKIT: 180,
+    PlatformType.ZEPTO: 180,
+    PlatformType.SWIGGY_INSTAMART: 180,
+    PlatformType.BIGBASKET: 600,
+    PlatformType.JIOMART: 600,
+    PlatformType.AMAZON_IN: 900,
+    PlatformType.FLIPKART: 900,
+    PlatformType.MEESHO: 1800,
+    PlatformType.NYKAA: 1800,
+    PlatformType.TATA_CLIQ: 1800,
+    PlatformType.MYNTRA: 3600,
+    PlatformType.AJIO: 3600,
+}
+DEFAULT_PLATFORM_TTL = 300
+MAX_PLATFORM_ENTRIES = 50_000
+# Merged result sets are full product dumps (tens of KB each): keep fewer
+MAX_RESULT_ENTRIES = 2_000
+
+# Negative entries: how long to stop asking a platform for a query it failed,
+# by reason. "empty" means the platform does not carry it; transient failures
+# are retried sooner.
+NEGATIVE_TTL_SECONDS = {
+    "empty": 600,
+    "parse_error": 300,
+    "blocked": 120,
+    "timeout": 60,
+}
+
+
 class PriceCache:
     """
-    In-memory price store that simulates Redis for hackathon demos.
+    Two-tier price store. L1 is the in-process dict (nanosecond hits, one per
+    worker); L2 is the optional SharedStore every worker reads and writes, so
+    the fleet shares one warm cache instead of N cold ones.
+    Holds the merged result set per (query, zone) and, underneath it, each
+    platform's live scrape with its own TTL so a refresh only re-scrapes the
+    platforms that actually went stale.
     Stores historical prices per product for trend analysis.
     TTL-based expiry ensures freshness.
     """
 
-    def __init__(self, ttl_seconds: int = 300):
+    L2_PREFIX = "px:cache:"
+    L2_PLATFORM_PREFIX = "px:platform:"
+
+    def __init__(self, ttl_seconds: int = 300, l2: Optional[SharedStore] = None):
         self._store: Dict[str, Dict] = {}
+        self._platform_store: Dict[str, Dict] = {}
+        self._platform_hits = 0
+        self._platform_misses = 0
+        self._negative_hits = 0
         self._history: Dict[str, List[Dict]] = defaultdict(list)
         self._ttl = ttl_seconds
-
-    def _make_key(self, query: str, pincode: str) -> str:
-        raw = f"{query.lower().strip()}:{pincode.strip()}"
+        self._l2 = l2
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+        self._evictions = {"results": 0, "platforms": 0}
+        # Encoded size of every L1 entry, per store
+        self._sizes: Dict[str, int] = {}
+        self._bytes = {"results": 0, "platforms": 0}
+
+    def _make_key(self, query: str, pincode: str, country: CountryCode = CountryCode.IN) -> str:
+        # Keyed by canonical query and delivery zone, not the raw spelling and
+        # exact pincode: everything that would scrape the same results shares one entry
+        raw = f"{canonicalize_query(query)}:{result_zone(pincode, country)}"
         return hashlib.md5(raw.encode()).hexdigest()
 
-    def get(self, query: str, pincode: str) -> Optional[List[Dict]]:
-        """Retrieve cached results if still fresh."""
-        key = self._make_key(query, pincode)
+    def _fresh(self, entry: Optional[Dict], ttl: Optional[float] = None) -> bool:
+        return bool(entry) and (time.time() - entry["timestamp"]) < (ttl or self._ttl)
+
+    def get(self, query: str, pincode: str, country: CountryCode = CountryCode.IN) -> Optional[List[Dict]]:
+        """Retrieve cached results from L1 if still fresh."""
+        key = self._make_key(query, pincode, country)
         entry = self._store.get(key)
-        if entry and (time.time() - entry["timestamp"]) < self._ttl:
+        if self._fresh(entry):
             return entry["data"]
         return None
 
-    def put(self, query: str, pincode: str, products: List[ProductResult]):
-        """Cache search results and track price history."""
-        key = self._make_key(query, pincode)
+    async def fetch(self, query: str, pincode: str, country: CountryCode = CountryCode.IN) -> Optional[List[Dict]]:
+        """Read-through lookup: L1, then L2 (promoting L2 hits into L1)."""
+        key = self._make_key(query, pincode, country)
+        entry = self._store.get(key)
+        if self._fresh(entry):
+            self._l1_hits += 1
+            return entry["data"]
 
-        product_dicts = [{
-            "id": p.id,
-            "platform": p.platform.value if hasattr(p.platform, 'value') else str(p.platform),
-            "title": p.title,
-            "price": p.price_breakdown.total_landed_cost,
-            "eta_minutes": p.eta_minutes,
-        } for p in products]
+        if self._l2 is not None:
+            raw = await self._l2.get(self.L2_PREFIX + key)
+            if raw:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    entry = None
+                if self._fresh(entry):
+                    self._place("results", key, entry, len(raw))
+                    self._l2_hits += 1
+                    return entry["data"]
+
+        self._misses += 1
+        return None
 
-        self._store[key] = {
+    async def time_to_expiry(self, query: str, pincode: str, country: CountryCode = CountryCode.IN) -> float:
+        """Seconds until the cached entry (L1, else L2) goes stale; 0 if absent."""
+        key = self._make_key(query, pincode, country)
+        entry = self._store.get(key)
+        if not self._fresh(entry) and self._l2 is not None:
+            raw = await self._l2.get(self.L2_PREFIX + key)
+            try:
+                entry = json.loads(raw) if raw else None
+            except ValueError:
+                entry = None
+            if self._fresh(entry):
+                self._place("results", key, entry, len(raw))
+        if not self._fresh(entry):
+            return 0.0
+        return self._ttl - (time.time() - entry["timestamp"])
+
+    def put(self, query: str, pincode: str, products: List[ProductResult],
+            country: CountryCode = CountryCode.IN):
+        """Cache search results (L1 now, L2 write-behind) and track price history."""
+        key = self._make_key(query, pincode, country)
+
+        # Full serialized products so any worker can rebuild ProductResult objects
+        product_dicts = [p.model_dump(mode="json") for p in products]
+
+        entry = {
             "data": product_dicts,
             "timestamp": time.time(),
             "query": query,
         }
+        encoded = json.dumps(entry, ensure_ascii=True).encode()
+        self._place("results", key, entry, len(encoded))
+
+        if self._l2 is not None:
+            schedule_write(self._l2.set(self.L2_PREFIX + key, encoded, ttl=self._ttl))
 
         # Record price history for trend analysis
         for p in products:
@@ -94,6 +197,116 @@ class PriceCache:
             # Keep last 50 data points per product
             self._history[product_key] = self._history[product_key][-50:]
 
+    # --- Per-platform layer ---
+
+    def _platform_key(self, query: str, pincode: str, platform: PlatformType) -> str:
+        raw = f"{canonicalize_query(query)}:{platform.value}:{platform_zone(pincode, platform)}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _platform_ttl(platform: PlatformType, entry: Optional[Dict]) -> float:
+        reason = entry.get("negative") if entry else None
+        if reason:
+            return NEGATIVE_TTL_SECONDS.get(reason, min(NEGATIVE_TTL_SECONDS.values()))
+        return PLATFORM_TTL_SECONDS.get(platform, DEFAULT_PLATFORM_TTL)
+
+    async def fetch_platforms(self, query: str, pincode: str, platforms: List[PlatformType],
+                              record_stats: bool = True) -> Tuple[Dict[PlatformType, List[Dict]], Dict[PlatformType, str]]:
+        """
+        Fresh per-platform entries (L1, then one L2 MGET for the rest).
+        Returns (results by platform, negative-cache reason by platform).
+        `record_stats=False` for lookups that are not searches (the pre-warmer).
+        """
+        found: Dict[PlatformType, List[Dict]] = {}
+        negative: Dict[PlatformType, str] = {}
+
+        def _take(platform: PlatformType, entry: Dict):
+            if entry.get("negative"):
+                negative[platform] = entry["negative"]
+            else:
+                found[platform] = entry["data"]
+
+        l2_wanted: Dict[str, PlatformType] = {}
+        for platform in platforms:
+            key = self._platform_key(query, pincode, platform)
+            entry = self._platform_store.get(key)
+            if self._fresh(entry, self._platform_ttl(platform, entry)):
+                _take(platform, entry)
+            else:
+                l2_wanted[key] = platform
+
+        if l2_wanted and self._l2 is not None:
+            keys = list(l2_wanted)
+            raws = await self._l2.mget([self.L2_PLATFORM_PREFIX + k for k in keys])
+            for key, raw in zip(keys, raws):
+                if not raw:
+                    continue
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                platform = l2_wanted[key]
+                if self._fresh(entry, self._platform_ttl(platform, entry)):
+                    self._place("platforms", key, entry, len(raw))
+                    _take(platform, entry)
+
+        if record_stats:
+            self._platform_hits += len(found)
+            self._negative_hits += len(negative)
+            self._platform_misses += len(platforms) - len(found) - len(negative)
+        return found, negative
+
+    async def stale_platforms(self, query: str, pincode: str,
+                              platforms: List[PlatformType]) -> List[PlatformType]:
+        """The platforms a search for this query would scrape live right now."""
+        found, negative = await self.fetch_platforms(query, pincode, platforms, record_stats=False)
+        return [p for p in platforms if p not in found and p not in negative]
+
+    def put_platform(self, query: str, pincode: str, platform: PlatformType,
+                     products: List[ProductResult]):
+        """Cache one platform's live scrape (L1 now, L2 write-behind)."""
+        self._put_platform_entry(query, pincode, platform, {
+            "data": [p.model_dump(mode="json") for p in products],
+            "timestamp": time.time(),
+            "query": query,
+        })
+
+    def put_negative(self, query: str, pincode: str, platform: PlatformType, reason: str):
+        """Remember that a platform came back empty/failed for this query (short TTL)."""
+        self._put_platform_entry(query, pincode, platform, {
+            "data": [],
+            "timestamp": time.time(),
+            "query": query,
+            "negative": reason,
+        })
+
+    def _put_platform_entry(self, query: str, pincode: str, platform: PlatformType, entry: Dict):
+        key = self._platform_key(query, pincode, platform)
+        ttl = self._platform_ttl(platform, entry)
+        encoded = json.dumps(entry, ensure_ascii=True).encode()
+        self._place("platforms", key, entry, len(encoded))
+
+        if self._l2 is not None:
+            schedule_write(self._l2.set(self.L2_PLATFORM_PREFIX + key, encoded, ttl=ttl))
+
+    def _place(self, kind: str, key: str, entry: Dict, size: int):
+        """Insert an L1 entry (newest last), evicting the oldest past the store's cap."""
+        store, limit = ((self._store, MAX_RESULT_ENTRIES) if kind == "results"
+                        else (self._platform_store, MAX_PLATFORM_ENTRIES))
+        store.pop(key, None)
+        store[key] = entry
+        self._account(kind, key, size)
+        while len(store) > limit:
+            evicted = next(iter(store))
+            del store[evicted]
+            self._bytes[kind] -= self._sizes.pop(evicted, 0)
+            self._evictions[kind] += 1
+
+    def _account(self, store: str, key: str, size: int):
+        """Track the encoded size of an L1 entry that was just (re)placed."""
+        self._bytes[store] += size - self._sizes.pop(key, 0)
+        self._sizes[key] = size
+
     def get_price_history(self, product_id: str) -> List[Dict]:
         """Get historical prices for a product (for ML predictions)."""
         return self._history.get(product_id, [])
@@ -107,6 +320,7 @@ class PriceCache:
         now = time.time()
         active = sum(1 for v in self._store.values() if (now - v["timestamp"]) < self._ttl)
         total_history_points = sum(len(v) for v in self._history.values())
+        lookups = self._l1_hits + self._l2_hits + self._misses
         return {
             "cached_queries": len(self._store),
             "active_entries": active,
@@ -114,6 +328,18 @@ class PriceCache:
             "tracked_products": len(self._history),
             "total_price_points": total_history_points,
             "ttl_seconds": self._ttl,
+            "l2_backend": self._l2.name if self._l2 is not None else None,
+            "l1_hits": self._l1_hits,
+            "l2_hits": self._l2_hits,
+            "misses": self._misses,
+            "hit_ratio": round((self._l1_hits + self._l2_hits) / lookups, 3) if lookups else 0.0,
+            "platform_entries": len(self._platform_store),
+            "platform_hits": self._platform_hits,
+            "platform_misses": self._platform_misses,
+            "negative_hits": self._negative_hits,
+            "evictions": self._evictions["results"],
+            "platform_evictions": self._evictions["platforms"],
+            "l1_bytes": dict(self._bytes),
         }
 
 
@@ -121,6 +347,12 @@ class PriceCache:
 # CIRCUIT BREAKER — Prevents cascade failures
 # ============================================================
 
+CIRCUIT_TRANSITIONS = metrics_registry.counter(
+    "circuit_transitions_total", "Circuit breaker state changes seen by this worker",
+    ("platform", "from_state", "to_state"),
+)
+
+
 class CircuitBreaker:
     """
     Tracks failure rates per platform. When a platform fails repeatedly,
@@ -128,12 +360,18 @@ class CircuitBreaker:
     After a cooldown, it enters half-open state to test recovery.
     """
 
-    def __init__(self, failure_threshold: int = 3, cooldown_seconds: int = 120):
+    L2_PREFIX = "px:circuit:"
+    STATES = ("closed", "open", "half-open")
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: int = 120,
+                 l2: Optional[SharedStore] = None):
         self._failures: Dict[str, int] = defaultdict(int)
         self._last_failure: Dict[str, float] = {}
         self._state: Dict[str, str] = defaultdict(lambda: "closed")  # closed, open, half-open
+        self._updated: Dict[str, float] = {}
         self._threshold = failure_threshold
         self._cooldown = cooldown_seconds
+        self._l2 = l2
 
     def can_proceed(self, platform: str) -> bool:
         """Check if requests to this platform should proceed."""
@@ -146,7 +384,7 @@ class CircuitBreaker:
             # Check if cooldown has passed
             elapsed = time.time() - self._last_failure.get(platform, 0)
             if elapsed >= self._cooldown:
-                self._state[platform] = "half-open"
+                self._set_state(platform, "half-open")
                 return True
             return False
 
@@ -156,7 +394,8 @@ class CircuitBreaker:
     def record_success(self, platform: str):
         """Record a successful request — resets the circuit."""
         self._failures[platform] = 0
-        self._state[platform] = "closed"
+        self._set_state(platform, "closed")
+        self._publish(platform)
 
     def record_failure(self, platform: str):
         """Record a failure — may trip the circuit."""
@@ -164,7 +403,56 @@ class CircuitBreaker:
         self._last_failure[platform] = time.time()
 
         if self._failures[platform] >= self._threshold:
-            self._state[platform] = "open"
+            self._set_state(platform, "open")
+        self._publish(platform)
+
+    def _set_state(self, platform: str, state: str):
+        previous = self._state[platform]
+        if previous != state:
+            CIRCUIT_TRANSITIONS.inc(platform, previous, state)
+            self._state[platform] = state
+
+    def states(self) -> Dict[str, str]:
+        """Current state of every platform this worker has seen."""
+        return dict(self._state)
+
+    def _publish(self, platform: str):
+        """Write-behind this worker's view of the circuit to L2."""
+        self._updated[platform] = time.time()
+        if self._l2 is None:
+            return
+        snapshot = {
+            "state": self._state[platform],
+            "failures": self._failures[platform],
+            "last_failure": self._last_failure.get(platform),
+            "updated": self._updated[platform],
+        }
+        schedule_write(self._l2.set(
+            self.L2_PREFIX + platform, json.dumps(snapshot).encode(), ttl=self._cooldown * 2
+        ))
+
+    async def sync(self, platforms: List[str]):
+        """
+        Adopt fleet-wide circuit state from L2 — the most recent update wins,
+        so a platform tripped by one worker is skipped by all of them.
+        """
+        if self._l2 is None or not platforms:
+            return
+        raws = await self._l2.mget([self.L2_PREFIX + p for p in platforms])
+        for platform, raw in zip(platforms, raws):
+            if not raw:
+                continue
+            try:
+                remote = json.loads(raw)
+            except ValueError:
+                continue
+            if remote.get("updated", 0) <= self._updated.get(platform, 0):
+                continue
+            self._set_state(platform, remote["state"])
+            self._failures[platform] = remote["failures"]
+            if remote.get("last_failure"):
+                self._last_failure[platform] = remote["last_failure"]
+            self._updated[platform] = remote["updated"]
 
     def get_status(self) -> Dict[str, Any]:
         """Get circuit breaker status for all tracked platforms."""
@@ -192,23 +480,48 @@ class SystemHealthMonitor:
     judges the reliability of the platform.
     """
 
-    def __init__(self):
+    L2_PREFIX = "px:health:"
+    FLEET_COUNTERS = ("total_searches", "live", "cached", "synthetic")
+
+    def __init__(self, l2: Optional[SharedStore] = None):
         self._platform_status: Dict[str, Dict] = {}
-        self._last_search_time_ms: Optional[float] = None
+        self.latency = LatencyRegistry()  # endpoint / scraper / phase histograms
         self._total_searches: int = 0
         self._live_hits: int = 0
         self._cache_hits: int = 0
         self._synthetic_hits: int = 0
         self._uptime_start = time.time()
+        self._l2 = l2
+        self._fleet: Dict[str, int] = {}
 
     def record_search(self, duration_ms: float, live: int, cached: int, synthetic: int):
         """Record search metrics."""
         self._total_searches += 1
-        self._last_search_time_ms = duration_ms
+        self.latency.observe("phase", "search", duration_ms)
         self._live_hits += live
         self._cache_hits += cached
         self._synthetic_hits += synthetic
 
+        if self._l2 is not None:
+            for name, amount in zip(self.FLEET_COUNTERS, (1, live, cached, synthetic)):
+                if amount:
+                    schedule_write(self._l2.incrby(self.L2_PREFIX + name, amount))
+
+    async def sync(self):
+        """Pull fleet-wide counters (summed over all workers) from L2."""
+        if self._l2 is None:
+            return
+        raws = await self._l2.mget([self.L2_PREFIX + n for n in self.FLEET_COUNTERS])
+        self._fleet = {n: int(r) if r else 0 for n, r in zip(self.FLEET_COUNTERS, raws)}
+
+    def observe(self, kind: str, name: str, duration_ms: float):
+        """Record one latency sample (see latency.LatencyRegistry for the kinds)."""
+        self.latency.observe(kind, name, duration_ms)
+
+    def get_latency(self) -> Dict:
+        """p50 / p90 / p99 / max per series over the rolling windows."""
+        return self.latency.snapshot()
+
     def record_platform_status(self, platform: str, status: str, source: str):
         """Record individual platform status."""
         self._platform_status[platform] = {
@@ -235,13 +548,15 @@ class SystemHealthMonitor:
             pulse_color = "#ef4444"
             pulse_label = "Running on AI Predictions"
 
+        searches = self.latency.summary("phase", "search") or {}
         return {
             "pulse": pulse,
             "pulse_color": pulse_color,
             "pulse_label": pulse_label,
             "uptime_seconds": round(time.time() - self._uptime_start, 1),
             "total_searches": self._total_searches,
-            "avg_response_ms": self._last_search_time_ms,
+            "avg_response_ms": searches.get("mean"),  # over the last 5 minutes
+            "p99_response_ms": searches.get("p99"),
             "data_sources": {
                 "live": self._live_hits,
                 "cached": self._cache_hits,
@@ -249,6 +564,7 @@ class SystemHealthMonitor:
                 "live_percentage": round(live_pct, 1),
             },
             "platforms": self._platform_status,
+            "fleet": self._fleet or None,
         }
 
 
@@ -256,7 +572,9 @@ class SystemHealthMonitor:
 # SINGLETON INSTANCES
 # ============================================================
 
-# Global instances — imported by main.py
-price_cache = PriceCache(ttl_seconds=300)
-circuit_breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=120)
-health_monitor = SystemHealthMonitor()
+# Global instances — imported by main.py. L1 is per worker; when
+# SHARED_STORE_URL is set, all of them share state through the same L2.
+# The merged set can be no fresher than its most volatile platform
+price_cache = PriceCache(ttl_seconds=min(PLATFORM_TTL_SECONDS.values()), l2=shared_store)
+circuit_breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=120, l2=shared_store)
+health_monitor = SystemHealthMonitor(l2=shared_store)
@@ -0,0 +1,343 @@
+"""
+Shared Scraping Client + HTTP Revalidation Cache
+Every scraper used to open its own httpx.AsyncClient per call: a fresh TCP/TLS
+handshake per platform per search, and a full download + parse of pages that
+mostly had not changed since the last scrape. All scrapers now share one
+client (keep-alive connection pool), and GETs go through a revalidation cache:
+
+  - raw upstream bodies are stored zlib-compressed on disk, keyed by the
+    normalized URL + params, with the response's ETag / Last-Modified
+  - the next request for the same URL is sent conditionally
+    (If-None-Match / If-Modified-Since); a 304 is served from disk
+  - every GET body is fingerprinted, and scrapers can memoize their parse
+    per fingerprint (reuse_parse / remember_parse) — the parser only runs
+    when the upstream content actually changed, 304 or not
+  - the disk cache is an LRU capped at HTTP_CACHE_MAX_MB
+
+Launcher workers share the directory. Each worker's index is only a local
+view of it: a lookup that misses the index still reads the file another
+worker stored, and the size cap is enforced on the directory as a whole.
+Every max_bytes / EVICT_SCAN_FRACTION of writes (or when the local view
+exceeds the cap) a worker rescans the directory under a lock file and
+evicts the least recently used files, whoever wrote them. Hits touch a
+file's mtime, so LRU order is shared too. Total disk use can exceed the cap
+by at most workers × max_bytes / EVICT_SCAN_FRACTION between scans.
+
+Configuration (environment):
+  HTTP_CACHE_DIR     where bodies live   (<tmp>/parallax-http-cache; "" disables)
+  HTTP_CACHE_MAX_MB  disk size cap       (256)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: scans are not serialized across workers
+    fcntl = None
+
+
+# Parsed results remembered per URL (in memory, small)
+MAX_PARSED_ENTRIES = 1024
+# Rescan the shared directory after writing this fraction of the cap
+EVICT_SCAN_FRACTION = 16
+_LOCK_NAME = ".evict.lock"
+
+
+def normalize_key(method: str, url: str, params: Optional[Dict] = None) -> str:
+    """Cache key: method + URL with lowercase host, sorted query, no fragment."""
+    parsed = httpx.URL(url)
+    query = httpx.QueryParams(parsed.query).multi_items()
+    query += httpx.QueryParams(params or {}).multi_items()
+    query.sort()
+    normalized = parsed.copy_with(
+        scheme=parsed.scheme.lower(),
+        host=parsed.host.lower(),
+        query=str(httpx.QueryParams(query)).encode() or None,
+        fragment=None,
+    )
+    return f"{method.upper()} {normalized}"
+
+
+class HttpRevalidationCache:
+    """Compressed on-disk LRU of upstream bodies + their validators."""
+
+    def __init__(self, directory: Optional[str], max_bytes: int):
+        self.directory = directory or None
+        self.max_bytes = max_bytes
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, LRU order
+        self._disk_bytes = 0
+        self._written_since_scan = 0
+        self._evicting = False
+        self._parsed: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()  # key -> (digest, value)
+        self.stats = {
+            "conditional_sent": 0, "not_modified": 0, "stored": 0, "evicted": 0,
+            "bytes_saved": 0, "parse_reused": 0,
+        }
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._load_index()
+            except OSError as e:
+                print(f"⚠️ HTTP cache disabled ({self.directory}): {e}")
+                self.directory = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    # --- Disk layout: one file per key, "<json meta>\n<zlib body>" ---
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(last used, name, size) of every stored file, least recently used first."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".z"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # evicted by another worker meanwhile
+                entries.append((st.st_mtime, entry.name, st.st_size))
+        entries.sort()
+        return entries
+
+    def _load_index(self, entries: Optional[List[Tuple[float, str, int]]] = None):
+        if entries is None:
+            entries = self._scan()
+        self._sizes = OrderedDict((name, size) for _, name, size in entries)
+        self._disk_bytes = sum(self._sizes.values())
+        self._written_since_scan = 0
+
+    @staticmethod
+    def _file_name(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest() + ".z"
+
+    def _read(self, name: str) -> Optional[Tuple[Dict, bytes, int]]:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            header, _, compressed = raw.partition(b"\n")
+            meta = json.loads(header)
+            os.utime(path)  # last used: the LRU order every worker's scan sees
+            return meta, compressed, len(raw)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name: str, meta: Dict, body: bytes) -> int:
+        data = json.dumps(meta).encode() + b"\n" + zlib.compress(body, 6)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomic: workers may share the directory
+        return len(data)
+
+    def _evict_shared(self) -> Optional[Tuple[List[Tuple[float, str, int]], int]]:
+        """
+        Trim the whole directory to max_bytes (worker thread). Returns the
+        surviving entries and how many files were removed, or None if another
+        worker is scanning right now.
+        """
+        with open(os.path.join(self.directory, _LOCK_NAME), "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            entries = self._scan()
+            total = sum(size for _, _, size in entries)
+            removed = 0
+            while total > self.max_bytes and removed < len(entries):
+                _, name, size = entries[removed]
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # already gone
+                total -= size
+                removed += 1
+            return entries[removed:], removed
+
+    async def _evict(self):
+        if self._evicting:
+            return
+        self._evicting = True
+        try:
+            result = await asyncio.to_thread(self._evict_shared)
+        except OSError as e:
+            print(f"⚠️ HTTP cache eviction failed: {e}")
+            return
+        finally:
+            self._evicting = False
+        if result is not None:
+            entries, removed = result
+            self._load_index(entries)
+            self.stats["evicted"] += removed
+
+    async def lookup(self, key: str) -> Optional[Tuple[Dict, bytes]]:
+        """(meta, compressed body) for a stored response, or None."""
+        if not self.enabled:
+            return None
+        # Not in our index may still mean stored by another worker
+        name = self._file_name(key)
+        stored = await asyncio.to_thread(self._read, name)
+        if stored is None:
+            self._disk_bytes -= self._sizes.pop(name, 0)  # evicted elsewhere
+            return None
+        meta, compressed, size = stored
+        if meta.get("key") != key:
+            return None
+        self._disk_bytes += size - self._sizes.pop(name, 0)
+        self._sizes[name] = size
+        return meta, compressed
+
+    async def store(self, key: str, response: httpx.Response, digest: str):
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if not self.enabled or not (etag or last_modified):
+            return  # nothing to revalidate with
+        meta = {
+            "key": key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": response.headers.get("content-type"),
+            "digest": digest,
+        }
+        name = self._file_name(key)
+        try:
+            size = await asyncio.to_thread(self._write, name, meta, response.content)
+        except OSError as e:
+            print(f"⚠️ HTTP cache write failed: {e}")
+            return
+        self._disk_bytes += size - self._sizes.pop(name, 0)
+        self._sizes[name] = size
+        self._written_since_scan += size
+        self.stats["stored"] += 1
+        if (self._disk_bytes > self.max_bytes
+                or self._written_since_scan > self.max_bytes / EVICT_SCAN_FRACTION):
+            await self._evict()
+
+    # --- Parse memo ---
+
+    def reuse_parse(self, response: httpx.Response) -> Optional[Any]:
+        """The value remembered for this exact body, if the content is unchanged."""
+        info = response.extensions.get("http_cache")
+        if not info:
+            return None
+        memo = self._parsed.get(info["key"])
+        if memo is None or memo[0] != info["digest"]:
+            return None
+        self._parsed.move_to_end(info["key"])
+        self.stats["parse_reused"] += 1
+        return memo[1]
+
+    def remember_parse(self, response: httpx.Response, value: Any):
+        info = response.extensions.get("http_cache")
+        if not info:
+            return
+        self._parsed[info["key"]] = (info["digest"], value)
+        self._parsed.move_to_end(info["key"])
+        while len(self._parsed) > MAX_PARSED_ENTRIES:
+            self._parsed.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "entries": len(self._sizes),
+            "disk_bytes": self._disk_bytes,
+            "max_bytes": self.max_bytes,
+            "parsed_entries": len(self._parsed),
+        }
+
+
+class ScrapingSession:
+    """A scraper's view of the shared client: its own timeout, shared pool + cache."""
+
+    def __init__(self, client: httpx.AsyncClient, cache: HttpRevalidationCache, timeout: float):
+        self._client = client
+        self._cache = cache
+        self._timeout = timeout
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", self._timeout)
+        if method.upper() != "GET":
+            return await self._client.request(method, url, **kwargs)
+
+        key = normalize_key(method, url, kwargs.get("params"))
+        cache = self._cache
+        stored = await cache.lookup(key)
+        if stored is not None:
+            meta = stored[0]
+            headers = dict(kwargs.get("headers") or {})
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            kwargs["headers"] = headers
+            cache.stats["conditional_sent"] += 1
+
+        response = await self._client.request(method, url, **kwargs)
+
+        if response.status_code == 304 and stored is not None:
+            meta, compressed = stored
+            body = zlib.decompress(compressed)
+            cache.stats["not_modified"] += 1
+            cache.stats["bytes_saved"] += len(body)
+            headers = {"content-type": meta["content_type"]} if meta.get("content_type") else {}
+            return httpx.Response(
+                200, headers=headers, content=body, request=response.request,
+                extensions={"http_cache": {"key": key, "digest": meta["digest"], "revalidated": True}},
+            )
+        if response.status_code == 200:
+            digest = hashlib.sha1(response.content).hexdigest()
+            response.extensions["http_cache"] = {"key": key, "digest": digest, "revalidated": False}
+            await cache.store(key, response, digest)
+        return response
+
+
+class ScrapingClient:
+    """One keep-alive httpx.AsyncClient for every scraper (per event loop)."""
+
+    def __init__(self, cache: HttpRevalidationCache):
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # Scripts run several asyncio.run() loops; a pool cannot cross loops
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=32),
+            )
+            self._loop = loop
+        return self._client
+
+    @asynccontextmanager
+    async def session(self, timeout: float = 15.0):
+        """Drop-in for `async with httpx.AsyncClient(...)` — the pool stays open."""
+        yield ScrapingSession(self._get_client(), self.cache, timeout)
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# Global instances
+http_cache = HttpRevalidationCache(
+    directory=os.environ.get("HTTP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "parallax-http-cache")),
+    max_bytes=int(os.environ.get("HTTP_CACHE_MAX_MB", 256)) * 1024 * 1024,
+)
+scraping_client = ScrapingClient(http_cache)
@@ -9,6 +9,8 @@ from datetime import datetime
 
 from .models import ProductResult, PlatformType, ActionEnum
 from .price_predictor import predict_price_action
+from .keyword_engine import keyword_engine
+from .tracing import span
 
 
 # ============================================================
@@ -470,6 +472,13 @@ ITEM_CATEGORIES = {
     },
 }
 
+# Longer phrases take precedence: categories ordered by their longest keyword,
+# keywords within a category longest first ("gaming mouse" beats "mouse")
+keyword_engine.register("item_category", {
+    cat_key: sorted(cat["keywords"], key=len, reverse=True)
+    for cat_key, cat in sorted(ITEM_CATEGORIES.items(), key=lambda x: -max(len(k) for k in x[1]["keywords"]))
+})
+
 # --- 2b. Productivity Uptime Metrics ---
 # For tech items: how much potential downtime does faster delivery prevent?
 PRODUCTIVITY_METRICS = {
@@ -621,18 +630,19 @@ def _classify_item(query: str) -> Dict:
     q = query.lower().strip()
     
     # First check for exact/compound matches (longer phrases first)
-    for cat_key, cat in sorted(ITEM_CATEGORIES.items(), key=lambda x: -max(len(k) for k in x[1]["keywords"])):
-        for keyword in sorted(cat["keywords"], key=len, reverse=True):
-            if keyword in q:
-                return {
-                    "category": cat_key,
-                    "label": cat["label"],
-                    "icon": cat["icon"],
-                    "color": cat["color"],
-                    "speed_weight": cat["speed_weight"],
-                    "description": cat["description"],
-                    "matched_keyword": keyword,
-                }
+    hit = keyword_engine.best(q, "item_category")
+    if hit:
+        cat_key, keyword = hit
+        cat = ITEM_CATEGORIES[cat_key]
+        return {
+            "category": cat_key,
+            "label": cat["label"],
+            "icon": cat["icon"],
+            "color": cat["color"],
+            "speed_weight": cat["speed_weight"],
+            "description": cat["description"],
+            "matched_keyword": keyword,
+        }
     
     # Default: general item
     return {
@@ -1079,26 +1089,33 @@ def _detect_bot_reviews(platform: "PlatformType", query: str) -> Dict:
     }
 
 
+# Product-type detection for contextual review summaries (checked in this order)
+REVIEW_PRODUCT_TYPES = {
+    "Electronics": ["phone", "iphone", "samsung", "laptop", "tv", "tablet", "headphone", "earbuds", "mouse", "keyboard", "charger"],
+    "Fashion": ["shoe", "shirt", "dress", "clothing", "jeans", "jacket", "kurta", "saree"],
+    "Grocery": ["milk", "bread", "rice", "oil", "sugar", "grocery", "flour", "dal", "atta", "ghee", "butter"],
+}
+keyword_engine.register("review_product_type", REVIEW_PRODUCT_TYPES)
+
+
 def get_review_sentiment(products: List[ProductResult], query: str) -> Dict:
     """Generate sentiment-aggregated review data with ABSA and Bot Detection"""
     sentiments = []
     
     # Determine product type for contextual summaries
     query_lower = query.lower()
-    if any(w in query_lower for w in ["phone", "iphone", "samsung", "laptop", "tv", "tablet", "headphone", "earbuds", "mouse", "keyboard", "charger"]):
-        product_type = "Electronics"
+    hit = keyword_engine.best(query_lower, "review_product_type")
+    product_type = hit[0] if hit else "General"
+    if product_type == "Electronics":
         positive_phrases = ["Build quality is praised", "Performance meets expectations"]
         negative_phrases = ["some units have defects", "warranty claims can be slow"]
-    elif any(w in query_lower for w in ["shoe", "shirt", "dress", "clothing", "jeans", "jacket", "kurta", "saree"]):
-        product_type = "Fashion"
+    elif product_type == "Fashion":
         positive_phrases = ["Sizing is accurate", "Material quality is decent"]
         negative_phrases = ["color may differ from photos", "stitching quality varies"]
-    elif any(w in query_lower for w in ["milk", "bread", "rice", "oil", "sugar", "grocery", "flour", "dal", "atta", "ghee", "butter"]):
-        product_type = "Grocery"
+    elif product_type == "Grocery":
         positive_phrases = ["Products are fresh", "Good expiry dates"]
         negative_phrases = ["packaging sometimes damaged in transit", "prices fluctuate"]
     else:
-        product_type = "General"
         positive_phrases = ["Product quality is acceptable", "Value for money"]
         negative_phrases = ["delivery packaging could improve", "occasional delays"]
     
@@ -1433,38 +1450,45 @@ def generate_product_insights(
     This is the main function called by the API.
     """
     # 1. Coupons for each product
-    coupon_data = {}
-    for product in products:
-        coupons = get_applicable_coupons(product)
-        if coupons:
-            coupon_data[product.id] = coupons
-    
-    # Best coupon overall
-    best_coupon = None
-    best_savings = 0
-    for prod_id, coupons in coupon_data.items():
-        for c in coupons:
-            if c.get("estimated_savings", 0) > best_savings:
-                best_savings = c["estimated_savings"]
-                best_coupon = {**c, "product_id": prod_id}
+    with span("coupons"):
+        coupon_data = {}
+        for product in products:
+            coupons = get_applicable_coupons(product)
+            if coupons:
+                coupon_data[product.id] = coupons
+        
+        # Best coupon overall
+        best_coupon = None
+        best_savings = 0
+        for prod_id, coupons in coupon_data.items():
+            for c in coupons:
+                if c.get("estimated_savings", 0) > best_savings:
+                    best_savings = c["estimated_savings"]
+                    best_coupon = {**c, "product_id": prod_id}
     
     # 1b. Stackability Engine — combine coupons + bank offers + loyalty
-    stacked = calculate_stacked_savings(products, coupon_data)
+    with span("stacked"):
+        stacked = calculate_stacked_savings(products, coupon_data)
     
     # 2. AI Price Oracle (Replaces Urgency)
-    oracle = calculate_price_oracle(products, symbol, query)
+    with span("oracle"):
+        oracle = calculate_price_oracle(products, symbol, query)
     
     # 3. Stock Pulse
-    stock_pulse = calculate_stock_pulse(products)
+    with span("stock_pulse"):
+        stock_pulse = calculate_stock_pulse(products)
     
     # 4. Carbon Footprint (Green Edge)
-    carbon = calculate_carbon_footprint(products)
+    with span("carbon"):
+        carbon = calculate_carbon_footprint(products)
     
     # 5. Review sentiment
-    reviews = get_review_sentiment(products, query)
+    with span("reviews"):
+        reviews = get_review_sentiment(products, query)
     
     # 6. Flash Pool insights
-    flash_pool = get_flash_pool_insights(query, pincode)
+    with span("flash_pool"):
+        flash_pool = get_flash_pool_insights(query, pincode)
     
     return {
         "coupons": {
@@ -0,0 +1,158 @@
+"""
+Shared Keyword Engine — one Aho-Corasick automaton for every keyword table
+Persona intent, relevance categories, fashion/beauty routing, mock images,
+urgency categories and review product types all used to run their own
+`any(k in text for k in KEYWORDS)` loops, re-scanning the same query or title
+once per keyword. Each module now registers its table here under a namespace;
+the engine compiles all of them into a single automaton and labels a string
+with every namespace/category it contains in one linear pass.
+
+Matching semantics are plain substring containment (same as `k in text`),
+case-insensitive.
+
+Usage:
+    keyword_engine.register("intent", {"urgency": [...], "high_value": [...]})
+    keyword_engine.labels("milk and bread", "intent")   -> {"urgency"}
+    keyword_engine.best("iphone 15 case", "mock_image") -> ("iphone", "iphone")
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+# (namespace, label, label_rank, keyword_rank) — ranks follow registration order
+_Entry = Tuple[str, str, int, int]
+
+
+class KeywordEngine:
+    """Multi-pattern substring matcher over namespaced keyword tables."""
+
+    def __init__(self, cache_size: int = 8192):
+        self._entries: Dict[str, List[_Entry]] = {}   # keyword -> entries
+        self._namespaces: Set[str] = set()
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._dirty = False
+        # Queries and titles repeat heavily; cache whole-string scans
+        self._scan_cached = lru_cache(maxsize=cache_size)(self._scan)
+
+    # --- Registration / compilation ---
+
+    def register(self, namespace: str, table: Mapping[str, Iterable[str]]) -> None:
+        """
+        Register a {label: keywords} table. Order is meaningful: `best()`
+        prefers earlier labels, then earlier keywords within a label.
+        """
+        if namespace in self._namespaces:
+            raise ValueError(f"Keyword namespace already registered: {namespace}")
+        self._namespaces.add(namespace)
+        for label_rank, (label, keywords) in enumerate(table.items()):
+            for kw_rank, keyword in enumerate(keywords):
+                keyword = keyword.lower()
+                if keyword:
+                    self._entries.setdefault(keyword, []).append(
+                        (namespace, label, label_rank, kw_rank)
+                    )
+        self._dirty = True
+
+    def _compile(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[str]] = [[]]
+
+        # 1. Trie of all keywords
+        for keyword in self._entries:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(keyword)
+
+        # 2. Failure links (BFS), merging outputs of suffix states
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+        self._dirty = False
+        self._scan_cached.cache_clear()
+
+    # --- Matching ---
+
+    def _scan(self, text: str) -> FrozenSet[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return frozenset(found)
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """All registered keywords contained in `text` (any namespace)."""
+        if self._dirty:
+            self._compile()
+        if not text:
+            return frozenset()
+        return self._scan_cached(text.lower())
+
+    def matches(self, text: str, namespace: str) -> List[_Entry]:
+        entries = self._entries
+        return [
+            entry
+            for keyword in self.scan(text)
+            for entry in entries[keyword]
+            if entry[0] == namespace
+        ]
+
+    def labels(self, text: str, namespace: str) -> Set[str]:
+        """Every label of `namespace` with at least one keyword in `text`."""
+        return {entry[1] for entry in self.matches(text, namespace)}
+
+    def has(self, text: str, namespace: str, label: Optional[str] = None) -> bool:
+        hits = self.matches(text, namespace)
+        if label is None:
+            return bool(hits)
+        return any(entry[1] == label for entry in hits)
+
+    def best(self, text: str, namespace: str) -> Optional[Tuple[str, str]]:
+        """
+        Highest-priority (label, keyword) hit — equivalent to looping over the
+        registered table in order and returning the first keyword found.
+        """
+        best_entry = None
+        best_keyword = None
+        entries = self._entries
+        for keyword in self.scan(text):
+            for entry in entries[keyword]:
+                if entry[0] != namespace:
+                    continue
+                if best_entry is None or entry[2:] < best_entry[2:]:
+                    best_entry, best_keyword = entry, keyword
+        if best_entry is None:
+            return None
+        return best_entry[1], best_keyword
+
+
+# Global instance — tables register at import, the automaton compiles on first use
+keyword_engine = KeywordEngine()
@@ -0,0 +1,202 @@
+"""
+Latency Histograms — fixed-memory percentiles for endpoints, scrapers and phases
+SystemHealthMonitor only kept the duration of the last search. Latencies are
+now recorded into log-bucketed histograms (HDR-style): bucket i holds values
+up to LOWEST_MS * GROWTH**i, so every reported percentile is within GROWTH
+(4%) of the true value, whatever the magnitude, and a series never holds more
+than NUM_BUCKETS counters per time slice.
+
+Each series is a ring of SLICES slices of SLICE_SECONDS; percentiles are read
+over rolling WINDOWS (the last minute, the last five minutes) by merging the
+live slices. Lifetime bucket counts are kept as well, so /metrics can export
+cumulative Prometheus histograms (EXPORT_BOUNDS_MS) that add up across
+workers. Series are keyed by (kind, name):
+
+  endpoint   HTTP route template ("/search", "/search/batch", ...)
+  scraper    platform ("amazon", "blinkit", ...), one sample per scrape
+  phase      search pipeline phase ("cache_lookup", "orchestrate", "group",
+             "insights", "search")
+"""
+
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+LOWEST_MS = 0.05
+GROWTH = 1.04
+NUM_BUCKETS = int(math.ceil(math.log(600_000 / LOWEST_MS) / math.log(GROWTH))) + 1  # up to 10 min
+SLICE_SECONDS = 10
+SLICES = 30
+WINDOWS = {"1m": 60, "5m": 300}
+QUANTILES = (("p50", 0.50), ("p90", 0.90), ("p99", 0.99))
+# `le` bounds of the exported histograms (the log buckets are far too many to export)
+EXPORT_BOUNDS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+_LOG_GROWTH = math.log(GROWTH)
+
+
+def bucket_of(ms: float) -> int:
+    if ms <= LOWEST_MS:
+        return 0
+    return min(NUM_BUCKETS - 1, int(math.ceil(math.log(ms / LOWEST_MS) / _LOG_GROWTH)))
+
+
+def bucket_upper(index: int) -> float:
+    return LOWEST_MS * GROWTH ** index
+
+
+class _Slice:
+    __slots__ = ("epoch", "counts", "count", "total", "max")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.counts: Dict[int, int] = {}  # sparse: at most NUM_BUCKETS keys
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class RollingHistogram:
+    """Log-bucketed histogram over a ring of time slices."""
+
+    def __init__(self):
+        self._ring: List[Optional[_Slice]] = [None] * SLICES
+        self.counts: Dict[int, int] = {}  # lifetime, sparse like _Slice.counts
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, ms: float, now: Optional[float] = None):
+        epoch = int((now if now is not None else time.time()) // SLICE_SECONDS)
+        current = self._ring[epoch % SLICES]
+        if current is None or current.epoch != epoch:
+            current = self._ring[epoch % SLICES] = _Slice(epoch)
+        bucket = bucket_of(ms)
+        current.counts[bucket] = current.counts.get(bucket, 0) + 1
+        current.count += 1
+        current.total += ms
+        current.max = max(current.max, ms)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += ms
+
+    def cumulative(self, bounds_ms=EXPORT_BOUNDS_MS) -> List[Tuple[float, int]]:
+        """Lifetime (bound, samples <= bound) pairs, Prometheus `le` style.
+
+        A log bucket counts toward a bound only if it ends at or below it, so
+        each count is exact to within one bucket (GROWTH) of the bound.
+        """
+        ordered = sorted(self.counts.items())
+        result, seen, i = [], 0, 0
+        for bound in bounds_ms:
+            while i < len(ordered) and bucket_upper(ordered[i][0]) <= bound * (1 + 1e-9):
+                seen += ordered[i][1]
+                i += 1
+            result.append((bound, seen))
+        return result
+
+    def summary(self, window_seconds: int, now: Optional[float] = None) -> Optional[Dict]:
+        """count / mean / p50 / p90 / p99 / max over the last `window_seconds`, or None if empty."""
+        epoch = int((now if now is not None else time.time()) // SLICE_SECONDS)
+        oldest = epoch - window_seconds // SLICE_SECONDS
+        merged: Dict[int, int] = defaultdict(int)
+        count, total, peak = 0, 0.0, 0.0
+        for s in self._ring:
+            if s is None or not oldest < s.epoch <= epoch:
+                continue
+            for bucket, n in s.counts.items():
+                merged[bucket] += n
+            count += s.count
+            total += s.total
+            peak = max(peak, s.max)
+        if not count:
+            return None
+        result = {"count": count, "mean": round(total / count, 2)}
+        ordered = sorted(merged.items())
+        for label, q in QUANTILES:
+            rank, seen = q * count, 0
+            for bucket, n in ordered:
+                seen += n
+                if seen >= rank:
+                    # Upper bound of the bucket, never above what was observed
+                    result[label] = round(min(bucket_upper(bucket), peak), 2)
+                    break
+        result["max"] = round(peak, 2)
+        return result
+
+
+class LatencyRegistry:
+    """All latency series of this worker, keyed by (kind, name)."""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], RollingHistogram] = {}
+
+    def observe(self, kind: str, name: str, ms: float):
+        series = self._series.get((kind, name))
+        if series is None:
+            series = self._series[(kind, name)] = RollingHistogram()
+        series.record(ms)
+
+    @contextmanager
+    def timer(self, kind: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, (time.perf_counter() - started) * 1000)
+
+    def summary(self, kind: str, name: str, window: str = "5m") -> Optional[Dict]:
+        series = self._series.get((kind, name))
+        return series.summary(WINDOWS[window]) if series is not None else None
+
+    def items(self):
+        """((kind, name), RollingHistogram) for every series."""
+        return sorted(self._series.items())
+
+    def snapshot(self) -> Dict:
+        """{window: {kind: {name: summary}}} for series with samples in the window."""
+        now = time.time()
+        report: Dict[str, Dict[str, Dict]] = {}
+        for window, seconds in WINDOWS.items():
+            by_kind: Dict[str, Dict] = defaultdict(dict)
+            for (kind, name), series in sorted(self._series.items()):
+                summary = series.summary(seconds, now)
+                if summary is not None:
+                    by_kind[kind][name] = summary
+            report[window] = dict(by_kind)
+        return report
+
+    def render_text(self) -> str:
+        """Plain-text table of every series and window (for terminals and log scrapers)."""
+        columns = ("count", "mean", "p50", "p90", "p99", "max")
+        lines = [f"{'window':<7}{'kind':<10}{'name':<28}" + "".join(f"{c:>10}" for c in columns)]
+        for window, by_kind in self.snapshot().items():
+            for kind, by_name in by_kind.items():
+                for name, summary in by_name.items():
+                    lines.append(
+                        f"{window:<7}{kind:<10}{name:<28}"
+                        + "".join(f"{summary.get(c, ''):>10}" for c in columns)
+                    )
+        return "\n".join(lines) + "\n"
+
+
+class LatencyMiddleware:
+    """Pure ASGI middleware: one `endpoint` sample per HTTP request, by route template."""
+
+    def __init__(self, app, registry: LatencyRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths
+            # share one series so arbitrary URLs cannot grow the registry
+            route = scope.get("route")
+            name = getattr(route, "path", None) or "unmatched"
+            self.registry.observe("endpoint", name, (time.perf_counter() - started) * 1000)
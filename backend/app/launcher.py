@@ -0,0 +1,259 @@
+"""
+Production Launcher — pre-fork multi-worker server for Parallax Edge
+
+  python -m app.launcher --workers 4 --port 8000
+
+Architecture:
+  ┌──────────────────────────────────────────────┐
+  │  Master process                              │
+  │  1. preload(): import app + static catalogs  │
+  │  2. gc.freeze() → pages stay shared (COW)    │
+  │  3. bind one listening socket                │
+  │  4. fork N workers, respawn on crash         │
+  │  5. SIGTERM → drain workers, then exit       │
+  └──────┬──────────┬──────────┬─────────────────┘
+         │          │          │
+    ┌────▼───┐ ┌────▼───┐ ┌────▼───┐
+    │Worker 1│ │Worker 2│ │Worker N│   uvicorn.Server on the
+    │  (L1)  │ │  (L1)  │ │  (L1)  │   inherited socket
+    └────┬───┘ └────┬───┘ └────┬───┘
+         └──────────┼──────────┘
+              SharedStore (L2)   ← SHARED_STORE_URL
+
+uvicorn's own --workers spawns fresh interpreters, so every worker re-imports
+the catalogs and nothing is shared. Forking after preload keeps the mock
+catalogs, COUNTRY_CONFIG and the insights tables in memory once per node.
+
+Without --workers / WEB_CONCURRENCY the launcher starts one worker per CPU the
+process may actually use (affinity mask and cgroup CPU quota, not the host's
+core count), at most MAX_DEFAULT_WORKERS: every worker is a full copy of the
+app's heap, so a container must not fork one per host core.
+
+Workers also share a metrics directory (METRICS_DIR, a temporary directory
+by default), so /metrics reports the whole node whichever worker answers.
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import math
+import time
+from typing import Dict, Optional
+
+MAX_DEFAULT_WORKERS = 4
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the container's CFS quota (cgroup v2, then v1), or None."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as fh:
+            quota, period = fh.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as fh:
+            quota = int(fh.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as fh:
+            period = int(fh.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY if set, else the usable CPUs (see module docstring)."""
+    configured = os.environ.get("WEB_CONCURRENCY")
+    if configured:
+        return int(configured)
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, min(cpus, MAX_DEFAULT_WORKERS))
+
+
+def preload():
+    """Import the app and warm every static catalog before forking."""
+    from .main import app
+    from .models import CountryCode
+    from .mock_data import get_sample_products
+
+    for country in CountryCode:
+        get_sample_products(country)
+
+    # Move everything allocated so far out of the GC's reach: collections in
+    # the workers would otherwise touch every object header and un-share pages.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, graceful_timeout: int, index: int):
+    """Body of a forked worker (index: its slot, kept across respawns). Never returns."""
+    import uvicorn
+    from .prewarmer import prewarmer
+
+    # Workers inherit the master's PRNG state; reseed so fallbacks differ per worker
+    random.seed()
+    # One pre-warmer per node: its budget is the node's, and a key is warmed once
+    prewarmer.enabled = index == 0
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_graceful_shutdown=graceful_timeout,
+        access_log=False,
+    )
+    server = uvicorn.Server(config)
+    code = 0
+    try:
+        server.run(sockets=[sock])
+    except Exception as e:
+        print(f"Worker {os.getpid()} crashed: {e}")
+        code = 1
+    os._exit(code)
+
+
+class Master:
+    """Forks workers on a shared socket, keeps N alive, drains them on shutdown."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, graceful_timeout: int):
+        self.app = app
+        self.sock = sock
+        self.num_workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}  # pid -> started_at
+        self.slots: Dict[int, int] = {}  # pid -> worker index
+        self.shutting_down = False
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.app, self.sock, self.graceful_timeout, index)
+        self.children[pid] = time.time()
+        self.slots[pid] = index
+        print(f"🚀 Worker {pid} started (slot {index})")
+
+    def _on_signal(self, signum, frame):
+        if self.shutting_down:
+            return
+        self.shutting_down = True
+        print(f"🛑 Signal {signum}: draining {len(self.children)} workers")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def _reap(self, block: bool) -> bool:
+        try:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return False
+        if pid == 0:
+            return False
+        started_at = self.children.pop(pid, None)
+        index = self.slots.pop(pid, None)
+        if not self.shutting_down and started_at is not None:
+            code = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+            print(f"⚠️ Worker {pid} exited ({code}), respawning")
+            # Avoid a hot respawn loop if workers die on boot
+            if time.time() - started_at < 1:
+                time.sleep(1)
+            self.spawn(index)
+        return True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        for index in range(self.num_workers):
+            self.spawn(index)
+
+        while not self.shutting_down:
+            try:
+                self._reap(block=True)
+            except InterruptedError:
+                continue
+
+        # Drain: uvicorn stops accepting and finishes in-flight requests;
+        # anything still alive after the grace period is killed.
+        deadline = time.time() + self.graceful_timeout + 5
+        while self.children and time.time() < deadline:
+            if not self._reap(block=False):
+                time.sleep(0.1)
+        for pid in list(self.children):
+            print(f"💀 Worker {pid} did not drain in time, killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.children.pop(pid, None)
+        self.sock.close()
+        print("✅ All workers drained")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallax Edge multi-worker launcher")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.environ.get("GRACEFUL_TIMEOUT", 30)))
+    args = parser.parse_args(argv)
+
+    app = preload()
+
+    from .shared_store import shared_store
+    if args.workers > 1 and shared_store is None:
+        print("⚠️ SHARED_STORE_URL not set: caches, circuits and sessions are per worker")
+
+    if not hasattr(os, "fork") or args.workers <= 1:
+        # Single process (or no fork on this OS): plain uvicorn
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port,
+                    timeout_graceful_shutdown=args.graceful_timeout)
+        return
+
+    from .metrics import metrics_registry
+    metrics_dir = os.environ.get("METRICS_DIR")
+    owns_metrics_dir = not metrics_dir
+    if owns_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="parallax-metrics-")
+    metrics_registry.share(metrics_dir)
+    # Every worker has its own token buckets: give each its share of the rates
+    from .outbound import outbound_scheduler
+    outbound_scheduler.share_limits(args.workers)
+
+    sock = _bind(args.host, args.port)
+    print(f"Parallax Edge listening on {args.host}:{args.port} with {args.workers} workers")
+    try:
+        Master(app, sock, args.workers, args.graceful_timeout).run()
+    finally:
+        if owns_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
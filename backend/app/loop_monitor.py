@@ -0,0 +1,162 @@
+"""
+Event-Loop Lag Monitor + Slow-Callback Watchdog
+Synchronous work inside async handlers (BeautifulSoup parsing,
+group_similar_products, generate_product_insights, quick-commerce synthesis)
+delays every other request on the worker. Two pieces watch for it:
+
+  - a probe coroutine asks to be woken every LOOP_LAG_INTERVAL_MS; how late
+    it actually wakes up is the scheduling lag the loop imposed on everything
+    queued at that moment. Samples go into a rolling log-bucketed histogram
+    (see latency.py); every lag above LOOP_STALL_THRESHOLD_MS counts as a stall.
+  - a watchdog thread notices when the probe's heartbeat is overdue by more
+    than the threshold — i.e. while a callback is still blocking the loop —
+    and samples the loop thread's stack right then, together with the
+    request id of the task that is running. That names the stage that is
+    starving concurrent requests.
+
+Stalls are logged, counted (parallax_event_loop_stalls_total) and the last
+MAX_RECENT_STALLS are kept, with their stacks, for /system/health.
+
+Configuration (environment):
+  LOOP_LAG_INTERVAL_MS      probe period                      (250)
+  LOOP_STALL_THRESHOLD_MS   lag that counts as a stall        (100)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Optional
+
+from .latency import RollingHistogram, WINDOWS
+from .metrics import metrics_registry
+from .tracing import install_task_factory, task_request_id
+
+
+LOOP_LAG_INTERVAL_MS = float(os.environ.get("LOOP_LAG_INTERVAL_MS", 250))
+LOOP_STALL_THRESHOLD_MS = float(os.environ.get("LOOP_STALL_THRESHOLD_MS", 100))
+MAX_RECENT_STALLS = 20
+STACK_DEPTH = 12
+
+STALLS = metrics_registry.counter(
+    "event_loop_stalls_total", "Times the event loop was blocked longer than LOOP_STALL_THRESHOLD_MS",
+)
+
+
+def _running_request(loop: asyncio.AbstractEventLoop) -> Dict[str, Optional[str]]:
+    """Name and request id of the task the loop is running (read from another thread)."""
+    task = asyncio.current_task(loop)
+    if task is None:
+        return {"task": None, "request_id": None}
+    return {"task": task.get_name(), "request_id": task_request_id(task)}
+
+
+class LoopLagMonitor:
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS,
+                 threshold_ms: float = LOOP_STALL_THRESHOLD_MS):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.histogram = RollingHistogram()
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.stalls = 0
+        self.recent_stalls: "deque[Dict]" = deque(maxlen=MAX_RECENT_STALLS)
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._next_beat = 0.0  # perf_counter time the probe is due to wake
+        self._sampled: Optional[Dict] = None  # stall the watchdog caught in the act
+
+    # --- Probe (event loop thread) ---
+
+    async def _run_forever(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            self._next_beat = expected
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            lag_ms = lag * 1000
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self.histogram.record(lag_ms)
+            if lag >= self.threshold:
+                self._record_stall(lag_ms)
+
+    def _record_stall(self, lag_ms: float):
+        sampled, self._sampled = self._sampled, None
+        stall = {
+            "at": time.time(),
+            "lag_ms": round(lag_ms, 1),
+            # Without a sample the stall ended before the watchdog looked
+            **(sampled or {"task": None, "request_id": None, "stack": None}),
+        }
+        self.stalls += 1
+        STALLS.inc()
+        self.recent_stalls.append(stall)
+        where = stall["stack"][-1] if stall["stack"] else "stack not sampled"
+        print(f"🐢 Event loop blocked {stall['lag_ms']:.0f}ms "
+              f"(request {stall['request_id'] or '-'}, task {stall['task'] or '-'}): {where}")
+
+    # --- Watchdog (its own thread) ---
+
+    def _watch(self):
+        poll = max(self.threshold / 2, 0.01)
+        while not self._stopping.wait(poll):
+            overdue = time.perf_counter() - self._next_beat
+            if overdue < self.threshold or self._sampled is not None or self._next_beat == 0.0:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=STACK_DEPTH)
+            self._sampled = {
+                **_running_request(self._loop),
+                "stack": [f"{os.path.basename(f.filename)}:{f.lineno} in {f.name}" for f in stack],
+            }
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            install_task_factory(self._loop)  # request ids for _running_request
+            self._next_beat = 0.0
+            self._task = self._loop.create_task(self._run_forever())
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._stopping.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            **{window: self.histogram.summary(seconds) for window, seconds in WINDOWS.items()},
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent_stalls)[-5:],
+        }
+
+
+# Global instance
+loop_monitor = LoopLagMonitor()
@@ -1,29 +1,78 @@
 """
 FastAPI Main Application - Multi-Country Price Aggregator
 """
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+import asyncio
 import hashlib
+import os
 import time
 
 from .models import (
     SearchRequest, SearchResponse, ProductGroup, ProductResult,
-    CountryCode, COUNTRY_CONFIG, RelatedProduct, CartRequest, CartOptimizationResponse
+    CountryCode, COUNTRY_CONFIG, RelatedProduct, CartRequest, CartOptimizationResponse,
+    SORT_PATTERN, BatchSearchRequest
 )
 from .mock_data import get_location_name, get_related_products, PLATFORM_CONFIGS
 from .matcher import group_similar_products, calculate_match_score
 from .scrapers import scrape_all_platforms, get_quick_commerce_results
+from .data_engine import price_cache, health_monitor, circuit_breaker
 from .cart_optimizer import optimize_cart
 from .insights import generate_product_insights
+from .shared_store import flush_writes
+from .user_persona import session_store
+from .prefetcher import prefetcher
+from .prewarmer import prewarmer
+from .outbound import outbound_scheduler, begin_flow
+from .http_cache import http_cache, scraping_client
+from .responses import compact_search_payload, drop_nulls
+from .compression import CompressionMiddleware, GzipPrefix, encoded_body_cache, negotiate
+from .result_sets import (
+    LocalView, ResultSet, result_sets, group_sort_fields, parse_fields, project
+)
+from .latency import LatencyMiddleware
+from .tracing import start_trace, span, server_timing, trace_exporter, RequestIdMiddleware
+from .metrics import metrics_registry, MetricFamily, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .loop_monitor import loop_monitor
+from .profiler import ProfilerMiddleware, profile_store, is_admin
+from .wire_formats import (
+    JSON, COLUMNAR_FORMATS, BatchEncoder, negotiate_format, select_columns, product_columns,
+    encode_payload, encode_columns
+)
+
+
+# Distinct searches a /search/batch call builds at once
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup/shutdown (runs inside each forked worker)."""
+    session_store.start_sweeper()
+    loop_monitor.start()
+    metrics_registry.start()
+    prefetcher.start()
+    prewarmer.start()
+    yield
+    await prewarmer.stop()
+    await prefetcher.stop()
+    await session_store.stop_sweeper()
+    await loop_monitor.stop()
+    await metrics_registry.stop()
+    await scraping_client.aclose()
+    # Graceful drain: push pending write-behind state to the shared L2
+    await flush_writes()
 
 
 app = FastAPI(
     title="Parallax Edge API",
     description="Multi-country hyper-local price aggregator across e-commerce platforms",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -35,6 +84,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-only request profiling (X-Profile + X-Admin-Token)
+app.add_middleware(ProfilerMiddleware)
+
+# brotli/gzip for the large JSON endpoints (negotiated per request)
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency histograms (outermost: includes compression time)
+app.add_middleware(LatencyMiddleware, registry=health_monitor.latency)
+
+# X-Request-ID for traces and event-loop stall reports (wraps everything else)
+app.add_middleware(RequestIdMiddleware)
+
 def sanitize_data(obj):
     """Recursively strip surrogate characters that crash JSON serialization."""
     if isinstance(obj, str):
@@ -48,9 +109,8 @@ def sanitize_data(obj):
 
 
 from .agent_orchestrator import OrchestratorAgent
-from .data_engine import price_cache, health_monitor
 from .price_predictor import predict_price_action
-from .user_persona import track_user_search, get_user_persona
+from .user_persona import track_user_search, get_user_persona, load_session
 
 @app.get("/")
 async def root():
@@ -79,7 +139,120 @@ async def get_countries():
 @app.get("/system/health")
 async def get_system_health():
     """Get real-time agent system health metrics (for UI pulse)."""
-    return health_monitor.get_health()
+    await health_monitor.sync()
+    health = health_monitor.get_health()
+    health["prefetch"] = prefetcher.get_stats()
+    health["prewarm"] = prewarmer.get_stats()
+    health["outbound"] = outbound_scheduler.get_stats()
+    health["http_cache"] = http_cache.get_stats()
+    health["compression"] = encoded_body_cache.get_stats()
+    health["result_sets"] = result_sets.get_stats()
+    health["latency"] = health_monitor.get_latency()
+    health["tracing"] = trace_exporter.get_stats()
+    health["event_loop"] = loop_monitor.get_stats()
+    return health
+
+
+@app.get("/system/latency", response_class=PlainTextResponse)
+async def get_system_latency():
+    """Latency percentiles of this worker as a plain-text table."""
+    return health_monitor.latency.render_text()
+
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    """Recent request profiles on this worker (newest first)."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="admin token required")
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = Query(default="json", pattern="^(json|pstats)$"),
+                      x_admin_token: Optional[str] = Header(default=None)):
+    """One profile: the JSON summary, or the raw cProfile stats (format=pstats)."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="admin token required")
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="profile not found (expired or another worker)")
+    if format == "json":
+        return record.report
+    if record.pstats is None:
+        raise HTTPException(status_code=404, detail="no cpu profile was taken for this request")
+    return Response(content=record.pstats, media_type="application/octet-stream", headers={
+        "Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"',
+    })
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition, merged across launcher workers (see metrics.py)."""
+    return Response(content=await metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _latency_histogram(family: MetricFamily, histogram, labels: Dict[str, str]):
+    """Lifetime cumulative buckets, sum and count (in seconds); additive across workers."""
+    for bound_ms, count in histogram.cumulative():
+        family.add(count, {**labels, "le": repr(bound_ms / 1000)}, "_bucket")
+    family.add(histogram.count, {**labels, "le": "+Inf"}, "_bucket")
+    family.add(round(histogram.total / 1000, 6), labels, "_sum")
+    family.add(histogram.count, labels, "_count")
+
+
+@metrics_registry.register
+def collect_service_metrics():
+    """Read the services' own stats at scrape time (nothing is double-counted)."""
+    price = price_cache.get_stats()
+    http = http_cache.get_stats()
+    sets = result_sets.get_stats()
+    encoded = encoded_body_cache.get_stats()
+    
+    hits = MetricFamily("cache_hits_total", "counter", "Cache hits")
+    hits.add(price["l1_hits"], {"cache": "price", "tier": "l1"})
+    hits.add(price["l2_hits"], {"cache": "price", "tier": "l2"})
+    hits.add(price["platform_hits"], {"cache": "platform", "tier": "l1+l2"})
+    hits.add(price["negative_hits"], {"cache": "negative", "tier": "l1+l2"})
+    hits.add(sets["hits"], {"cache": "result_sets", "tier": "l1"})
+    hits.add(http["not_modified"], {"cache": "http", "tier": "disk"})
+    hits.add(encoded["hits"], {"cache": "compression", "tier": "l1"})
+    misses = MetricFamily("cache_misses_total", "counter", "Cache misses")
+    misses.add(price["misses"], {"cache": "price"})
+    misses.add(price["platform_misses"], {"cache": "platform"})
+    misses.add(sets["misses"], {"cache": "result_sets"})
+    misses.add(encoded["misses"], {"cache": "compression"})
+    evictions = MetricFamily("cache_evictions_total", "counter", "Entries evicted to stay within size caps")
+    evictions.add(price["evictions"], {"cache": "price"})
+    evictions.add(price["platform_evictions"], {"cache": "platform"})
+    evictions.add(http["evicted"], {"cache": "http"})
+    evictions.add(session_store.evicted, {"cache": "sessions"})
+    size = MetricFamily("cache_bytes", "gauge", "Encoded size of cached entries")
+    size.add(price["l1_bytes"]["results"], {"cache": "price"})
+    size.add(price["l1_bytes"]["platforms"], {"cache": "platform"})
+    size.add(http["disk_bytes"], {"cache": "http"})
+    size.add(encoded["cache_bytes"], {"cache": "compression"})
+    entries = MetricFamily("cache_entries", "gauge", "Entries held")
+    entries.add(price["cached_queries"], {"cache": "price"})
+    entries.add(price["platform_entries"], {"cache": "platform"})
+    entries.add(sets["entries"], {"cache": "result_sets"})
+    entries.add(http["entries"], {"cache": "http"})
+    
+    circuits = MetricFamily("circuit_state", "gauge", "1 for the current circuit state of each platform")
+    for platform, current in sorted(circuit_breaker.states().items()):
+        for state in circuit_breaker.STATES:
+            circuits.add(1 if state == current else 0, {"platform": platform, "state": state})
+    
+    sessions = MetricFamily("active_sessions", "gauge", "User sessions held by this worker")
+    sessions.add(len(session_store))
+    
+    lag = MetricFamily("event_loop_lag_seconds", "histogram", "How late the event loop ran a due timer")
+    _latency_histogram(lag, loop_monitor.histogram, {})
+    latency = MetricFamily("latency_seconds", "histogram",
+                           "Latency by endpoint, scraper platform and search phase")
+    for (kind, name), histogram in health_monitor.latency.items():
+        _latency_histogram(latency, histogram, {"kind": kind, "name": name})
+    
+    return [hits, misses, evictions, size, entries, circuits, sessions, lag, latency]
 
 
 @app.get("/search")
@@ -87,18 +260,29 @@ async def search_get(
     query: str = Query(..., min_length=1),
     postal_code: str = Query(..., alias="pincode"),
     country: CountryCode = Query(default=CountryCode.IN),
-    session_id: str = Query(default="guest_session")  # Track user session
+    session_id: str = Query(default="guest_session"),  # Track user session
+    compact: bool = Query(default=False),  # Products referenced by id, nulls omitted
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1, le=100),  # Groups per page
+    sort: Optional[str] = Query(default=None, pattern=SORT_PATTERN),  # e.g. landed_cost, -rating
+    fields: Optional[str] = Query(default=None),  # e.g. product_groups.best_price,total_results
+    accept: Optional[str] = Header(default=None),  # JSON, MessagePack or columnar (see wire_formats)
+    accept_encoding: Optional[str] = Header(default=None),
 ):
     """Search products across platforms for a specific country"""
-    return await perform_search(query, postal_code, country, session_id)
+    return await perform_search(query, postal_code, country, session_id, compact,
+                                offset, limit, sort, fields, negotiate_format(accept), accept_encoding)
 
 
 @app.post("/search")
-async def search_post(request: SearchRequest):
+async def search_post(request: SearchRequest, accept: Optional[str] = Header(default=None),
+                      accept_encoding: Optional[str] = Header(default=None)):
     """Search products (POST)"""
     # Use a default session_id for POST requests if not provided
     session_id = "guest_session"
-    return await perform_search(request.query, request.postal_code, request.country, session_id)
+    return await perform_search(request.query, request.postal_code, request.country, session_id,
+                                request.compact, request.offset, request.limit, request.sort,
+                                request.fields, negotiate_format(accept), accept_encoding)
 
 
 @app.post("/cart/optimize", response_model=CartOptimizationResponse)
@@ -107,61 +291,242 @@ async def optimize_cart_post(request: CartRequest):
     return await optimize_cart(request.queries, request.postal_code, request.country)
 
 
-async def perform_search(query: str, postal_code: str, country: CountryCode, session_id: str):
-    """Core search logic - Agentic Orchestration + Hybrid Data Engine"""
-    start_time = time.time()
-    
-    # Sanitize input immediately
-    query = sanitize_data(query)
-    postal_code = sanitize_data(postal_code)
-    
+@contextmanager
+def phase(name: str):
+    """A search pipeline phase: a trace span + a sample in the phase latency histogram."""
+    with span(name), health_monitor.latency.timer("phase", name):
+        yield
+
+
+async def build_result_set(query: str, postal_code: str, country: CountryCode,
+                           orchestrator: OrchestratorAgent) -> Tuple[ResultSet, Optional[Dict]]:
+    """Cache lookup or orchestration, then grouping: the zone-wide part every page is cut from."""
     country_config = COUNTRY_CONFIG[country]
-    
-    # 1. Behavioral Personalization: Track User Intent
-    track_user_search(session_id, query)
-    persona = get_user_persona(session_id)
-    
     products = []
     telemetry = None
     
-    # 2. Check Fault-Tolerant Cache First
-    cached_data = price_cache.get(query, postal_code)
-    # Note: For this turn, we'll let it pass to ensure we get results or fresh scrape
-    # In a real app, we'd reconstruct objects from cache here.
+    # Check Fault-Tolerant Cache First (L1, then the shared L2)
+    with phase("cache_lookup"):
+        cached_data = await price_cache.fetch(query, postal_code, country)
+    if cached_data:
+        products, telemetry = orchestrator.serve_cached(
+            [ProductResult(**item) for item in cached_data]
+        )
 
-    # 3. Agentic Orchestration
+    # Agentic Orchestration
     if not products:
-        orchestrator = OrchestratorAgent(query, postal_code, country.value)
-        products, telemetry = await orchestrator.orchestrate(
-            scrape_fn=scrape_all_platforms,
-            quick_commerce_fn=get_quick_commerce_results,
-            country_enum=country
-        )
+        with prefetcher.foreground(), phase("orchestrate"):
+            products, telemetry = await orchestrator.orchestrate(
+                scrape_fn=scrape_all_platforms,
+                quick_commerce_fn=get_quick_commerce_results,
+                country_enum=country
+            )
         
         if products:
-            price_cache.put(query, postal_code, products)
+            price_cache.put(query, postal_code, products, country)
             
-    # 4. Filter and cleanup
+    # Filter and cleanup
     products = list({p.id: p for p in products}.values())
     
     # Group similar products
-    product_groups = group_and_compare_products(products, country_config["symbol"])
+    with phase("group"):
+        product_groups = group_and_compare_products(products, country_config["symbol"])
+    
+    # Groups are stored JSON-ready, so pages are cut without re-encoding
+    with phase("encode"):
+        result_set = ResultSet(
+            products=products,
+            groups=sanitize_data(jsonable_encoder(product_groups)),
+            sort_fields=[group_sort_fields(g) for g in product_groups],
+            expires_at=time.time() + await price_cache.time_to_expiry(query, postal_code, country),
+        )
+    result_sets.put(query, postal_code, country, result_set)
+    return result_set, telemetry
+
+
+def local_view(result_set: ResultSet, query: str, postal_code: str, country: CountryCode) -> LocalView:
+    """Insights and related products for this exact query and pincode (built once per result set)."""
+    view = result_set.view(query, postal_code)
+    if view is not None:
+        return view
     
     # Get related products
-    related_data = get_related_products(query, country)
-    related = [RelatedProduct(**item) for item in related_data]
+    with phase("related"):
+        related_data = get_related_products(query, country)
+        related = [RelatedProduct(**item) for item in related_data]
     
     # Generate smart insights
-    insights = generate_product_insights(
-        products=products,
-        query=query,
-        pincode=postal_code,
-        symbol=country_config["symbol"]
+    with phase("insights"):
+        insights = generate_product_insights(
+            products=result_set.products,
+            query=query,
+            pincode=postal_code,
+            symbol=COUNTRY_CONFIG[country]["symbol"]
+        )
+    
+    view = LocalView(
+        insights=sanitize_data(jsonable_encoder(insights)),
+        related=sanitize_data(jsonable_encoder(related)),
+    )
+    result_set.add_view(query, postal_code, view)
+    return view
+
+
+async def perform_search(query: str, postal_code: str, country: CountryCode, session_id: str,
+                         compact: bool = False, offset: int = 0, limit: Optional[int] = None,
+                         sort: Optional[str] = None, fields: Optional[str] = None,
+                         media_type: str = JSON, accept_encoding: Optional[str] = None):
+    """Core search logic - Agentic Orchestration + Hybrid Data Engine"""
+    start_time = time.time()
+    trace = start_trace("search", query=query, postal_code=postal_code, country=country.value)
+    
+    # Sanitize input immediately
+    query = sanitize_data(query)
+    postal_code = sanitize_data(postal_code)
+    
+    # 1. Behavioral Personalization: Track User Intent
+    await load_session(session_id)
+    track_user_search(session_id, query, postal_code, country)
+    prewarmer.record(query, postal_code, country)
+    persona = get_user_persona(session_id)
+    
+    orchestrator = OrchestratorAgent(query, postal_code, country.value)
+    
+    # 2. Paging / re-sorting / projecting a search we just assembled: cut it from the result set
+    paged = limit is not None or offset > 0 or sort is not None or fields is not None
+    result_set = result_sets.get(query, postal_code, country) if paged else None
+    if result_set is not None:
+        _, telemetry = orchestrator.serve_cached(result_set.products)
+    else:
+        # 3. Cache or orchestration, then grouping
+        result_set, telemetry = await build_result_set(query, postal_code, country, orchestrator)
+    
+    # 4. System health: search latency and where the data came from
+    data_health = (telemetry or {}).get("data_health", {})
+    health_monitor.record_search(
+        (time.time() - start_time) * 1000,
+        live=data_health.get("live_sources", 0),
+        cached=data_health.get("cached_sources", 0),
+        synthetic=data_health.get("synthetic_sources", 0),
     )
     
+    if media_type in COLUMNAR_FORMATS:
+        # Machine clients: the page's products as one flat table
+        with span("serialize"):
+            groups, pagination = result_set.page(sort, offset, limit)
+            body = encode_columns(
+                media_type,
+                product_columns(groups, select_columns(fields)),
+                columnar_metadata(query, postal_code, country, result_set, pagination),
+            )
+        return traced_response(trace, body, media_type)
+    
     from .user_persona import get_reorder_suggestions
     
-    # Assembly
+    # 5. Insights and related products for this pincode (reused by its later pages)
+    view = local_view(result_set, query, postal_code, country)
+    
+    if telemetry is not None:
+        # Phases so far (serialization can only be reported in the header)
+        telemetry = {**telemetry, "trace": trace.to_dict()}
+    
+    with span("serialize"):
+        per_request = request_payload(
+            compact, fields,
+            system_health=health_monitor.get_health(),
+            agent_telemetry=telemetry,
+            user_persona=persona,
+            smart_reorder=get_reorder_suggestions(session_id),
+        )
+        if media_type == JSON and negotiate(accept_encoding) == "gzip":
+            # The page is compressed once per view; only the per-request fields are new.
+            # Clients that prefer br get it from CompressionMiddleware instead.
+            page = (compact, offset, limit, sort, fields, paged)
+            prefix = view.encoded_page(page)
+            if prefix is None:
+                payload = page_payload(query, postal_code, country, result_set, view, compact,
+                                       offset, limit, sort, fields, include_pagination=paged)
+                prefix = GzipPrefix(encode_payload(JSON, payload, compact)[:-1])  # open: no "}"
+                view.add_encoded_page(page, prefix)
+            members = encode_payload(JSON, per_request, compact)[1:-1]
+            separator = (b"," if compact else b", ") if members and prefix.size > 1 else b""
+            tail = separator + members + b"}"
+            body = prefix.finish(tail)
+            encoded_body_cache.record_spliced(prefix, tail, body)
+            return traced_response(trace, body, media_type, encoding="gzip")
+        
+        clean_dict = page_payload(query, postal_code, country, result_set, view, compact,
+                                  offset, limit, sort, fields, include_pagination=paged)
+        clean_dict.update(per_request)
+        # Final safety: encode_payload escapes surrogates into \uXXXX (JSON)
+        body = encode_payload(media_type, clean_dict, compact)
+    return traced_response(trace, body, media_type)
+
+
+def traced_response(trace, body: bytes, media_type: str, encoding: Optional[str] = None) -> Response:
+    """Close the request's trace: Server-Timing header + sampled export."""
+    trace.finish()
+    trace_exporter.maybe_export(trace)
+    headers = {"Vary": "Accept", "Server-Timing": server_timing(trace)}
+    if encoding is not None:
+        # Already compressed: CompressionMiddleware passes it through
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept, Accept-Encoding"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def columnar_metadata(query: str, postal_code: str, country: CountryCode, result_set: ResultSet,
+                      pagination: Dict) -> Dict:
+    """The search identity sent alongside a columnar product table."""
+    return {
+        "query": query,
+        "postal_code": postal_code,
+        "country": country.value,
+        "currency": COUNTRY_CONFIG[country]["currency"],
+        "total_results": result_set.total_results,
+        "pagination": pagination,
+    }
+
+
+# SearchResponse fields that change with every request, so never part of a cached page
+REQUEST_FIELDS = ("system_health", "agent_telemetry", "user_persona", "smart_reorder")
+
+
+def search_payload(query: str, postal_code: str, country: CountryCode, result_set: ResultSet,
+                   view: LocalView, compact: bool = False, offset: int = 0, limit: Optional[int] = None,
+                   sort: Optional[str] = None, fields: Optional[str] = None,
+                   include_pagination: bool = False, **per_request) -> Dict:
+    """Cut one page from a result set and shape it as a (JSON-ready) SearchResponse dict."""
+    clean_dict = page_payload(query, postal_code, country, result_set, view, compact,
+                              offset, limit, sort, fields, include_pagination)
+    clean_dict.update(request_payload(compact, fields, **per_request))
+    return clean_dict
+
+
+def request_payload(compact: bool = False, fields: Optional[str] = None, **per_request) -> Dict:
+    """The REQUEST_FIELDS of a SearchResponse (model defaults for any not given), shaped like the page."""
+    payload = {
+        name: per_request[name] if name in per_request
+        else SearchResponse.model_fields[name].get_default(call_default_factory=True)
+        for name in REQUEST_FIELDS
+    }
+    payload = sanitize_data(jsonable_encoder(payload))
+    if compact:
+        payload = drop_nulls(payload)
+    if fields:
+        payload = project(payload, parse_fields(fields))
+    return payload
+
+
+def page_payload(query: str, postal_code: str, country: CountryCode, result_set: ResultSet,
+                 view: LocalView, compact: bool = False, offset: int = 0, limit: Optional[int] = None,
+                 sort: Optional[str] = None, fields: Optional[str] = None,
+                 include_pagination: bool = False) -> Dict:
+    """A SearchResponse dict without its REQUEST_FIELDS: the same for every request for this page."""
+    country_config = COUNTRY_CONFIG[country]
+    groups, pagination = result_set.page(sort, offset, limit)
+    
+    # Assembly (groups, related products and insights are already JSON-ready)
     response_obj = SearchResponse(
         query=query,
         postal_code=postal_code,
@@ -169,25 +534,110 @@ async def perform_search(query: str, postal_code: str, country: CountryCode, ses
         location_name=get_location_name(postal_code, country),
         currency=country_config["currency"],
         currency_symbol=country_config["symbol"],
-        total_results=sum(len(g.products) for g in product_groups),
-        product_groups=product_groups,
-        related_products=related,
-        insights=insights,
-        system_health=health_monitor.get_health(),
-        agent_telemetry=telemetry,
-        user_persona=persona,
-        smart_reorder=get_reorder_suggestions(session_id)
+        total_results=result_set.total_results,
+        product_groups=[],
     )
     
     # Final assembly and sanitization
     # We use jsonable_encoder to safely convert Pydantic/complex objects to standard dicts/lists
-    clean_dict = sanitize_data(jsonable_encoder(response_obj))
+    clean_dict = sanitize_data(jsonable_encoder(response_obj, exclude=set(REQUEST_FIELDS)))
+    clean_dict["product_groups"] = groups
+    clean_dict["related_products"] = view.related
+    clean_dict["insights"] = view.insights
+    if compact:
+        # Compact clients also get no whitespace between tokens (see callers)
+        clean_dict = compact_search_payload(clean_dict)
+    if fields:
+        clean_dict = project(clean_dict, parse_fields(fields))
+    if include_pagination:
+        clean_dict["pagination"] = pagination
+    return clean_dict
+
+
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest, accept: Optional[str] = Header(default=None)):
+    """
+    Price many (query, pincode) pairs in one call. Results stream back as
+    NDJSON, one line per item ({"index": i, ...}) in completion order,
+    followed by a {"summary": ...} line. MessagePack and columnar clients get
+    the same stream in their format (see wire_formats).
+    """
+    media_type = negotiate_format(accept)
+    return StreamingResponse(
+        stream_batch(request, media_type),
+        media_type="application/x-ndjson" if media_type == JSON else media_type,
+        headers={"Vary": "Accept"},
+    )
+
+
+async def stream_batch(request: BatchSearchRequest, media_type: str = JSON):
+    """
+    The whole batch is one outbound flow (one fair-queue share, one retry
+    budget) over the shared connection pool. Items that resolve to the same
+    result key (canonical query + zone) are looked up, scraped and grouped
+    once; insights and related products are still per item (exact query and
+    pincode, see result_sets.LocalView).
+    """
+    started = time.time()
+    flow = begin_flow(f"batch:{len(request.items)}")
+    encoder = BatchEncoder(media_type, select_columns(request.fields), request.compact)
+    
+    # Deduplicate: result key -> indices of the items that share it
+    members: Dict[Tuple[str, str], list] = {}
+    for index, item in enumerate(request.items):
+        members.setdefault(result_sets.key(item.query, item.postal_code, item.country), []).append(index)
     
-    # Final safety: use json.dumps with ensure_ascii=True to escape surrogates into \uXXXX
-    import json
-    from fastapi import Response
-    json_str = json.dumps(clean_dict, ensure_ascii=True)
-    return Response(content=json_str, media_type="application/json")
+    gate = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def resolve(key, item):
+        async with gate:
+            try:
+                result_set = result_sets.get(item.query, item.postal_code, item.country)
+                if result_set is None:
+                    orchestrator = OrchestratorAgent(item.query, item.postal_code, item.country.value, flow)
+                    result_set, _ = await build_result_set(item.query, item.postal_code, item.country, orchestrator)
+                return key, result_set, None
+            except Exception as e:
+                print(f"⚠️ Batch item '{item.query}' failed: {e}")
+                return key, None, str(e)
+    
+    tasks = [
+        asyncio.ensure_future(resolve(key, request.items[indices[0]]))
+        for key, indices in members.items()
+    ]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, result_set, error = await next_done
+            for index in members[key]:
+                item = request.items[index]
+                if result_set is None:
+                    failed += 1
+                    yield encoder.error(index, {"query": item.query, "postal_code": item.postal_code, "error": error})
+                elif encoder.columnar:
+                    groups, pagination = result_set.page(request.sort, 0, request.limit)
+                    yield encoder.item(
+                        index,
+                        table=product_columns(groups, encoder.columns),
+                        metadata=columnar_metadata(item.query, item.postal_code, item.country, result_set, pagination),
+                    )
+                else:
+                    view = local_view(result_set, item.query, item.postal_code, item.country)
+                    yield encoder.item(index, search_payload(
+                        item.query, item.postal_code, item.country, result_set, view,
+                        request.compact, 0, request.limit, request.sort, request.fields,
+                    ))
+        summary = {
+            "items": len(request.items),
+            "unique_searches": len(members),
+            "failed": failed,
+            "elapsed_ms": round((time.time() - started) * 1000, 1),
+        }
+        yield encoder.summary(summary)
+    finally:
+        # Client went away mid-stream: stop scraping for it
+        for task in tasks:
+            task.cancel()
 
 
 def group_and_compare_products(products: list[ProductResult], symbol: str) -> list[ProductGroup]:
@@ -4,7 +4,9 @@ Uses thefuzz for fuzzy string matching to group identical products
 with different titles across platforms.
 """
 from rapidfuzz import fuzz, process
+from functools import lru_cache
 from typing import List, Tuple, Dict, Optional
+import os
 import re
 
 
@@ -35,6 +37,13 @@ def normalize_product_title(title: str) -> str:
     return title
 
 
+# Normalize units map
+UNIT_MAP = {
+    'gm': 'g', 'gram': 'g', 'kgs': 'kg', 'liter': 'l', 'litre': 'l',
+    'ml': 'ml', 'pcs': 'pcs', 'pack': 'pack'
+}
+
+
 def extract_product_attributes(title: str) -> Dict[str, Optional[str]]:
     """
     Extract key attributes from product title.
@@ -46,12 +55,6 @@ def extract_product_attributes(title: str) -> Dict[str, Optional[str]]:
         'unit': None,
     }
     
-    # Normalize units map
-    unit_map = {
-        'gm': 'g', 'gram': 'g', 'kgs': 'kg', 'liter': 'l', 'litre': 'l',
-        'ml': 'ml', 'pcs': 'pcs', 'pack': 'pack'
-    }
-
     # 1. Handle "Pack of X" specifically
     pack_match = re.search(r'pack of\s*(\d+)', title, re.IGNORECASE)
     if pack_match:
@@ -64,7 +67,7 @@ def extract_product_attributes(title: str) -> Dict[str, Optional[str]]:
             qty = quantity_match.group(1)
             unit = quantity_match.group(2).lower()
             attributes['quantity'] = qty
-            attributes['unit'] = unit_map.get(unit, unit)
+            attributes['unit'] = UNIT_MAP.get(unit, unit)
     
     # First word is often the brand
     words = title.split()
@@ -220,6 +223,84 @@ def get_canonical_title(titles: List[str]) -> str:
     return max(titles, key=lambda t: len(t.split()))
 
 
+# ============================================================
+# QUERY CANONICALIZATION (cache / coalescing / pre-warm keys)
+# ============================================================
+
+# Words that never change what the platforms return
+QUERY_STOPWORDS = {
+    "a", "an", "the", "of", "for", "with", "and", "in", "on", "to",
+    "buy", "online", "best", "price", "cheap", "near", "me",
+}
+
+# Token-level synonyms, applied after unit normalization.
+# Extend with QUERY_SYNONYMS="doodh=milk,aata=atta".
+QUERY_SYNONYMS = {
+    "doodh": "milk",
+    "anda": "egg",
+    "eggs": "egg",
+    "chawal": "rice",
+    "aata": "atta",
+    "dahi": "curd",
+    "t-shirt": "tshirt",
+    "tees": "tshirt",
+    "earphones": "earphone",
+    "headphones": "headphone",
+    "chargers": "charger",
+}
+
+
+def _load_synonym_overrides(spec: Optional[str]):
+    for item in (spec or "").split(","):
+        word, _, canonical = item.partition("=")
+        if word.strip() and canonical.strip():
+            QUERY_SYNONYMS[word.strip().lower()] = canonical.strip().lower()
+
+
+_load_synonym_overrides(os.environ.get("QUERY_SYNONYMS"))
+
+# Quantities are folded into one base unit per dimension ("1 kg" == "1000g")
+_QUERY_UNIT_SCALE = {"g": ("g", 1), "kg": ("g", 1000), "ml": ("ml", 1), "l": ("ml", 1000)}
+_QUERY_QTY_RE = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(kgs|kg|gms|gm|grams|gram|g|ml|litres|liters|litre|liter|ltr|l|pcs|pc)\b'
+)
+
+
+def _normalize_quantity(match: "re.Match") -> str:
+    qty = float(match.group(1))
+    unit = match.group(2)
+    unit = {"gms": "gm", "grams": "gram", "litres": "litre", "liters": "liter",
+            "ltr": "l", "pc": "pcs"}.get(unit, unit)
+    unit = UNIT_MAP.get(unit, unit)
+    base, scale = _QUERY_UNIT_SCALE.get(unit, (unit, 1))
+    qty = round(qty * scale, 3)
+    return f" {int(qty) if qty.is_integer() else qty}{base} "
+
+
+@lru_cache(maxsize=8192)
+def canonicalize_query(query: str) -> str:
+    """
+    Canonical form of a search query for keying caches, coalescing and
+    pre-warming — never sent to a platform.
+    "Amul Butter 500g", "amul butter 500 gm" and "butter amul 500g"
+    all become "500g amul butter".
+    """
+    from .scrapers import clean_search_query
+
+    text = clean_search_query(query).lower()
+    text = _QUERY_QTY_RE.sub(_normalize_quantity, text)
+    text = re.sub(r"[^\w\s.-]", " ", text)
+
+    tokens = set()
+    for token in text.split():
+        token = token.strip(".-")
+        if not token or token in QUERY_STOPWORDS:
+            continue
+        tokens.add(QUERY_SYNONYMS.get(token, token))
+
+    return " ".join(sorted(tokens)) or query.lower().strip()
+
+
 # Example usage and testing
 if __name__ == "__main__":
     # Test cases
@@ -0,0 +1,250 @@
+"""
+Metrics — Prometheus text exposition for /metrics
+Counters are plain dict increments: everything that touches them runs on the
+event loop thread, and an increment has no await in it, so no locks are
+needed. Values the services already track (cache stats, circuit state,
+sessions, latency histograms) are not duplicated into counters: collectors
+read them when /metrics is scraped.
+
+  metrics_registry.counter(name, help, labels)   push-style counter family
+  metrics_registry.register(fn)                  pull-style collector; fn()
+                                                 returns MetricFamily objects
+
+Rendered in the Prometheus text format (version 0.0.4).
+
+Under the launcher every worker accepts on the same socket, so a scrape of
+/metrics lands on whichever worker the kernel picks. The launcher therefore
+points the registry at a directory shared by its workers (share()); each
+worker writes a snapshot of its families to <dir>/<pid>.json every
+METRICS_SNAPSHOT_SECONDS, and the worker that answers a scrape merges all
+snapshots, its own freshly taken:
+
+  counters, histograms   summed across workers (exited workers included,
+                         so totals never go backwards on a respawn)
+  gauges                 one series per live worker, labelled worker=<pid>
+
+Other workers' values are therefore up to METRICS_SNAPSHOT_SECONDS old.
+Families are collected on the event loop (collectors read loop-owned state);
+the snapshot files are written and read in a thread, so a slow disk never
+stalls the loop.
+
+Configuration (environment):
+  METRICS_SNAPSHOT_SECONDS   how often workers write their snapshot  (5)
+"""
+
+import asyncio
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "parallax_"
+METRICS_SNAPSHOT_SECONDS = float(os.environ.get("METRICS_SNAPSHOT_SECONDS", 5))
+
+Labels = Dict[str, str]
+
+
+class MetricFamily:
+    """One metric name with its type, help text and samples."""
+
+    def __init__(self, name: str, kind: str, documentation: str):
+        self.name = PREFIX + name
+        self.kind = kind  # counter, gauge, histogram
+        self.documentation = documentation
+        self.samples: List[Tuple[str, Labels, float]] = []  # (suffix, labels, value)
+
+    def add(self, value: float, labels: Optional[Labels] = None, suffix: str = "") -> "MetricFamily":
+        self.samples.append((suffix, labels or {}, value))
+        return self
+
+
+class Counter:
+    """A counter family keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        key = tuple(str(v) for v in labelvalues)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, "counter", self.documentation)
+        for key, value in sorted(self._values.items()):
+            family.add(value, dict(zip(self.labelnames, key)))
+        return family
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Dict[int, List[MetricFamily]]) -> List[MetricFamily]:
+    """Combine per-worker families (see module docstring for the rules)."""
+    merged: Dict[str, MetricFamily] = {}
+    sums: Dict[str, Dict[Tuple, float]] = {}
+    for pid, families in sorted(snapshots.items()):
+        alive = _pid_alive(pid)
+        for family in families:
+            target = merged.get(family.name)
+            if target is None:
+                target = merged[family.name] = MetricFamily("", family.kind, family.documentation)
+                target.name = family.name
+                sums[family.name] = {}
+            for suffix, labels, value in family.samples:
+                if family.kind == "gauge":
+                    if alive:
+                        target.add(value, {**labels, "worker": str(pid)}, suffix)
+                    continue
+                key = (suffix, tuple(labels.items()))
+                sums[family.name][key] = sums[family.name].get(key, 0.0) + value
+    for name, family in merged.items():
+        for (suffix, labels), value in sums[name].items():
+            family.add(value, dict(labels), suffix)
+    return list(merged.values())
+
+
+class MetricsRegistry:
+    """Every counter and collector of this worker."""
+
+    def __init__(self):
+        self._counters: List[Counter] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self.shared_dir: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        counter = Counter(name, documentation, labelnames)
+        self._counters.append(counter)
+        return counter
+
+    def register(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+        return collector
+
+    def collect(self) -> List[MetricFamily]:
+        families = [c.collect() for c in self._counters]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:  # one broken collector must not hide the rest
+                print(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    # --- Cross-worker aggregation ---
+
+    def share(self, directory: str):
+        """Aggregate with every process that shares `directory` (called before forking)."""
+        # Snapshots of a previous run would otherwise be summed into this one
+        for entry in os.listdir(directory):
+            if entry.endswith((".json", ".json.tmp")):
+                os.remove(os.path.join(directory, entry))
+        self.shared_dir = directory
+
+    def write_snapshot(self, families: List[MetricFamily]):
+        """Publish this worker's families for the others (atomic replace). Blocking I/O."""
+        if self.shared_dir is None:
+            return
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        data = [[f.name, f.kind, f.documentation, f.samples] for f in families]
+        try:
+            with open(path + ".tmp", "w") as fh:
+                json.dump(data, fh)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️ Metrics snapshot {path} not written: {e}")
+
+    def read_snapshots(self) -> Dict[int, List[MetricFamily]]:
+        """Every worker's last snapshot, keyed by pid. Blocking I/O."""
+        snapshots: Dict[int, List[MetricFamily]] = {}
+        for entry in os.listdir(self.shared_dir):
+            stem, ext = os.path.splitext(entry)
+            if ext != ".json" or not stem.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, entry)) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue  # being replaced, or written by a worker that died mid-write
+            families = []
+            for name, kind, documentation, samples in data:
+                family = MetricFamily("", kind, documentation)
+                family.name = name
+                family.samples = [(suffix, labels, value) for suffix, labels, value in samples]
+                families.append(family)
+            snapshots[int(stem)] = families
+        return snapshots
+
+    def _exchange(self, families: List[MetricFamily]) -> List[MetricFamily]:
+        """Publish our snapshot and merge everyone's (runs in a thread)."""
+        self.write_snapshot(families)
+        snapshots = self.read_snapshots()
+        snapshots[os.getpid()] = families  # in case our own file could not be written
+        return merge_snapshots(snapshots)
+
+    async def families(self) -> List[MetricFamily]:
+        """This worker's families, or every worker's merged when shared."""
+        families = self.collect()
+        if self.shared_dir is None:
+            return families
+        return await asyncio.to_thread(self._exchange, families)
+
+    async def _publish(self):
+        if self.shared_dir is not None:
+            await asyncio.to_thread(self.write_snapshot, self.collect())
+
+    async def _run_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self._publish()
+
+    def start(self, interval: float = METRICS_SNAPSHOT_SECONDS):
+        if self.shared_dir is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run_forever(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._publish()  # final counters survive the worker
+
+    async def render(self) -> str:
+        lines = []
+        for family in await self.families():
+            lines.append(f"# HELP {family.name} {_escape(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in family.samples:
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                name = family.name + suffix
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+metrics_registry = MetricsRegistry()
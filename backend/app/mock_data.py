@@ -3,6 +3,7 @@ Multi-Region Mock Data with Popular Delivery Apps
 """
 import random
 import hashlib
+from functools import lru_cache
 from typing import List
 from .models import (
     ProductResult, PriceBreakdown, PlatformType, DeliverySpeed, 
@@ -424,8 +425,13 @@ PLATFORM_CONFIGS = {
 
 
 # Sample products with regional pricing
+@lru_cache(maxsize=None)
 def get_sample_products(country: CountryCode):
-    """Get sample products with prices appropriate for each country"""
+    """
+    Get sample products with prices appropriate for each country.
+    Built once per country (the launcher warms all of them before forking);
+    callers must treat the returned dict as read-only.
+    """
     
     # Comprehensive product catalog with USD base prices
     base_products = {
@@ -602,30 +608,8 @@ def format_eta(minutes: int) -> str:
 
 def get_mock_image(title: str) -> str:
     """Get a category-appropriate mock image URL based on product title"""
-    title_lower = title.lower()
-    
-    # Mapping of keywords to reliable Unsplash placeholder images
-    mapping = {
-        "milk": "https://images.unsplash.com/photo-1563636619-e910ef2a844b?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "iphone": "https://images.unsplash.com/photo-1592750475338-74b7022d9503?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "phone": "https://images.unsplash.com/photo-1511707171634-5f897ff02aa9?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "laptop": "https://images.unsplash.com/photo-1496181133206-80ce9b88a853?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "watch": "https://images.unsplash.com/photo-1523275335684-37898b6baf30?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "headphone": "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "earbuds": "https://images.unsplash.com/photo-1590658268037-6bf12165a8df?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "charger": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "adapter": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "sneakers": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "lamp": "https://images.unsplash.com/photo-1507473885765-e6ed03a2748e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "crystal": "https://images.unsplash.com/photo-1614850523296-d8c1af93d400?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-    }
-    
-    for key, url in mapping.items():
-        if key in title_lower:
-            return url
-            
-    # Default fallback for electronics/gadgets
-    return "https://images.unsplash.com/photo-1526738549149-8e07eca6c147?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80"
+    from .scrapers import get_mock_image as _get_mock_image
+    return _get_mock_image(title)
 
 
 def search_mock_products(query: str, postal_code: str, country: CountryCode) -> List[ProductResult]:
@@ -1,7 +1,7 @@
 """
 Pydantic models for the API - Multi-Region with Popular Delivery Apps
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -253,10 +253,35 @@ class ProductGroup(BaseModel):
     savings_message: Optional[str] = None
 
 
+# /search sort keys (directions and semantics in result_sets.SORT_KEYS)
+SORT_PATTERN = "^-?(landed_cost|eta|unit_price|rating)$"
+
+
 class SearchRequest(BaseModel):
     query: str
     postal_code: str
     country: CountryCode = CountryCode.IN
+    compact: bool = False  # see responses.compact_search_payload
+    # Paging / sorting / projection over product_groups (see result_sets)
+    offset: int = Field(default=0, ge=0)
+    limit: Optional[int] = Field(default=None, ge=1, le=100)
+    sort: Optional[str] = Field(default=None, pattern=SORT_PATTERN)
+    fields: Optional[str] = None
+
+
+class BatchSearchItem(BaseModel):
+    query: str
+    postal_code: str
+    country: CountryCode = CountryCode.IN
+
+
+class BatchSearchRequest(BaseModel):
+    items: List[BatchSearchItem] = Field(..., min_length=1, max_length=500)
+    # Applied to every item (see SearchRequest)
+    compact: bool = False
+    limit: Optional[int] = Field(default=None, ge=1, le=100)
+    sort: Optional[str] = Field(default=None, pattern=SORT_PATTERN)
+    fields: Optional[str] = None
 
 
 class RelatedProduct(BaseModel):
@@ -0,0 +1,455 @@
+"""
+Outbound Scheduler — per-platform rate limits + global concurrency cap
+Every /search fans out to 12 platforms and /cart/optimize to 12 × items.
+Unthrottled bursts get our egress IPs blocked, which costs far more latency
+than a short queue. All live scrapes therefore pass through one scheduler:
+
+  1. per-platform token bucket (rate, burst) — configured in scrapers.py
+  2. global cap on concurrent outbound scrapes (OUTBOUND_MAX_CONCURRENCY)
+  3. fair queuing: waiting scrapes are granted round-robin across flows
+     (one flow per incoming request), so a 20-item cart cannot starve
+     the single searches queued behind it
+
+Time spent waiting is accumulated on the flow and surfaced in AgentLog.
+Waiting counts against the scrape's deadline: a scrape that cannot get its
+token or slot in time gives up (asyncio.TimeoutError) instead of queueing
+past it, and a token reserved by a waiter that gives up or is cancelled is
+returned to the bucket.
+
+Rate limits are per process. The launcher divides them across its workers
+(share_limits) so a node as a whole stays within the configured rates; the
+concurrency cap and the AIMD limits stay per worker.
+
+On top of the static rate limits, each platform has an AIMD controller:
+its concurrency limit grows additively on success and halves on errors
+(timeouts, blocks, 429s), and its scrape timeout follows the observed p99
+latency instead of a fixed 10-15s.
+
+Hedging: for latency-critical platforms the scrapers may send a second
+request once the first has outlived the platform's p95. Hedges are paid for
+from a budget that accrues HEDGE_BUDGET_RATIO tokens per scrape (so at most
+~10% extra traffic) and never borrow against the rate limit.
+
+Retries: transient failures (connection resets, 5xx) are retried per the
+platform's RetryPolicy with decorrelated-jitter backoff. Each incoming request
+gets RETRY_BUDGET_PER_REQUEST retries to share across all of its scrapes, so
+a platform outage cannot multiply our outbound traffic.
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.time()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def refund(self):
+        """Give back a token that was taken but not used."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """
+        Take one token, sleeping until it is available. Returns False, without
+        taking it, if that would take longer than `max_wait` seconds — so the
+        debt never exceeds what the waiters' deadlines allow.
+        """
+        self._refill()
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            return False
+        # Reserve the token (balance may go negative); wait until it would have refilled
+        self.tokens -= 1
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+        return True
+
+
+class AdaptiveController:
+    """AIMD concurrency limit + p99-derived timeout for one platform."""
+
+    WINDOW = 200
+    MIN_SAMPLES = 20
+    MIN_TIMEOUT = 1.0
+    TIMEOUT_HEADROOM = 1.5
+
+    def __init__(self, static_timeout: float, initial_limit: float = 4.0,
+                 min_limit: float = 1.0, max_limit: float = 16.0):
+        self.static_timeout = static_timeout
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latencies: Deque[float] = deque(maxlen=self.WINDOW)
+        self._errors: Deque[int] = deque(maxlen=self.WINDOW)
+
+    # --- Concurrency gate ---
+
+    async def acquire(self):
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    # --- Feedback ---
+
+    def observe(self, latency: float, error: bool):
+        self._latencies.append(latency)
+        self._errors.append(1 if error else 0)
+        if error:
+            self.limit = max(self.min_limit, self.limit * 0.5)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered: List[float] = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def timeout(self) -> float:
+        if len(self._latencies) < self.MIN_SAMPLES:
+            return self.static_timeout
+        p99 = self.percentile(0.99)
+        return max(self.MIN_TIMEOUT, min(self.static_timeout, p99 * self.TIMEOUT_HEADROOM))
+
+    def get_stats(self) -> Dict:
+        def ms(v):
+            return round(v * 1000, 1) if v is not None else None
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.inflight,
+            "queued": len(self._waiters),
+            "timeout_s": round(self.timeout, 2),
+            "p50_ms": ms(self.percentile(0.50)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "error_rate": round(sum(self._errors) / len(self._errors), 3) if self._errors else 0.0,
+            "samples": len(self._latencies),
+        }
+
+
+class RetryPolicy:
+    """
+    Max attempts + decorrelated-jitter backoff (sleep = U(base, 3 × previous),
+    capped): spreads retries out without synchronising clients on a schedule.
+    """
+
+    def __init__(self, max_attempts: int = 2, base_delay: float = 0.1, max_delay: float = 1.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def next_delay(self, previous: Optional[float] = None) -> float:
+        previous = previous or self.base_delay
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+RETRY_BUDGET_PER_REQUEST = int(os.environ.get("RETRY_BUDGET_PER_REQUEST", 6))
+
+
+class Flow:
+    """One incoming request's share of the outbound scheduler."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str = ""):
+        self.id = next(self._ids)
+        self.name = name
+        self.wait_seconds = 0.0
+        self.requests = 0
+        self.retry_budget = RETRY_BUDGET_PER_REQUEST
+        self.retries = 0
+
+    @property
+    def queue_wait_ms(self) -> float:
+        return round(self.wait_seconds * 1000, 1)
+
+
+_current_flow: ContextVar[Optional[Flow]] = ContextVar("outbound_flow", default=None)
+
+
+def begin_flow(name: str = "") -> Flow:
+    """
+    Start a flow for the current request. Tasks spawned afterwards
+    (asyncio.gather) inherit it, so all of a request's scrapes share it.
+    """
+    flow = Flow(name)
+    _current_flow.set(flow)
+    return flow
+
+
+def join_flow(flow: Flow) -> Flow:
+    """Make an existing flow current (work done on behalf of a batch or cart)."""
+    _current_flow.set(flow)
+    return flow
+
+
+HEDGE_BUDGET_RATIO = 0.1
+HEDGE_BUDGET_MAX = 10.0
+
+
+class OutboundScheduler:
+    def __init__(self, max_concurrency: int = 32, hedging: bool = True):
+        self.max_concurrency = max_concurrency
+        self.hedging = hedging
+        self._hedge_tokens = 0.0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._limits: Dict[str, Tuple[float, float]] = {}
+        self._workers = 1  # processes sharing the configured rates (see share_limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._adaptive: Dict[str, AdaptiveController] = {}
+        self._retry_policies: Dict[str, RetryPolicy] = {}
+        self.retry_stats = {"retried": 0, "recovered": 0, "budget_exhausted": 0, "deadline_skipped": 0}
+        self._active = 0
+        # flow id -> waiters, in round-robin order
+        self._waiting: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+        self.total_wait_seconds = 0.0
+        self.total_requests = 0
+
+    def configure(self, limits: Dict[str, Tuple[float, float]],
+                  timeouts: Optional[Dict[str, float]] = None,
+                  retries: Optional[Dict[str, RetryPolicy]] = None):
+        """
+        Set {platform: (requests_per_second, burst)}, the static
+        {platform: timeout} ceilings the adaptive timeouts start from, and
+        {platform: RetryPolicy}.
+        """
+        for platform, (rate, burst) in limits.items():
+            self._limits[platform] = (rate, burst)
+            self._buckets[platform] = self._bucket(rate, burst)
+        for platform, timeout in (timeouts or {}).items():
+            self._adaptive[platform] = AdaptiveController(timeout)
+        self._retry_policies.update(retries or {})
+
+    def _bucket(self, rate: float, burst: float) -> TokenBucket:
+        return TokenBucket(rate / self._workers, max(1.0, burst / self._workers))
+
+    def share_limits(self, workers: int):
+        """Split every rate limit across `workers` processes (called before forking)."""
+        self._workers = max(1, workers)
+        for platform, (rate, burst) in self._limits.items():
+            self._buckets[platform] = self._bucket(rate, burst)
+
+    def timeout_for(self, platform: str, default: float = 15.0) -> float:
+        controller = self._adaptive.get(platform)
+        return controller.timeout if controller is not None else default
+
+    def observe(self, platform: str, latency: float, error: bool):
+        """Feed one scrape outcome back into the platform's AIMD controller."""
+        controller = self._adaptive.get(platform)
+        if controller is not None:
+            controller.observe(latency, error)
+
+    # --- Hedging ---
+
+    def hedge_delay(self, platform: str) -> Optional[float]:
+        """When to hedge a request still in flight: the platform's rolling p95."""
+        controller = self._adaptive.get(platform)
+        if not self.hedging or controller is None:
+            return None
+        if len(controller._latencies) < controller.MIN_SAMPLES:
+            return None
+        return controller.percentile(0.95)
+
+    def try_hedge(self, platform: str) -> bool:
+        """Spend one hedge token (and one rate-limit token, without waiting)."""
+        if self._hedge_tokens < 1:
+            return False
+        bucket = self._buckets.get(platform)
+        if bucket is not None:
+            if not bucket.available():
+                return False
+            bucket.take()
+        self._hedge_tokens -= 1
+        self.hedges_sent += 1
+        return True
+
+    def record_hedge_win(self):
+        self.hedges_won += 1
+
+    # --- Retries ---
+
+    def retry_policy(self, platform: str) -> RetryPolicy:
+        return self._retry_policies.get(platform, NO_RETRY)
+
+    def claim_retry(self) -> bool:
+        """Spend one retry from the current request's budget."""
+        flow = _current_flow.get()
+        if flow is not None:
+            if flow.retry_budget <= 0:
+                self.retry_stats["budget_exhausted"] += 1
+                return False
+            flow.retry_budget -= 1
+            flow.retries += 1
+        self.retry_stats["retried"] += 1
+        return True
+
+    # --- Fair concurrency slots ---
+
+    async def _acquire_slot(self, flow: Flow):
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(flow.id, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release_slot()  # slot was already handed to us
+            else:
+                waiters = self._waiting.get(flow.id)
+                if waiters is not None and fut in waiters:
+                    waiters.remove(fut)
+                    if not waiters:
+                        del self._waiting[flow.id]
+            raise
+
+    def _release_slot(self):
+        # Hand the slot straight to the next flow in round-robin order
+        while self._waiting:
+            flow_id, waiters = next(iter(self._waiting.items()))
+            fut = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(flow_id)
+            else:
+                del self._waiting[flow_id]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, platform: str, deadline: Optional[float] = None):
+        """
+        Hold one outbound slot for a scrape against `platform`. Raises
+        asyncio.TimeoutError if the token and slot cannot both be had by
+        `deadline` (absolute time.time()).
+        """
+        flow = _current_flow.get() or Flow("anonymous")
+        started = time.time()
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.time())
+
+        bucket = self._buckets.get(platform)
+        if bucket is not None and not await bucket.acquire(remaining()):
+            raise asyncio.TimeoutError(f"{platform}: rate limit wait exceeds the deadline")
+        controller = self._adaptive.get(platform)
+        try:
+            if controller is not None:
+                await asyncio.wait_for(controller.acquire(), remaining())
+            try:
+                await asyncio.wait_for(self._acquire_slot(flow), remaining())
+            except BaseException:
+                if controller is not None:
+                    controller.release()
+                raise
+        except BaseException:
+            if bucket is not None:
+                bucket.refund()  # nothing was sent
+            raise
+        waited = time.time() - started
+        flow.wait_seconds += waited
+        flow.requests += 1
+        self.total_wait_seconds += waited
+        self.total_requests += 1
+        self._hedge_tokens = min(HEDGE_BUDGET_MAX, self._hedge_tokens + HEDGE_BUDGET_RATIO)
+        try:
+            yield
+        finally:
+            self._release_slot()
+            if controller is not None:
+                controller.release()
+
+    def get_stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": sum(len(w) for w in self._waiting.values()),
+            "queued_flows": len(self._waiting),
+            "total_requests": self.total_requests,
+            "avg_queue_wait_ms": round(self.total_wait_seconds * 1000 / self.total_requests, 1)
+            if self.total_requests else 0.0,
+            "rate_limits": {p: {"rps": r, "burst": b} for p, (r, b) in self._limits.items()},
+            "rate_limit_workers": self._workers,
+            "adaptive": {p: c.get_stats() for p, c in self._adaptive.items()},
+            "hedging": {
+                "enabled": self.hedging,
+                "sent": self.hedges_sent,
+                "won": self.hedges_won,
+                "budget_tokens": round(self._hedge_tokens, 2),
+            },
+            "retries": {
+                **self.retry_stats,
+                "budget_per_request": RETRY_BUDGET_PER_REQUEST,
+                "policies": {
+                    p: {"max_attempts": r.max_attempts, "base_ms": round(r.base_delay * 1000),
+                        "cap_ms": round(r.max_delay * 1000)}
+                    for p, r in self._retry_policies.items()
+                },
+            },
+        }
+
+
+# Global instance — platform limits are registered by scrapers.py
+outbound_scheduler = OutboundScheduler(
+    max_concurrency=int(os.environ.get("OUTBOUND_MAX_CONCURRENCY", 32)),
+    hedging=os.environ.get("OUTBOUND_HEDGING", "1") != "0",
+)
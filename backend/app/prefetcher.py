@@ -0,0 +1,171 @@
+"""
+Anticipatory Prefetcher — background warming of the PriceCache
+The persona engine predicts what a user is likely to search next (emergency
+essentials, their frequent items, related products). This module turns those
+predictions into low-priority jobs on a bounded asyncio queue; a couple of
+worker tasks run the normal orchestration for each and store the result, so
+the user's next search is a cache hit.
+
+Warming is strictly best-effort:
+  - the queue is bounded and duplicate (query, zone) jobs are coalesced
+  - jobs are dropped (not delayed) while foreground searches are in flight
+  - each platform is hit at most once per PLATFORM_MIN_INTERVAL by warming
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import CountryCode, COUNTRY_CONFIG
+from .zones import result_zone
+from .matcher import canonicalize_query
+
+
+PREFETCH_QUEUE_SIZE = 64
+PREFETCH_WORKERS = 2
+# Drop warming jobs once this many foreground scrapes are running
+MAX_FOREGROUND_FOR_PREFETCH = 2
+# Minimum spacing between warming scrapes that touch the same platform
+PLATFORM_MIN_INTERVAL = 2.0
+
+async def warm_query(query: str, pincode: str, country: CountryCode) -> bool:
+    """Run the normal orchestration for a query and store it in the PriceCache."""
+    from .data_engine import price_cache
+    from .agent_orchestrator import OrchestratorAgent
+    from .scrapers import scrape_all_platforms, get_quick_commerce_results
+
+    orchestrator = OrchestratorAgent(query, pincode, country.value)
+    products, _ = await orchestrator.orchestrate(
+        scrape_fn=scrape_all_platforms,
+        quick_commerce_fn=get_quick_commerce_results,
+        country_enum=country,
+    )
+    if not products:
+        return False
+    price_cache.put(query, pincode, products, country)
+    return True
+
+
+class Prefetcher:
+    """Bounded job queue + low-priority workers that warm the PriceCache."""
+
+    def __init__(self, maxsize: int = PREFETCH_QUEUE_SIZE, workers: int = PREFETCH_WORKERS):
+        self._maxsize = maxsize
+        self._num_workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[Tuple[str, str]] = set()
+        self._workers: List[asyncio.Task] = []
+        self._platform_next: Dict[str, float] = {}
+        self._foreground = 0
+        self.stats = {"queued": 0, "warmed": 0, "skipped": 0, "dropped": 0, "failed": 0}
+
+    # --- Load signal ---
+
+    @contextmanager
+    def foreground(self):
+        """Mark a user-facing scrape as in flight (warming backs off meanwhile)."""
+        self._foreground += 1
+        try:
+            yield
+        finally:
+            self._foreground -= 1
+
+    def under_load(self) -> bool:
+        return self._foreground >= MAX_FOREGROUND_FOR_PREFETCH
+
+    # --- Producer side ---
+
+    def submit(self, queries: Iterable[str], pincode: str, country: CountryCode = CountryCode.IN) -> int:
+        """Queue warming jobs. Never blocks; returns how many were accepted."""
+        if self._queue is None:
+            return 0  # workers not running (scripts, tests)
+        accepted = 0
+        for query in queries:
+            key = (canonicalize_query(query), result_zone(pincode, country))
+            if key in self._pending:
+                continue
+            if self.under_load() or self._queue.full():
+                self.stats["dropped"] += 1
+                continue
+            self._pending.add(key)
+            self._queue.put_nowait((query, pincode, country))
+            self.stats["queued"] += 1
+            accepted += 1
+        return accepted
+
+    # --- Worker side ---
+
+    async def _respect_rate_limits(self, country: CountryCode):
+        platforms = [p.value for p in COUNTRY_CONFIG[country]["platforms"]]
+        now = time.time()
+        wait = max((self._platform_next.get(p, 0) - now for p in platforms), default=0)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        next_allowed = time.time() + PLATFORM_MIN_INTERVAL
+        for p in platforms:
+            self._platform_next[p] = next_allowed
+
+    async def _warm(self, query: str, pincode: str, country: CountryCode):
+        from .data_engine import price_cache
+
+        if await price_cache.fetch(query, pincode, country):
+            self.stats["skipped"] += 1
+            return
+        await self._respect_rate_limits(country)
+        if self.under_load():
+            # Load arrived while we waited for the rate limit
+            self.stats["dropped"] += 1
+            return
+
+        if await warm_query(query, pincode, country):
+            self.stats["warmed"] += 1
+
+    async def _work_forever(self):
+        queue = self._queue
+        while True:
+            query, pincode, country = await queue.get()
+            try:
+                if self.under_load():
+                    self.stats["dropped"] += 1
+                else:
+                    await self._warm(query, pincode, country)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"⚠️ Prefetch failed for '{query}': {e}")
+            finally:
+                self._pending.discard((canonicalize_query(query), result_zone(pincode, country)))
+                queue.task_done()
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._work_forever()) for _ in range(self._num_workers)]
+
+    async def stop(self):
+        """Cancel workers; queued warming jobs are simply discarded."""
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._queue = None
+        self._pending.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "foreground_in_flight": self._foreground,
+        }
+
+
+# Global instance
+prefetcher = Prefetcher()
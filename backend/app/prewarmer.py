@@ -0,0 +1,218 @@
+"""
+Popularity Pre-Warmer — keeps the hottest (query, zone) pairs permanently warm
+Search traffic is heavily skewed: the morning grocery peak is the same few
+hundred queries per delivery zone. perform_search feeds every search into a
+Space-Saving sketch (bounded memory, heavy hitters guaranteed to survive);
+a background scheduler walks the top-N entries and re-scrapes any whose
+PriceCache entry is about to expire, so those queries never hit a cold scrape.
+
+Outbound traffic is capped per platform by a token bucket
+(PREWARM_PLATFORM_BUDGET scrapes per minute). A warm is charged only to the
+platforms whose per-platform entry is stale, since those are the only ones
+it re-scrapes. Counts decay periodically so the sketch follows the time of
+day instead of all-time popularity.
+
+Under the launcher only one worker warms (the launcher disables the others:
+`enabled`), so a hot key is warmed once per node, not once per worker, and
+the budget is the node's. Its sketch sees that worker's share of the
+traffic, which the kernel spreads evenly, so the hottest keys rank the same.
+
+Configuration (environment):
+  PREWARM_TOP_N            how many (query, zone) pairs to keep warm  (200)
+  PREWARM_PLATFORM_BUDGET  warming scrapes per platform per minute    (30)
+"""
+
+import asyncio
+import heapq
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .models import CountryCode, COUNTRY_CONFIG, PlatformType
+from .prefetcher import warm_query
+from .outbound import TokenBucket
+from .zones import result_zone
+from .matcher import canonicalize_query
+
+
+SKETCH_CAPACITY = 2048
+REFRESH_INTERVAL_SECONDS = 15
+# Refresh entries with less than this much TTL left (merged-set TTL is 180s)
+REFRESH_AHEAD_SECONDS = 60
+# Halve all counts this often so yesterday's peak fades out
+DECAY_INTERVAL_SECONDS = 600
+# Ignore one-off queries
+MIN_HITS = 3
+
+_Key = Tuple[str, str, CountryCode]  # (canonical query, zone, country)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch (Metwally et al.): at most `capacity`
+    counters; a new key evicts the current minimum and inherits its count,
+    which bounds the over-estimate of any tracked key by that minimum.
+
+    The minimum comes from a lazy min-heap: every count change pushes a new
+    (count, key) entry and outdated entries are skipped when popped, so an
+    update is O(log capacity) instead of a scan over every counter. The heap
+    is rebuilt from the live counts once stale entries outnumber them.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY):
+        self.capacity = capacity
+        self._counts: Dict[_Key, int] = {}
+        self._heap: List[Tuple[int, int, _Key]] = []  # (count, seq, key); seq breaks ties
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: _Key) -> bool:
+        return key in self._counts
+
+    def _push(self, key: _Key, count: int):
+        self._seq += 1
+        heapq.heappush(self._heap, (count, self._seq, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(count, i, key) for i, (key, count) in enumerate(self._counts.items())]
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+
+    def _pop_min(self) -> Tuple[_Key, int]:
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            if self._counts.get(key) == count:
+                del self._counts[key]
+                return key, count
+
+    def add(self, key: _Key, amount: int = 1):
+        counts = self._counts
+        if key in counts:
+            counts[key] += amount
+        elif len(counts) < self.capacity:
+            counts[key] = amount
+        else:
+            _, floor = self._pop_min()
+            counts[key] = floor + amount
+        self._push(key, counts[key])
+
+    def top(self, n: int) -> List[Tuple[_Key, int]]:
+        return heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
+
+    def decay(self):
+        """Halve every count, dropping keys that reach zero."""
+        self._counts = {k: c // 2 for k, c in self._counts.items() if c // 2 > 0}
+        self._rebuild()
+
+
+class PopularityPrewarmer:
+    """Refresh-ahead scheduler for the top-N (query, zone) pairs."""
+
+    def __init__(self, top_n: int = 200, platform_budget_per_min: int = 30):
+        self.top_n = top_n
+        self.sketch = SpaceSaving()
+        # Any spelling/pincode of the key will do for the re-scrape; remember the last seen
+        self._samples: Dict[_Key, Tuple[str, str]] = {}
+        self._budget_per_min = platform_budget_per_min
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_decay = time.time()
+        self.enabled = True
+        self.stats = {"refreshed": 0, "fresh": 0, "over_budget": 0, "failed": 0}
+
+    def record(self, query: str, pincode: str, country: CountryCode = CountryCode.IN):
+        """Feed one foreground search into the popularity sketch."""
+        query = query.strip()
+        if query and self.enabled:
+            key = (canonicalize_query(query), result_zone(pincode, country), country)
+            self.sketch.add(key)
+            self._samples[key] = (query, pincode.strip())
+
+    def _bucket(self, platform: str) -> TokenBucket:
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            bucket = TokenBucket(self._budget_per_min / 60.0, self._budget_per_min)
+            self._buckets[platform] = bucket
+        return bucket
+
+    def _claim_budget(self, platforms: List[PlatformType]) -> bool:
+        """One token from each platform the warm will actually scrape, or none at all."""
+        buckets = [self._bucket(p.value) for p in platforms]
+        if not all(b.available() for b in buckets):
+            return False
+        for b in buckets:
+            b.take()
+        return True
+
+    async def refresh_once(self) -> int:
+        """One scheduler pass. Returns the number of entries re-scraped."""
+        from .data_engine import price_cache
+
+        if time.time() - self._last_decay >= DECAY_INTERVAL_SECONDS:
+            self.sketch.decay()
+            self._last_decay = time.time()
+        if len(self._samples) > len(self.sketch):
+            self._samples = {k: v for k, v in self._samples.items() if k in self.sketch}
+
+        refreshed = 0
+        for key, hits in self.sketch.top(self.top_n):
+            if hits < MIN_HITS:
+                break  # sorted by count: the rest are colder still
+            sample = self._samples.get(key)
+            if sample is None:
+                continue
+            query, pincode = sample
+            country = key[2]
+            if await price_cache.time_to_expiry(query, pincode, country) > REFRESH_AHEAD_SECONDS:
+                self.stats["fresh"] += 1
+                continue
+            stale = await price_cache.stale_platforms(query, pincode, COUNTRY_CONFIG[country]["platforms"])
+            if not self._claim_budget(stale):
+                self.stats["over_budget"] += 1
+                break  # hottest first; colder keys wait for the next pass
+            try:
+                if await warm_query(query, pincode, country):
+                    refreshed += 1
+                    self.stats["refreshed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"⚠️ Pre-warm failed for '{query}' @ {pincode}: {e}")
+        return refreshed
+
+    async def _run_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh_once()
+
+    def start(self, interval: float = REFRESH_INTERVAL_SECONDS):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run_forever(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "tracked_keys": len(self.sketch),
+            "top_n": self.top_n,
+            "platform_budget_per_min": self._budget_per_min,
+        }
+
+
+# Global instance
+prewarmer = PopularityPrewarmer(
+    top_n=int(os.environ.get("PREWARM_TOP_N", 200)),
+    platform_budget_per_min=int(os.environ.get("PREWARM_PLATFORM_BUDGET", 30)),
+)
@@ -0,0 +1,213 @@
+"""
+On-Demand Request Profiler — admin-only profiling of a single /search
+A slow query in production can be profiled without a redeploy: an admin sends
+the request with
+
+  X-Admin-Token: <ADMIN_TOKEN>
+  X-Profile: cpu            cProfile (deterministic): top functions by
+                            cumulative time, with call counts
+             memory         tracemalloc: snapshot diff across the request,
+                            top allocation sites by size and count
+             cpu,memory     both
+
+The response is unchanged apart from an `X-Profile-Id` header; the report is
+kept in a small in-memory store and downloaded from
+/admin/profiles/{id} (JSON summary) or /admin/profiles/{id}?format=pstats
+(raw cProfile stats for snakeviz / pstats).
+
+Both profilers see the whole worker thread, so work for concurrent requests
+that interleaves at await points shows up too; profile on a quiet worker for
+a clean call tree. Only one profile runs at a time per worker.
+
+Configuration (environment):
+  ADMIN_TOKEN   shared secret for the admin headers and endpoints ("" disables)
+"""
+
+import cProfile
+import hmac
+import marshal
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILE_MODES = ("cpu", "memory")
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+MAX_STORED_PROFILES = 16
+TRACEMALLOC_FRAMES = 1
+PROFILED_PATHS = ("/search", "/insights", "/cart/optimize")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Constant-time check of an admin token; always False when none is configured."""
+    if not ADMIN_TOKEN or token is None:
+        return False
+    # Bytes: compare_digest rejects non-ASCII str, and headers may carry any latin-1
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def parse_modes(header: Optional[str]) -> Set[str]:
+    """"cpu,memory" -> {"cpu", "memory"}; unknown modes are ignored."""
+    return {m.strip().lower() for m in (header or "").split(",")} & set(PROFILE_MODES)
+
+
+def _cpu_report(profile: cProfile.Profile) -> Dict:
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (primitive, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": calls,
+            "primitive_calls": primitive,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return {
+        "total_calls": stats.total_calls,
+        "total_time_ms": round(stats.total_tt * 1000, 3),
+        "top_cumulative": rows[:TOP_FUNCTIONS],
+        "top_self": sorted(rows, key=lambda r: r["tottime_ms"], reverse=True)[:TOP_FUNCTIONS],
+    }
+
+
+def _memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int) -> Dict:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    return {
+        "size_diff_kb": round(sum(d.size_diff for d in diff) / 1024, 1),
+        "count_diff": sum(d.count_diff for d in diff),
+        "peak_kb": round(peak / 1024, 1),
+        "top_allocations": [
+            {
+                "location": f"{os.path.basename(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+                "size_diff_kb": round(d.size_diff / 1024, 2),
+                "count_diff": d.count_diff,
+                "size_kb": round(d.size / 1024, 2),
+                "count": d.count,
+            }
+            for d in diff[:TOP_ALLOCATIONS]
+        ],
+    }
+
+
+class RequestProfile:
+    """One profiled request: its summary report, plus raw cProfile stats."""
+
+    def __init__(self, modes: Set[str], label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.modes = modes
+        self.report: Dict = {
+            "id": self.id,
+            "label": label,
+            "modes": sorted(modes),
+            "created": time.time(),
+        }
+        self.pstats: Optional[bytes] = None
+
+
+class ProfileStore:
+    """Keeps the last MAX_STORED_PROFILES reports; one profile runs at a time."""
+
+    def __init__(self, max_profiles: int = MAX_STORED_PROFILES):
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._max_profiles = max_profiles
+        self.busy = False
+
+    @contextmanager
+    def profile(self, modes: Set[str], label: str):
+        """
+        Profile the enclosed block. Yields the RequestProfile, or None when
+        another profile is already running on this worker.
+        """
+        if self.busy:
+            yield None
+            return
+        self.busy = True
+        record = RequestProfile(modes, label)
+        profiler = cProfile.Profile() if "cpu" in modes else None
+        started_tracing = False
+        before = None
+        if "memory" in modes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record.report["wall_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            try:
+                if profiler is not None:
+                    profiler.create_stats()
+                    record.pstats = marshal.dumps(profiler.stats)
+                    record.report["cpu"] = _cpu_report(profiler)  # pstats takes (and clears) .stats
+                if before is not None:
+                    after = tracemalloc.take_snapshot()
+                    record.report["memory"] = _memory_report(before, after, tracemalloc.get_traced_memory()[1])
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                self.busy = False
+            self._store(record)
+
+    def _store(self, record: RequestProfile):
+        self._profiles[record.id] = record
+        while len(self._profiles) > self._max_profiles:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        return [
+            {k: p.report.get(k) for k in ("id", "label", "modes", "created", "wall_ms")}
+            for p in reversed(self._profiles.values())
+        ]
+
+
+# Global instance
+profile_store = ProfileStore()
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware: profiles admin requests that carry X-Profile."""
+
+    def __init__(self, app, paths=PROFILED_PATHS):
+        self.app = app
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        modes = parse_modes(headers.get(b"x-profile", b"").decode("latin-1"))
+        if not modes or not is_admin(headers.get(b"x-admin-token", b"").decode("latin-1") or None):
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        if scope.get("query_string"):
+            label += "?" + scope["query_string"].decode("latin-1")
+        with profile_store.profile(modes, label) as record:
+            status = (b"x-profile-id", record.id.encode()) if record else (b"x-profile-status", b"busy")
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": list(message.get("headers") or []) + [status]}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
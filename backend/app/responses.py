@@ -0,0 +1,244 @@
+"""
+Response Shapes — alternative encodings of the /search payload
+The full SearchResponse is self-contained but repetitive: every ProductGroup
+embeds complete copies of its best_price / fastest_delivery products (already
+listed in `products`), every PriceBreakdown repeats the currency, and the
+insights repeat the same coupon, bank-card and loyalty descriptions for
+every product they apply to.
+
+The compact shape (opt-in, `compact=true`) is built from the same JSON dict:
+  - products are listed once in a top-level `products` table keyed by id;
+    groups and insights reference them by id
+  - currency / currency_symbol live only at the top level, unless a product
+    is priced in a different currency
+  - a product's title and image_url are omitted when they equal its group's
+    canonical_title / image_url (a group carries image_url when all of its
+    products share one); products listed in several groups keep both
+  - repeated descriptions are hoisted into lookup tables and referenced by
+    index: insights.coupons.offers, insights.coupons.cards and
+    insights.coupons.loyalty_programs (keyed by program name)
+  - stacked-savings layers that did not apply are omitted
+  - review sentiment fields that are the same for every entry of a platform
+    move to insights.reviews.platforms[platform]; each entry keeps only the
+    rest (the full entry is {**platforms[entry.platform], **entry}), and
+    identical entries are sent once
+  - review aspect icons live in insights.reviews.aspect_icons (keyed by
+    aspect name) and bot-detection labels/colours in
+    insights.reviews.alert_levels (keyed by alert_level)
+  - null fields are omitted everywhere
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+# Coupon fields that depend on the product; everything else describes the offer
+_COUPON_PRODUCT_FIELDS = ("post_coupon_price", "estimated_savings")
+# Stacked-savings fields already present on the referenced product
+_STACKED_PRODUCT_FIELDS = ("product_name", "platform", "original_price")
+# Bank card / loyalty fields that describe the card or program, not the product
+_CARD_FIELDS = ("bank", "card_name", "card_type", "logo", "color")
+_LOYALTY_FIELDS = ("tier", "bonus", "color")
+# Bot-detection fields that follow from alert_level
+_ALERT_FIELDS = ("alert_label", "alert_color")
+
+
+def drop_nulls(obj: Any) -> Any:
+    """Recursively remove None-valued keys from dicts."""
+    if isinstance(obj, dict):
+        return {k: drop_nulls(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, list):
+        return [drop_nulls(x) for x in obj]
+    return obj
+
+
+class _Table:
+    """Append-only list of distinct dicts; `ref` returns a dict's index."""
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        self._index: Dict[str, int] = {}
+
+    def ref(self, row: Dict[str, Any]) -> int:
+        signature = json.dumps(row, sort_keys=True, default=str)
+        if signature not in self._index:
+            self._index[signature] = len(self.rows)
+            self.rows.append(row)
+        return self._index[signature]
+
+
+def _split(row: Dict[str, Any], fields: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(the `fields` of row, everything else)."""
+    return (
+        {k: v for k, v in row.items() if k in fields},
+        {k: v for k, v in row.items() if k not in fields},
+    )
+
+
+def _compact_coupons(coupons: Dict[str, Any], products: Dict[str, Any]) -> Dict[str, Any]:
+    offers, cards = _Table(), _Table()
+    loyalty_programs: Dict[str, Dict[str, Any]] = {}
+
+    by_product = {}
+    for pid, applied in (coupons.get("by_product") or {}).items():
+        refs = []
+        for coupon in applied:
+            per_product, offer = _split(coupon, _COUPON_PRODUCT_FIELDS)
+            refs.append({"offer": offers.ref(offer), **per_product})
+        by_product[pid] = refs
+
+    def card_option(option: Dict[str, Any]) -> Dict[str, Any]:
+        card, figures = _split(option, _CARD_FIELDS)
+        return {"card": cards.ref(card), **figures}
+
+    stacked = coupons.get("stacked")
+    if isinstance(stacked, dict):
+        rows = []
+        for row in stacked.get("stacked", []):
+            if row.get("product_id") in products:
+                row = {k: v for k, v in row.items() if k not in _STACKED_PRODUCT_FIELDS}
+            # A layer that did not apply carries no figures the client needs
+            layers = {name: layer for name, layer in (row.get("layers") or {}).items()
+                      if not (isinstance(layer, dict) and layer.get("applied") is False)}
+            bank = layers.get("bank")
+            if isinstance(bank, dict):
+                options = bank.get("all_options") or []
+                best = bank.get("best_card")
+                layers["bank"] = {
+                    **bank,
+                    # best_card is always one of all_options: send its position
+                    "best_card": options.index(best) if best in options else best,
+                    "all_options": [card_option(o) for o in options],
+                }
+            loyalty = layers.get("loyalty")
+            if isinstance(loyalty, dict) and isinstance(loyalty.get("program"), dict):
+                program, earned = _split(loyalty["program"], _LOYALTY_FIELDS)
+                loyalty_programs.setdefault(earned.get("program"), program)
+                layers["loyalty"] = {**loyalty, "program": earned}
+            rows.append({**row, "layers": layers})
+        best_deal = stacked.get("best_deal")
+        stacked = {
+            **stacked,
+            "stacked": rows,
+            "best_deal": best_deal.get("product_id") if isinstance(best_deal, dict) else best_deal,
+        }
+
+    return {
+        **coupons,
+        "by_product": by_product,
+        "stacked": stacked,
+        "offers": offers.rows,
+        "cards": cards.rows,
+        "loyalty_programs": loyalty_programs,
+    }
+
+
+def _compact_reviews(reviews: Dict[str, Any]) -> Dict[str, Any]:
+    aspect_icons: Dict[str, Any] = {}
+    alert_levels: Dict[str, Dict[str, Any]] = {}
+
+    def aspect(row: Dict[str, Any], name_field: str) -> Dict[str, Any]:
+        if "icon" not in row:
+            return row
+        aspect_icons.setdefault(row.get(name_field), row["icon"])
+        return {k: v for k, v in row.items() if k != "icon"}
+
+    entries = []
+    for entry in reviews.get("sentiments") or []:
+        entry = {**entry, "aspect_scores": [aspect(a, "name") for a in entry.get("aspect_scores") or []]}
+        bots = entry.get("bot_detection")
+        if isinstance(bots, dict):
+            labels, rest = _split(bots, _ALERT_FIELDS)
+            alert_levels.setdefault(bots.get("alert_level"), labels)
+            entry["bot_detection"] = rest
+        entries.append(entry)
+
+    # Fields every entry of a platform agrees on are sent once per platform
+    by_platform: Dict[Any, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        by_platform.setdefault(entry.get("platform"), []).append(entry)
+    platforms: Dict[Any, Dict[str, Any]] = {}
+    for platform, rows in by_platform.items():
+        first = rows[0]
+        platforms[platform] = {
+            k: v for k, v in first.items()
+            if k != "platform" and all(k in row and row[k] == v for row in rows)
+        }
+    unique = _Table()
+    for entry in entries:
+        shared = platforms[entry.get("platform")]
+        unique.ref({k: v for k, v in entry.items() if k not in shared})
+
+    heatmap = reviews.get("heatmap")
+    if isinstance(heatmap, dict):
+        heatmap = {**heatmap, "rows": [aspect(r, "aspect") for r in heatmap.get("rows") or []]}
+    return {
+        **reviews,
+        "sentiments": unique.rows,
+        "heatmap": heatmap,
+        "platforms": platforms,
+        "aspect_icons": aspect_icons,
+        "alert_levels": alert_levels,
+    }
+
+
+def _hoist_group_fields(groups: List[Dict[str, Any]], products: Dict[str, Dict[str, Any]]):
+    """Drop product titles / images that repeat their (only) group's."""
+    memberships: Dict[str, int] = {}
+    for group in groups:
+        refs = set(group["products"]) | {group.get("best_price"), group.get("fastest_delivery")}
+        for pid in refs - {None}:
+            memberships[pid] = memberships.get(pid, 0) + 1
+    for group in groups:
+        own = [products[pid] for pid in group["products"] if memberships[pid] == 1]
+        images = {p.get("image_url") for p in own}
+        if own and len(images) == 1 and len(own) == len(group["products"]):
+            group["image_url"] = images.pop()
+        for product in own:
+            if "image_url" in group and product.get("image_url") == group["image_url"]:
+                product.pop("image_url", None)
+            if product.get("title") == group.get("canonical_title"):
+                product.pop("title", None)
+
+
+def compact_search_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a full (jsonable) SearchResponse dict into the compact shape."""
+    currency = payload.get("currency")
+    symbol = payload.get("currency_symbol")
+    products: Dict[str, Dict[str, Any]] = {}
+
+    def ref(product: Dict[str, Any]) -> str:
+        pid = product["id"]
+        if pid not in products:
+            entry = {k: v for k, v in product.items() if k != "id"}
+            breakdown = dict(entry.get("price_breakdown") or {})
+            if breakdown.get("currency") == currency and breakdown.get("currency_symbol") == symbol:
+                breakdown.pop("currency", None)
+                breakdown.pop("currency_symbol", None)
+            entry["price_breakdown"] = breakdown
+            products[pid] = entry
+        return pid
+
+    groups = []
+    for group in payload.get("product_groups", []):
+        groups.append({
+            **{k: v for k, v in group.items()
+               if k not in ("products", "best_price", "fastest_delivery")},
+            "products": [ref(p) for p in group.get("products", [])],
+            "best_price": ref(group["best_price"]) if group.get("best_price") else None,
+            "fastest_delivery": ref(group["fastest_delivery"]) if group.get("fastest_delivery") else None,
+        })
+    _hoist_group_fields(groups, products)
+
+    compact = {k: v for k, v in payload.items() if k != "product_groups"}
+    insights = compact.get("insights")
+    if isinstance(insights, dict):
+        insights = dict(insights)
+        if isinstance(insights.get("coupons"), dict):
+            insights["coupons"] = _compact_coupons(insights["coupons"], products)
+        if isinstance(insights.get("reviews"), dict):
+            insights["reviews"] = _compact_reviews(insights["reviews"])
+        compact["insights"] = insights
+    compact["format"] = "compact"
+    compact["products"] = products
+    compact["product_groups"] = groups
+    return drop_nulls(compact)
@@ -0,0 +1,196 @@
+"""
+Search Result Sets — server-side paging, sorting and projection for /search
+perform_search used to hand the client every product group, and the frontend
+sorted and filtered on its side. Once a search has been assembled, its groups
+(already encoded to JSON-ready dicts) are kept here as a ResultSet for as long
+as the underlying PriceCache entry lives, keyed like that entry (canonical
+query + delivery zone). Follow-up requests that page (`limit` / `offset`),
+re-sort (`sort`) or project (`fields`) are served from it without scraping,
+grouping or recomputing insights.
+
+Insights and related products are not zone-wide: flash pools and local-area
+flags depend on the exact pincode, related products on the query as typed.
+Each ResultSet therefore holds LocalViews keyed by (query, pincode), built
+from the set's products the first time that pair asks for a page. A view also
+keeps its last few pages already gzip-compressed (see compression.GzipPrefix),
+so serving the same page again only compresses the per-request fields.
+
+Sort keys are numeric fields precomputed once per group when the set is built:
+  landed_cost  cheapest landed cost in the group (best_price)   ascending
+  eta          fastest delivery in minutes                      ascending
+  unit_price   lowest price per base unit (ml / g / pc)         ascending
+  rating       best rating in the group                         descending
+A leading "-" reverses the direction; groups lacking the field sort last.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import CountryCode, ProductGroup, ProductResult
+from .zones import result_zone
+from .matcher import canonicalize_query
+
+
+# sort key -> descending by default?
+SORT_KEYS = {"landed_cost": False, "eta": False, "unit_price": False, "rating": True}
+MAX_RESULT_SETS = 512
+MAX_LOCAL_VIEWS = 16  # per result set: (query spelling, pincode) pairs seen in the zone
+MAX_ENCODED_PAGES = 8  # per local view: compressed pages (page / sort / shape variants)
+
+
+def group_sort_fields(group: ProductGroup) -> Dict[str, Optional[float]]:
+    """The numeric sort fields of one product group."""
+    from .agent_orchestrator import compute_unit_price
+
+    unit_prices = [u["unit_price"] for u in map(compute_unit_price, group.products) if u]
+    ratings = [p.rating for p in group.products if p.rating is not None]
+    return {
+        "landed_cost": group.best_price.price_breakdown.total_landed_cost,
+        "eta": float(group.fastest_delivery.eta_minutes),
+        "unit_price": min(unit_prices) if unit_prices else None,
+        "rating": max(ratings) if ratings else None,
+    }
+
+
+class LocalView:
+    """The JSON-ready parts of a search that depend on the exact query and pincode."""
+
+    __slots__ = ("insights", "related", "_pages")
+
+    def __init__(self, insights: Optional[Dict], related: List[Dict[str, Any]]):
+        self.insights = insights
+        self.related = related
+        self._pages: "OrderedDict[Tuple, Any]" = OrderedDict()
+
+    def encoded_page(self, page: Tuple) -> Any:
+        encoded = self._pages.get(page)
+        if encoded is not None:
+            self._pages.move_to_end(page)
+        return encoded
+
+    def add_encoded_page(self, page: Tuple, encoded: Any):
+        self._pages[page] = encoded
+        while len(self._pages) > MAX_ENCODED_PAGES:
+            self._pages.popitem(last=False)
+
+
+class ResultSet:
+    """One assembled search for a zone: encoded groups + their sort fields + local views."""
+
+    def __init__(self, products: List[ProductResult], groups: List[Dict[str, Any]],
+                 sort_fields: List[Dict[str, Optional[float]]], expires_at: float):
+        self.products = products
+        self.groups = groups
+        self.sort_fields = sort_fields
+        self.expires_at = expires_at
+        self.total_results = sum(len(g["products"]) for g in groups)
+        self._orders: Dict[str, List[int]] = {}
+        self._views: "OrderedDict[Tuple[str, str], LocalView]" = OrderedDict()
+
+    def view(self, query: str, pincode: str) -> Optional[LocalView]:
+        view = self._views.get((query, pincode))
+        if view is not None:
+            self._views.move_to_end((query, pincode))
+        return view
+
+    def add_view(self, query: str, pincode: str, view: LocalView):
+        self._views[(query, pincode)] = view
+        while len(self._views) > MAX_LOCAL_VIEWS:
+            self._views.popitem(last=False)
+
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def order(self, sort: Optional[str]) -> List[int]:
+        """Group indices in `sort` order (memoized per key)."""
+        if not sort:
+            return list(range(len(self.groups)))
+        if sort not in self._orders:
+            key = sort.lstrip("-")
+            descending = SORT_KEYS[key] != sort.startswith("-")
+            present = [i for i, f in enumerate(self.sort_fields) if f[key] is not None]
+            missing = [i for i, f in enumerate(self.sort_fields) if f[key] is None]
+            present.sort(key=lambda i: self.sort_fields[i][key], reverse=descending)
+            self._orders[sort] = present + missing
+        return self._orders[sort]
+
+    def page(self, sort: Optional[str], offset: int, limit: Optional[int]) -> Tuple[List[Dict], Dict]:
+        """(groups on this page, pagination metadata)."""
+        order = self.order(sort)
+        end = len(order) if limit is None else offset + limit
+        window = order[offset:end]
+        return [self.groups[i] for i in window], {
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "total_groups": len(order),
+            "next_offset": end if end < len(order) else None,
+        }
+
+
+class ResultSetCache:
+    """Small LRU of ResultSets keyed like the PriceCache (canonical query + zone)."""
+
+    def __init__(self, max_entries: int = MAX_RESULT_SETS):
+        self._entries: "OrderedDict[Tuple[str, str], ResultSet]" = OrderedDict()
+        self._max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(query: str, pincode: str, country: CountryCode) -> Tuple[str, str]:
+        return canonicalize_query(query), result_zone(pincode, country)
+
+    def get(self, query: str, pincode: str, country: CountryCode) -> Optional[ResultSet]:
+        key = self.key(query, pincode, country)
+        result_set = self._entries.get(key)
+        if result_set is None or not result_set.fresh():
+            self._entries.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return result_set
+
+    def put(self, query: str, pincode: str, country: CountryCode, result_set: ResultSet):
+        key = self.key(query, pincode, country)
+        self._entries[key] = result_set
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """"a,b.c,b.d" -> {"a": {}, "b": {"c": {}, "d": {}}} (empty dict = keep whole value)."""
+    if not fields:
+        return None
+    tree: Dict[str, Any] = {}
+    for path in fields.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        node = tree
+        for i, part in enumerate(parts):
+            if part in node and not node[part] and i < len(parts) - 1:
+                break  # a shorter path already keeps the whole subtree
+            if i == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def project(obj: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    """Keep only the paths in `tree`; lists are projected element-wise."""
+    if not tree:
+        return obj
+    if isinstance(obj, list):
+        return [project(item, tree) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    return {k: project(obj[k], sub) for k, sub in tree.items() if k in obj}
+
+
+# Global instance
+result_sets = ResultSetCache()
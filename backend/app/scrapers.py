@@ -6,7 +6,9 @@ import asyncio
 import urllib.parse
 import hashlib
 import re
-from typing import List, Optional
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup
 import httpx
 
@@ -14,6 +16,12 @@ from .models import (
     ProductResult, PriceBreakdown, PlatformType, DeliverySpeed,
     CountryCode, COUNTRY_CONFIG
 )
+from .keyword_engine import keyword_engine
+from .data_engine import price_cache, circuit_breaker, health_monitor
+from .outbound import outbound_scheduler, RetryPolicy
+from .http_cache import http_cache, scraping_client, ScrapingSession
+from .tracing import span
+from .metrics import metrics_registry
 
 
 # User agents to rotate
@@ -41,6 +49,263 @@ def get_headers(referer: str = "") -> dict:
     return headers
 
 
+# Scrapers swallow their own errors and return []. They note *why* here so the
+# dispatcher can negative-cache the failure under the right reason, and flag
+# results they made up themselves so those are never cached as live data.
+_scrape_outcome: ContextVar[Optional[Dict]] = ContextVar("scrape_outcome", default=None)
+
+
+def report_scrape_failure(reason: str):
+    """Record why the current scrape came back empty (first reason wins)."""
+    outcome = _scrape_outcome.get()
+    if outcome is not None:
+        outcome.setdefault("reason", reason)
+
+
+def report_synthetic_results(results: List[ProductResult]) -> List[ProductResult]:
+    """Flag the current scrape's results as synthetic fallback data; returns them unchanged."""
+    outcome = _scrape_outcome.get()
+    if outcome is not None and results:
+        outcome["synthetic"] = True
+    return results
+
+
+SCRAPE_REQUESTS = metrics_registry.counter(
+    "scrape_requests_total", "Upstream HTTP attempts by scrapers (status code, or error class)",
+    ("platform", "status"),
+)
+SCRAPE_OUTCOMES = metrics_registry.counter(
+    "scrapes_total", "Platform scrapes by outcome (ok, fallback, empty, timeout, blocked, parse_error, cached, negative_cached)",
+    ("platform", "outcome"),
+)
+SCRAPE_FALLBACKS = metrics_registry.counter(
+    "scrape_fallbacks_total", "Platforms filled with synthetic fallback results (by the dispatcher or the scraper itself)",
+    ("platform",),
+)
+
+
+def classify_scrape_error(e: Exception) -> str:
+    if isinstance(e, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(e, (ValueError, KeyError, IndexError, TypeError, AttributeError)):
+        return "parse_error"  # includes json.JSONDecodeError
+    # Refused / reset / DNS failures: we could not get through to the platform
+    return "blocked"
+
+
+# Outbound rate limits per platform host: (requests per second, burst).
+# Marketplaces bot-check aggressively; the quick-commerce APIs tolerate more.
+PLATFORM_RATE_LIMITS = {
+    PlatformType.AMAZON_IN: (1.0, 3),
+    PlatformType.FLIPKART: (1.0, 3),
+    PlatformType.BLINKIT: (2.0, 4),
+    PlatformType.ZEPTO: (2.0, 4),
+    PlatformType.SWIGGY_INSTAMART: (2.0, 4),
+    PlatformType.BIGBASKET: (2.0, 4),
+    PlatformType.JIOMART: (2.0, 4),
+    PlatformType.MEESHO: (1.0, 3),
+    PlatformType.MYNTRA: (1.0, 3),
+    PlatformType.AJIO: (1.0, 3),
+    PlatformType.NYKAA: (2.0, 4),
+    PlatformType.TATA_CLIQ: (2.0, 4),
+}
+# Static timeout ceilings; the scheduler tightens them to each platform's observed p99
+PLATFORM_TIMEOUTS = {
+    platform: 10.0 if platform in (PlatformType.MYNTRA, PlatformType.AJIO, PlatformType.MEESHO) else 15.0
+    for platform in PLATFORM_RATE_LIMITS
+}
+# Retry policies: the quick-commerce JSON APIs drop connections under load and
+# recover within ~100ms; the marketplaces' 5xx are usually bot walls, so one retry
+_QC_RETRY = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1.0)
+_MARKETPLACE_RETRY = RetryPolicy(max_attempts=2, base_delay=0.25, max_delay=2.0)
+PLATFORM_RETRY_POLICIES = {
+    platform: _QC_RETRY if platform in (
+        PlatformType.BLINKIT, PlatformType.ZEPTO, PlatformType.SWIGGY_INSTAMART,
+        PlatformType.BIGBASKET, PlatformType.JIOMART,
+    ) else _MARKETPLACE_RETRY
+    for platform in PLATFORM_RATE_LIMITS
+}
+outbound_scheduler.configure(
+    {p.value: limit for p, limit in PLATFORM_RATE_LIMITS.items()},
+    {p.value: timeout for p, timeout in PLATFORM_TIMEOUTS.items()},
+    {p.value: policy for p, policy in PLATFORM_RETRY_POLICIES.items()},
+)
+
+# Transient failures worth another attempt; anything else is returned as-is
+RETRYABLE_STATUS = {500, 502, 503, 504}
+# The platform is up but refusing us (rate limit, bot wall): not retried, and a
+# circuit-breaker failure rather than a success
+BLOCKED_STATUS = {403, 429}
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadError,
+                     httpx.WriteError, httpx.RemoteProtocolError)
+# Don't start a retry that would leave less than this before the scrape deadline
+RETRY_MIN_REMAINING = 0.5
+
+# Absolute time by which the current scrape must finish (set by _run_scraper)
+_scrape_deadline: ContextVar[Optional[float]] = ContextVar("scrape_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the platform's circuit is open."""
+
+
+async def fetch_with_retry(client: ScrapingSession, method: str, url: str,
+                           platform: PlatformType, **kwargs) -> httpx.Response:
+    """
+    Send one scraper request, retrying transient failures per the platform's
+    RetryPolicy. Retries come out of the request's retry budget and never run
+    past the scrape deadline. The circuit breaker sees one outcome per call,
+    not per attempt: a success, a block (403/429), or a failure once the
+    retries are exhausted. Returns the last response (possibly a 5xx) or
+    raises the last error.
+    """
+    if not circuit_breaker.can_proceed(platform.value):
+        raise CircuitOpenError(f"{platform.value} circuit open")
+    policy = outbound_scheduler.retry_policy(platform.value)
+    deadline = _scrape_deadline.get()
+    delay = None
+    attempt = 1
+    while True:
+        response = None
+        error: Optional[Exception] = None
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            SCRAPE_REQUESTS.inc(platform.value, classify_scrape_error(e))
+            if not isinstance(e, _RETRYABLE_ERRORS):
+                circuit_breaker.record_failure(platform.value)
+                raise
+            error = e
+        else:
+            SCRAPE_REQUESTS.inc(platform.value, response.status_code)
+            if response.status_code in BLOCKED_STATUS:
+                circuit_breaker.record_failure(platform.value)
+                return response
+            if response.status_code not in RETRYABLE_STATUS:
+                circuit_breaker.record_success(platform.value)
+                if attempt > 1:
+                    outbound_scheduler.retry_stats["recovered"] += 1
+                return response
+
+        delay = policy.next_delay(delay)
+        give_up = attempt >= policy.max_attempts or not circuit_breaker.can_proceed(platform.value)
+        if not give_up and deadline is not None and deadline - time.time() - delay < RETRY_MIN_REMAINING:
+            outbound_scheduler.retry_stats["deadline_skipped"] += 1
+            give_up = True
+        if give_up or not outbound_scheduler.claim_retry():
+            circuit_breaker.record_failure(platform.value)
+            if error is not None:
+                raise error
+            return response
+
+        print(f"🔁 {platform.value}: retrying in {delay * 1000:.0f}ms "
+              f"({error or response.status_code}, attempt {attempt + 1}/{policy.max_attempts})")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+# Failure reasons that signal overload and shrink the platform's concurrency
+_BACKOFF_REASONS = {"timeout", "blocked"}
+
+# Quick-commerce results are what users wait for, and their tail is spiky:
+# these get a second (hedge) request when the first outlives the p95
+HEDGED_PLATFORMS = {PlatformType.BLINKIT, PlatformType.ZEPTO, PlatformType.SWIGGY_INSTAMART}
+
+
+async def _hedged_scrape(scrape_fn, platform: PlatformType, query: str, pincode: str) -> List[ProductResult]:
+    """Run a scrape, hedging it once past the platform's p95. First non-empty result wins."""
+    primary = asyncio.ensure_future(scrape_fn(query, pincode))
+    hedge: Optional[asyncio.Future] = None
+    try:
+        delay = outbound_scheduler.hedge_delay(platform.value)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not outbound_scheduler.try_hedge(platform.value):
+            return await primary
+
+        hedge = asyncio.ensure_future(scrape_fn(query, pincode))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result():
+                    if task is hedge:
+                        outbound_scheduler.record_hedge_win()
+                    return task.result()
+        # Neither produced results: report the primary's outcome
+        return primary.result()
+    finally:
+        # asyncio.wait never cancels what it waits on: when we return early or
+        # are cancelled (the caller's wait_for timeout), stop the losers here
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def _run_scraper(scrape_fn, platform: PlatformType, query: str,
+                       pincode: str) -> Tuple[List[ProductResult], Optional[str], bool]:
+    """
+    Run one scraper through the outbound scheduler.
+    Returns (results, failure reason or None, whether the results are synthetic);
+    synthetic results carry the reason the live scrape underneath them failed.
+    """
+    with span(platform.value) as scrape_span:
+        outcome: Dict = {}
+        _scrape_outcome.set(outcome)  # runs in its own task under gather()
+        results, reason = await _run_scraper_in_slot(scrape_fn, platform, query, pincode, outcome)
+        synthetic = bool(results) and outcome.get("synthetic", False)
+        if synthetic:
+            reason = outcome.get("reason")
+        if scrape_span is not None:
+            scrape_span.attrs.update(results=len(results), reason=reason, synthetic=synthetic)
+        return results, reason, synthetic
+
+
+async def _run_scraper_in_slot(scrape_fn, platform: PlatformType, query: str, pincode: str,
+                               outcome: Dict) -> Tuple[List[ProductResult], Optional[str]]:
+    if not circuit_breaker.can_proceed(platform.value):
+        # fetch_with_retry fails fast while the circuit is open, so this only
+        # runs the scraper's own offline fallback: no slot, no latency sample.
+        # Whatever it returns was not fetched, so it is synthetic.
+        outcome.setdefault("reason", "blocked")
+        try:
+            results = await scrape_fn(query, pincode)
+        except Exception as e:
+            return [], classify_scrape_error(e)
+        if results:
+            outcome["synthetic"] = True
+        return results, None if results else outcome["reason"]
+    timeout = outbound_scheduler.timeout_for(platform.value)
+    # Queueing for the token and slot counts against the scrape's deadline
+    deadline = time.time() + timeout
+    _scrape_deadline.set(deadline)
+    results: List[ProductResult] = []
+    reason: Optional[str] = None
+    try:
+        async with outbound_scheduler.slot(platform.value, deadline):
+            started = time.time()
+            try:
+                if platform in HEDGED_PLATFORMS:
+                    attempt = _hedged_scrape(scrape_fn, platform, query, pincode)
+                else:
+                    attempt = scrape_fn(query, pincode)
+                results = await asyncio.wait_for(attempt, max(0.0, deadline - started))
+            except asyncio.TimeoutError as e:
+                circuit_breaker.record_failure(platform.value)
+                reason = classify_scrape_error(e)
+            except Exception as e:
+                reason = classify_scrape_error(e)
+            if not results and reason is None:
+                reason = outcome.get("reason", "empty")
+            elapsed = time.time() - started
+            outbound_scheduler.observe(platform.value, elapsed, reason in _BACKOFF_REASONS)
+            health_monitor.observe("scraper", platform.value, elapsed * 1000)
+    except Exception as e:
+        reason = classify_scrape_error(e)
+    return results, reason
+
+
 def generate_product_id(platform: str, title: str) -> str:
     """Generate a unique product ID"""
     return hashlib.md5(f"{platform}:{title}".encode()).hexdigest()[:12].upper()
@@ -96,6 +361,29 @@ def clean_search_query(query: str) -> str:
     return query.strip()
 
 
+# Critical product categories for the relevance hard filter.
+# Each category also matches on its own name.
+RELEVANCE_CATEGORIES = {
+    'keyboard': ['keyboard', 'keypad'],
+    'mouse': ['mouse', 'mice'],
+    'speaker': ['speaker', 'soundbar', 'audio'],
+    'headphone': ['headphone', 'headset', 'earphone', 'airpod', 'earbud', 'tws'],
+    'charger': ['charger', 'adapter', 'power bank'],
+    'cable': ['cable', 'wire', 'cord', 'type-c', 'usb'],
+    'laptop': ['laptop', 'macbook', 'notebook'],
+    'phone': ['phone', 'mobile', 'smartphone'],
+    'milk': ['milk', 'dairy', 'doodh'],
+    'bread': ['bread', 'loaf'],
+    'egg': ['egg', 'eggs', 'anda'],
+    'rice': ['rice', 'chawal'],
+    'coffee': ['coffee'],
+    'tea': ['tea', 'chai'],
+}
+keyword_engine.register(
+    "relevance", {cat: [cat] + keywords for cat, keywords in RELEVANCE_CATEGORIES.items()}
+)
+
+
 def is_relevant_result(title: str, query: str) -> bool:
     """
     Check if a product title is relevant to the search query.
@@ -113,44 +401,17 @@ def is_relevant_result(title: str, query: str) -> bool:
 
     # 1. Critical Category Check (Hard Filter)
     # If query has 'keyboard', but title has 'speaker', it's NOT relevant.
-    categories = {
-        'keyboard': ['keyboard', 'keypad'],
-        'mouse': ['mouse', 'mice'],
-        'speaker': ['speaker', 'soundbar', 'audio'],
-        'headphone': ['headphone', 'headset', 'earphone', 'airpod', 'earbud', 'tws'],
-        'charger': ['charger', 'adapter', 'power bank'],
-        'cable': ['cable', 'wire', 'cord', 'type-c', 'usb'],
-        'laptop': ['laptop', 'macbook', 'notebook'],
-        'phone': ['phone', 'mobile', 'smartphone'],
-        'milk': ['milk', 'dairy', 'doodh'],
-        'bread': ['bread', 'loaf'],
-        'egg': ['egg', 'eggs', 'anda'],
-        'rice': ['rice', 'chawal'],
-        'coffee': ['coffee'],
-        'tea': ['tea', 'chai'],
-    }
-    
     # Determine the "category" of the query
-    query_categories = []
-    for cat, keywords in categories.items():
-        if any(kw in query_lower for kw in [cat] + keywords):
-            query_categories.append(cat)
+    query_categories = keyword_engine.labels(query_lower, "relevance")
             
     # If the query is clearly for a category, ensure the title belongs to that category
     if query_categories:
-        is_in_cat = False
-        for cat in query_categories:
-            if any(kw in title_lower for kw in [cat] + categories[cat]):
-                is_in_cat = True
-                break
+        title_categories = keyword_engine.labels(title_lower, "relevance")
+        is_in_cat = bool(query_categories & title_categories)
         
         # Also check for "negative" categories (searching for keyboard, found speaker)
-        if not is_in_cat:
-            # Check if it belongs to a DIFFERENT category from our list
-            for other_cat, keywords in categories.items():
-                if other_cat in query_categories: continue
-                if any(kw in title_lower for kw in [other_cat] + keywords):
-                    return False # Found a different category than searched
+        if not is_in_cat and title_categories - query_categories:
+            return False # Found a different category than searched
 
     # 2. Brand Check (if specified)
     # Common brands that are also words (Apple, Boat, etc.)
@@ -199,11 +460,12 @@ async def scrape_amazon_india(query: str, pincode: str) -> List[ProductResult]:
     search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(search_url, headers=get_headers("https://www.amazon.in"))
+        async with scraping_client.session(timeout=15.0) as client:
+            response = await fetch_with_retry(client, "GET", search_url, PlatformType.AMAZON_IN, headers=get_headers("https://www.amazon.in"))
             
             if response.status_code != 200:
                 print(f"Amazon returned status {response.status_code}")
+                report_scrape_failure("blocked")  # 503 bot wall / 429
                 return results
             
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -380,8 +642,10 @@ async def scrape_amazon_india(query: str, pincode: str) -> List[ProductResult]:
                     
     except httpx.TimeoutException:
         print("Amazon request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"Amazon scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -393,13 +657,19 @@ async def scrape_flipkart(query: str, pincode: str) -> List[ProductResult]:
     search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '+')}"
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(search_url, headers=get_headers("https://www.flipkart.com"))
+        async with scraping_client.session(timeout=15.0) as client:
+            response = await fetch_with_retry(client, "GET", search_url, PlatformType.FLIPKART, headers=get_headers("https://www.flipkart.com"))
             
             if response.status_code != 200:
                 print(f"Flipkart returned status {response.status_code}")
+                report_scrape_failure("blocked")
                 return results
             
+            # Page unchanged since the last scrape: skip the HTML parse
+            reused = http_cache.reuse_parse(response)
+            if reused is not None:
+                return [p.model_copy(deep=True) for p in reused]
+            
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Flipkart has multiple product card layouts
@@ -533,14 +803,28 @@ async def scrape_flipkart(query: str, pincode: str) -> List[ProductResult]:
                     print(f"Error parsing Flipkart product: {e}")
                     continue
                     
+            http_cache.remember_parse(response, [p.model_copy(deep=True) for p in results])
+            
     except httpx.TimeoutException:
         print("Flipkart request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"Flipkart scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
 
+# Vertical-specific platforms only get synthetic fallbacks for matching queries
+FALLBACK_VERTICAL_KEYWORDS = {
+    "fashion": ['shirt', 'shoe', 'dress', 'kurta', 'jeans', 'tshirt', 'saree', 'jacket',
+                'sneaker', 'sandal', 'top', 'skirt', 'legging', 'hoodie', 'wear', 'cloth'],
+    "beauty": ['lipstick', 'makeup', 'foundation', 'mascara', 'perfume', 'serum', 'moisturizer',
+               'sunscreen', 'face wash', 'shampoo', 'conditioner', 'cream', 'lotion', 'nykaa'],
+}
+keyword_engine.register("fallback_vertical", FALLBACK_VERTICAL_KEYWORDS)
+
+
 async def scrape_all_platforms(query: str, pincode: str, country: CountryCode) -> List[ProductResult]:
     """
     Scrape all available platforms for the given country.
@@ -554,39 +838,72 @@ async def scrape_all_platforms(query: str, pincode: str, country: CountryCode) -
     search_query = clean_search_query(query)
     
     if country == CountryCode.IN:
-        # Map scraper index -> platform type for fallback tracking
+        # Map scraper -> platform type for fallback tracking
         scraper_platform_map = [
-            (scrape_amazon_india(search_query, pincode), PlatformType.AMAZON_IN),
-            (scrape_flipkart(search_query, pincode), PlatformType.FLIPKART),
-            (scrape_blinkit(search_query, pincode), PlatformType.BLINKIT),
-            (scrape_zepto(search_query, pincode), PlatformType.ZEPTO),
-            (scrape_swiggy_instamart(search_query, pincode), PlatformType.SWIGGY_INSTAMART),
-            (scrape_bigbasket(search_query, pincode), PlatformType.BIGBASKET),
-            (scrape_jiomart(search_query, pincode), PlatformType.JIOMART),
-            (scrape_meesho(search_query, pincode), PlatformType.MEESHO),
-            (scrape_myntra(search_query, pincode), PlatformType.MYNTRA),
-            (scrape_ajio(search_query, pincode), PlatformType.AJIO),
-            (scrape_nykaa(search_query, pincode), PlatformType.NYKAA),
-            (scrape_tata_cliq(search_query, pincode), PlatformType.TATA_CLIQ),
+            (scrape_amazon_india, PlatformType.AMAZON_IN),
+            (scrape_flipkart, PlatformType.FLIPKART),
+            (scrape_blinkit, PlatformType.BLINKIT),
+            (scrape_zepto, PlatformType.ZEPTO),
+            (scrape_swiggy_instamart, PlatformType.SWIGGY_INSTAMART),
+            (scrape_bigbasket, PlatformType.BIGBASKET),
+            (scrape_jiomart, PlatformType.JIOMART),
+            (scrape_meesho, PlatformType.MEESHO),
+            (scrape_myntra, PlatformType.MYNTRA),
+            (scrape_ajio, PlatformType.AJIO),
+            (scrape_nykaa, PlatformType.NYKAA),
+            (scrape_tata_cliq, PlatformType.TATA_CLIQ),
         ]
-        
-        tasks = [item[0] for item in scraper_platform_map]
         platform_types = [item[1] for item in scraper_platform_map]
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Adopt circuits tripped by other workers before deciding what to scrape
+        await circuit_breaker.sync([p.value for p in platform_types])
         
         # Track which platforms got live results
         platforms_with_results = set()
         
-        for i, result in enumerate(results):
-            if isinstance(result, list) and len(result) > 0:
+        # Per-platform cache: only platforms whose entry is missing or stale go live.
+        # Negative entries (recently empty/failed) skip straight to fallback data.
+        cached, negative = await price_cache.fetch_platforms(query, pincode, platform_types)
+        for platform, items in cached.items():
+            all_results.extend(ProductResult(**item) for item in items)
+            platforms_with_results.add(platform)
+            SCRAPE_OUTCOMES.inc(platform.value, "cached")
+            print(f"💾 {platform.value}: {len(items)} cached results")
+        for platform, reason in negative.items():
+            SCRAPE_OUTCOMES.inc(platform.value, "negative_cached")
+            print(f"🚫 {platform.value}: skipped (recently {reason})")
+        
+        to_scrape = [
+            item for item in scraper_platform_map
+            if item[1] not in cached and item[1] not in negative
+        ]
+        outcomes = await asyncio.gather(
+            *(_run_scraper(scrape_fn, platform, search_query, pincode) for scrape_fn, platform in to_scrape)
+        )
+        
+        for (_, platform), (result, reason, synthetic) in zip(to_scrape, outcomes):
+            if synthetic:
+                # Made up by the scraper itself: serve it, but never cache it as live.
+                # If a live scrape failed underneath, skip the platform for a while.
+                SCRAPE_OUTCOMES.inc(platform.value, "fallback")
+                SCRAPE_FALLBACKS.inc(platform.value)
                 all_results.extend(result)
-                platforms_with_results.add(platform_types[i])
-                print(f"✅ {platform_types[i].value}: {len(result)} live results")
-            elif isinstance(result, Exception):
-                print(f"❌ {platform_types[i].value}: scraping error - {result}")
+                platforms_with_results.add(platform)
+                if reason is not None:
+                    price_cache.put_negative(query, pincode, platform, reason)
+                print(f"🔄 {platform.value}: {len(result)} synthetic results ({reason or 'no live source'})")
+                continue
+            SCRAPE_OUTCOMES.inc(platform.value, "ok" if result else reason)
+            if result:
+                all_results.extend(result)
+                platforms_with_results.add(platform)
+                price_cache.put_platform(query, pincode, platform, result)
+                print(f"✅ {platform.value}: {len(result)} live results")
             else:
-                print(f"⚠️ {platform_types[i].value}: 0 results")
+                price_cache.put_negative(query, pincode, platform, reason)
+                if reason == "empty":
+                    print(f"⚠️ {platform.value}: 0 results")
+                else:
+                    print(f"❌ {platform.value}: scraping failed ({reason})")
         
         # --- FALLBACK: Generate synthetic results for platforms that returned nothing ---
         # Only generate fallback if at least ONE platform got live results (so we have a reference price)
@@ -602,19 +919,14 @@ async def scrape_all_platforms(query: str, pincode: str, country: CountryCode) -
             # because these platforms also sell electronics, personal care, and other categories
             
             # Fashion-only platforms should only get fallback for fashion queries  
-            fashion_keywords = ['shirt', 'shoe', 'dress', 'kurta', 'jeans', 'tshirt', 'saree', 'jacket', 
-                              'sneaker', 'sandal', 'top', 'skirt', 'legging', 'hoodie', 'wear', 'cloth']
-            is_fashion = any(kw in query.lower() for kw in fashion_keywords)
+            verticals = keyword_engine.labels(query, "fallback_vertical")
             fashion_platforms = {PlatformType.MYNTRA, PlatformType.AJIO}
             
-            if not is_fashion:
+            if "fashion" not in verticals:
                 failed_platforms -= fashion_platforms
             
             # Beauty-only platform
-            beauty_keywords = ['lipstick', 'makeup', 'foundation', 'mascara', 'perfume', 'serum', 'moisturizer',
-                             'sunscreen', 'face wash', 'shampoo', 'conditioner', 'cream', 'lotion', 'nykaa']
-            is_beauty = any(kw in query.lower() for kw in beauty_keywords)
-            if not is_beauty:
+            if "beauty" not in verticals:
                 failed_platforms.discard(PlatformType.NYKAA)
             
             # Generate fallback for remaining e-commerce platforms
@@ -622,6 +934,8 @@ async def scrape_all_platforms(query: str, pincode: str, country: CountryCode) -
                 query, search_query, pincode, reference_price, failed_platforms
             )
             all_results.extend(fallback_results)
+            for platform in {p.platform for p in fallback_results}:
+                SCRAPE_FALLBACKS.inc(platform.value)
             
             if fallback_results:
                 print(f"🔄 Generated {len(fallback_results)} fallback results for {len(failed_platforms)} platforms")
@@ -629,32 +943,33 @@ async def scrape_all_platforms(query: str, pincode: str, country: CountryCode) -
     return all_results
 
 
+# Mapping of keywords to reliable Unsplash placeholder images (first match wins)
+MOCK_IMAGES = {
+    "milk": "https://images.unsplash.com/photo-1563636619-e910ef2a844b?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "iphone": "https://images.unsplash.com/photo-1592750475338-74b7022d9503?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "phone": "https://images.unsplash.com/photo-1511707171634-5f897ff02aa9?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "laptop": "https://images.unsplash.com/photo-1496181133206-80ce9b88a853?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "watch": "https://images.unsplash.com/photo-1523275335684-37898b6baf30?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "headphone": "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "earbuds": "https://images.unsplash.com/photo-1590658268037-6bf12165a8df?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "charger": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "adapter": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "sneakers": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "lamp": "https://images.unsplash.com/photo-1507473885765-e6ed03a2748e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+    "crystal": "https://images.unsplash.com/photo-1614850523296-d8c1af93d400?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
+}
+DEFAULT_MOCK_IMAGE = "https://images.unsplash.com/photo-1526738549149-8e07eca6c147?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80"
+keyword_engine.register("mock_image", {key: [key] for key in MOCK_IMAGES})
+
+
 def get_mock_image(title: str) -> str:
     """Get a category-appropriate mock image URL based on product title"""
-    title_lower = title.lower()
-    
-    # Mapping of keywords to reliable Unsplash placeholder images
-    mapping = {
-        "milk": "https://images.unsplash.com/photo-1563636619-e910ef2a844b?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "iphone": "https://images.unsplash.com/photo-1592750475338-74b7022d9503?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "phone": "https://images.unsplash.com/photo-1511707171634-5f897ff02aa9?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "laptop": "https://images.unsplash.com/photo-1496181133206-80ce9b88a853?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "watch": "https://images.unsplash.com/photo-1523275335684-37898b6baf30?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "headphone": "https://images.unsplash.com/photo-1505740420928-5e560c06d30e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "earbuds": "https://images.unsplash.com/photo-1590658268037-6bf12165a8df?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "charger": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "adapter": "https://images.unsplash.com/photo-1627916524180-8742616f94b8?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "sneakers": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "lamp": "https://images.unsplash.com/photo-1507473885765-e6ed03a2748e?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-        "crystal": "https://images.unsplash.com/photo-1614850523296-d8c1af93d400?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80",
-    }
-    
-    for key, url in mapping.items():
-        if key in title_lower:
-            return url
+    hit = keyword_engine.best(title, "mock_image")
+    if hit:
+        return MOCK_IMAGES[hit[0]]
             
     # Default fallback for electronics/gadgets
-    return "https://images.unsplash.com/photo-1526738549149-8e07eca6c147?auto=format\u0026fit=crop\u0026w=200\u0026h=200\u0026q=80"
+    return DEFAULT_MOCK_IMAGE
 
 
 def _generate_platform_fallback(
@@ -827,10 +1142,10 @@ async def scrape_blinkit(query: str, pincode: str) -> List[ProductResult]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=15.0) as client:
             # First, try the API endpoint
             try:
-                response = await client.get(api_url, headers=headers, params=params)
+                response = await fetch_with_retry(client, "GET", api_url, PlatformType.BLINKIT, headers=headers, params=params)
                 if response.status_code == 200:
                     data = response.json()
                     products_data = data.get('products', []) or data.get('data', {}).get('products', [])
@@ -893,7 +1208,7 @@ async def scrape_blinkit(query: str, pincode: str) -> List[ProductResult]:
             # Fallback: Try web scraping if API fails
             if not results:
                 web_url = f"https://blinkit.com/s/?q={query.replace(' ', '%20')}"
-                response = await client.get(web_url, headers=get_headers("https://blinkit.com"))
+                response = await fetch_with_retry(client, "GET", web_url, PlatformType.BLINKIT, headers=get_headers("https://blinkit.com"))
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -951,12 +1266,14 @@ async def scrape_blinkit(query: str, pincode: str) -> List[ProductResult]:
                                 except Exception:
                                     continue
                         except json.JSONDecodeError:
-                            pass
+                            report_scrape_failure("parse_error")
                             
     except httpx.TimeoutException:
         print("Blinkit request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"Blinkit scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -1016,10 +1333,10 @@ async def scrape_zepto(query: str, pincode: str) -> List[ProductResult]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=15.0) as client:
             # Try Zepto's API first
             try:
-                response = await client.post(api_url, headers=headers, json=payload)
+                response = await fetch_with_retry(client, "POST", api_url, PlatformType.ZEPTO, headers=headers, json=payload)
                 if response.status_code == 200:
                     data = response.json()
                     products_data = (
@@ -1082,7 +1399,7 @@ async def scrape_zepto(query: str, pincode: str) -> List[ProductResult]:
             # Fallback: Web scraping
             if not results:
                 search_url = f"https://www.zeptonow.com/search?query={query.replace(' ', '%20')}"
-                response = await client.get(search_url, headers=get_headers("https://www.zeptonow.com"))
+                response = await fetch_with_retry(client, "GET", search_url, PlatformType.ZEPTO, headers=get_headers("https://www.zeptonow.com"))
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -1138,12 +1455,14 @@ async def scrape_zepto(query: str, pincode: str) -> List[ProductResult]:
                                 except Exception:
                                     continue
                         except json.JSONDecodeError:
-                            pass
+                            report_scrape_failure("parse_error")
                             
     except httpx.TimeoutException:
         print("Zepto request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"Zepto scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -1178,10 +1497,10 @@ async def scrape_swiggy_instamart(query: str, pincode: str) -> List[ProductResul
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=15.0) as client:
             # Try Swiggy's internal API
             try:
-                response = await client.get(search_api, headers=headers, params=params)
+                response = await fetch_with_retry(client, "GET", search_api, PlatformType.SWIGGY_INSTAMART, headers=headers, params=params)
                 if response.status_code == 200:
                     data = response.json()
                     # Swiggy has nested data structure
@@ -1249,7 +1568,7 @@ async def scrape_swiggy_instamart(query: str, pincode: str) -> List[ProductResul
             # Fallback: Web scraping
             if not results:
                 web_url = f"https://www.swiggy.com/instamart/search?query={query.replace(' ', '%20')}"
-                response = await client.get(web_url, headers=get_headers("https://www.swiggy.com"))
+                response = await fetch_with_retry(client, "GET", web_url, PlatformType.SWIGGY_INSTAMART, headers=get_headers("https://www.swiggy.com"))
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -1309,12 +1628,14 @@ async def scrape_swiggy_instamart(query: str, pincode: str) -> List[ProductResul
                                         except Exception:
                                             continue
                         except json.JSONDecodeError:
-                            pass
+                            report_scrape_failure("parse_error")
                             
     except httpx.TimeoutException:
         print("Swiggy Instamart request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"Swiggy Instamart scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -1347,10 +1668,10 @@ async def scrape_bigbasket(query: str, pincode: str) -> List[ProductResult]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=15.0) as client:
             # Try BigBasket's API
             try:
-                response = await client.get(api_url, headers=headers, params=params)
+                response = await fetch_with_retry(client, "GET", api_url, PlatformType.BIGBASKET, headers=headers, params=params)
                 if response.status_code == 200:
                     data = response.json()
                     products_data = data.get('tabs', [{}])[0].get('product_info', {}).get('products', [])
@@ -1407,9 +1728,12 @@ async def scrape_bigbasket(query: str, pincode: str) -> List[ProductResult]:
             
             # Fallback: Web scraping
             if not results:
-                response = await client.get(search_url, headers=get_headers("https://www.bigbasket.com"))
+                response = await fetch_with_retry(client, "GET", search_url, PlatformType.BIGBASKET, headers=get_headers("https://www.bigbasket.com"))
                 
-                if response.status_code == 200:
+                reused = http_cache.reuse_parse(response) if response.status_code == 200 else None
+                if reused is not None:
+                    results = [p.model_copy(deep=True) for p in reused]
+                elif response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
                     
                     # Try to find product cards
@@ -1462,11 +1786,14 @@ async def scrape_bigbasket(query: str, pincode: str) -> List[ProductResult]:
                             ))
                         except Exception:
                             continue
+                    http_cache.remember_parse(response, [p.model_copy(deep=True) for p in results])
                             
     except httpx.TimeoutException:
         print("BigBasket request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"BigBasket scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -1496,9 +1823,9 @@ async def scrape_jiomart(query: str, pincode: str) -> List[ProductResult]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=15.0) as client:
             # Try JioMart web scraping (they don't have a public API)
-            response = await client.get(search_url, headers=get_headers("https://www.jiomart.com"))
+            response = await fetch_with_retry(client, "GET", search_url, PlatformType.JIOMART, headers=get_headers("https://www.jiomart.com"))
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -1570,7 +1897,7 @@ async def scrape_jiomart(query: str, pincode: str) -> List[ProductResult]:
                                 print(f"Error parsing JioMart product: {e}")
                                 continue
                     except json.JSONDecodeError:
-                        pass
+                        report_scrape_failure("parse_error")
                 
                 # Fallback: Parse HTML directly
                 if not results:
@@ -1626,8 +1953,10 @@ async def scrape_jiomart(query: str, pincode: str) -> List[ProductResult]:
                             
     except httpx.TimeoutException:
         print("JioMart request timed out")
+        report_scrape_failure("timeout")
     except Exception as e:
         print(f"JioMart scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
     
     return results
 
@@ -2147,15 +2476,17 @@ def enrich_results_with_unit_price(results: List[ProductResult]) -> List[Product
 
 # === FASHION & LIFESTYLE SCRAPERS ===
 
+FASHION_QUERY_KEYWORDS = [
+    'shoe', 'shirt', 'jeans', 't-shirt', 'top', 'dress', 'kurta', 'saree', 'watch', 
+    'sunglasses', 'bag', 'purse', 'wallet', 'sandal', 'slipper', 'sneaker', 'jacket', 
+    'hoodie', 'formal', 'casual', 'wear', 'cloth', 'fashion', 'men', 'women'
+]
+keyword_engine.register("fashion_query", {"fashion": FASHION_QUERY_KEYWORDS})
+
+
 def is_fashion_query(query: str) -> bool:
     """Check if query is likely for fashion/lifestyle apps"""
-    keywords = [
-        'shoe', 'shirt', 'jeans', 't-shirt', 'top', 'dress', 'kurta', 'saree', 'watch', 
-        'sunglasses', 'bag', 'purse', 'wallet', 'sandal', 'slipper', 'sneaker', 'jacket', 
-        'hoodie', 'formal', 'casual', 'wear', 'cloth', 'fashion', 'men', 'women'
-    ]
-    query_lower = query.lower()
-    return any(k in query_lower for k in keywords)
+    return keyword_engine.has(query, "fashion_query")
 
 def get_fashion_fallback(query: str, platform: PlatformType) -> List[ProductResult]:
     """Generate plausible fashion results when scraping fails"""
@@ -2243,9 +2574,9 @@ async def scrape_myntra(query: str, pincode: str) -> List[ProductResult]:
     search_url = f"https://www.myntra.com/{query.replace(' ', '-')}"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
+        async with scraping_client.session(timeout=10.0) as client:
             headers = get_headers("https://www.google.com/")
-            response = await client.get(search_url, headers=headers)
+            response = await fetch_with_retry(client, "GET", search_url, PlatformType.MYNTRA, headers=headers)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -2292,9 +2623,10 @@ async def scrape_myntra(query: str, pincode: str) -> List[ProductResult]:
                             pass
     except Exception as e:
         print(f"Myntra scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
         
     if not results and is_fashion_query(query):
-        return get_fashion_fallback(query, PlatformType.MYNTRA)
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.MYNTRA))
         
     return results
 
@@ -2304,8 +2636,8 @@ async def scrape_ajio(query: str, pincode: str) -> List[ProductResult]:
     api_url = f"https://www.ajio.com/api/search?q={query.replace(' ', '%20')}"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            response = await client.get(api_url, headers=get_headers())
+        async with scraping_client.session(timeout=10.0) as client:
+            response = await fetch_with_retry(client, "GET", api_url, PlatformType.AJIO, headers=get_headers())
             if response.status_code == 200:
                 data = response.json()
                 products = data.get('products', [])
@@ -2337,9 +2669,10 @@ async def scrape_ajio(query: str, pincode: str) -> List[ProductResult]:
                     ))
     except Exception as e:
         print(f"Ajio scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
         
     if not results and is_fashion_query(query):
-        return get_fashion_fallback(query, PlatformType.AJIO)
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.AJIO))
         
     return results
 
@@ -2350,8 +2683,8 @@ async def scrape_meesho(query: str, pincode: str) -> List[ProductResult]:
     search_url = f"https://www.meesho.com/search?q={urllib.parse.quote(query)}"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            response = await client.get(search_url, headers=get_headers())
+        async with scraping_client.session(timeout=10.0) as client:
+            response = await fetch_with_retry(client, "GET", search_url, PlatformType.MEESHO, headers=get_headers())
             if response.status_code == 200:
                 # Meesho products are often in a JSON-like script tag or div
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -2404,24 +2737,27 @@ async def scrape_meesho(query: str, pincode: str) -> List[ProductResult]:
                         continue
     except Exception as e:
         print(f"Meesho scraping error: {e}")
+        report_scrape_failure(classify_scrape_error(e))
         
     # If no results, provide a fallback for common items
     if not results and (len(query) < 15 or "keyboard" in query.lower()):
          from .mock_data import get_fallback_results
          fallback = get_fallback_results(query, PlatformType.MEESHO)
          if fallback:
-             results.extend(fallback)
+             results.extend(report_synthetic_results(fallback))
              
     return results
 
 async def scrape_nykaa(query: str, pincode: str) -> List[ProductResult]:
     """Scrape Nykaa search results"""
     if is_fashion_query(query) or any(x in query.lower() for x in ['makeup', 'lipstick', 'cream', 'face', 'hair', 'shampoo']):
-        return get_fashion_fallback(query, PlatformType.NYKAA)
+        # No live scraper yet: always synthetic
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.NYKAA))
     return []
 
 async def scrape_tata_cliq(query: str, pincode: str) -> List[ProductResult]:
     """Scrape Tata Cliq search results"""
     if is_fashion_query(query) or any(x in query.lower() for x in ['electronics', 'tv', 'fridge']):
-        return get_fashion_fallback(query, PlatformType.TATA_CLIQ)
+        # No live scraper yet: always synthetic
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.TATA_CLIQ))
     return []
@@ -0,0 +1,321 @@
+"""
+Shared State Backend — L2 store for multi-worker deployments
+Every uvicorn worker keeps its own in-process dicts (L1). This module provides
+the pluggable L2 that all workers share, so a result scraped by one worker is
+a cache hit for every other worker on the node (or across the fleet).
+
+Backends:
+  - MemoryStore : in-process stand-in with the same surface (single worker, demos)
+  - RedisStore  : speaks the Redis protocol (RESP2) over asyncio streams,
+                  works against any redis-server / compatible endpoint
+
+Configured through the SHARED_STORE_URL environment variable:
+  SHARED_STORE_URL=redis://localhost:6379/0   -> RedisStore
+  SHARED_STORE_URL=rediss://host:6380/0        -> RedisStore over TLS
+  SHARED_STORE_URL=memory://                  -> MemoryStore
+  (unset)                                     -> L1 only
+
+After a transport error or timeout, RedisStore answers every command with a
+miss for SHARED_STORE_RETRY_SECONDS (5) before trying the server again, so an
+unreachable L2 costs one timeout, not one per lookup.
+"""
+
+import asyncio
+import os
+import time
+import urllib.parse
+from typing import Dict, List, Optional, Set, Tuple
+
+SHARED_STORE_RETRY_SECONDS = float(os.environ.get("SHARED_STORE_RETRY_SECONDS", 5))
+
+
+class SharedStore:
+    """
+    Minimal key/value surface used by the data engine.
+    Values are bytes; every method is a coroutine so L2 round-trips never
+    block the event loop. Implementations must never raise on backend
+    failure — an unreachable L2 degrades to L1-only, it does not fail a search.
+    """
+
+    name = "none"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def incrby(self, key: str, amount: int = 1) -> Optional[int]:
+        raise NotImplementedError
+
+    async def ping(self) -> bool:
+        raise NotImplementedError
+
+
+class MemoryStore(SharedStore):
+    """In-process stand-in for Redis (same semantics, including key expiry)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._live(key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self._live(k) for k in keys]
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        expires_at = time.time() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, key: str) -> bool:
+        return self._data.pop(key, None) is not None
+
+    async def incrby(self, key: str, amount: int = 1) -> Optional[int]:
+        current = int(self._live(key) or 0) + amount
+        expires_at = self._data[key][1] if key in self._data else None
+        self._data[key] = (str(current).encode(), expires_at)
+        return current
+
+    async def ping(self) -> bool:
+        return True
+
+
+class RedisError(Exception):
+    """Error reply returned by the Redis server."""
+
+
+class RedisStore(SharedStore):
+    """
+    Tiny RESP2 client on asyncio streams — no third-party dependency.
+    One connection per event loop, commands serialized with a lock
+    (pipelining is not needed for the handful of keys we touch per request).
+    `timeout` covers a whole command, including its wait for the lock.
+    """
+
+    name = "redis"
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 0.25, tls: bool = False,
+                 retry_after: float = SHARED_STORE_RETRY_SECONDS):
+        self._host = host
+        self._port = port
+        self._db = db
+        self._password = password
+        self._timeout = timeout
+        self._tls = tls
+        self._retry_after = retry_after
+        self._down_until = 0.0  # monotonic time before which commands are not sent
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._errors = 0
+        self._skipped = 0
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        parsed = urllib.parse.urlparse(url)
+        db = parsed.path.lstrip("/")
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=parsed.password,
+            tls=parsed.scheme == "rediss",
+        )
+
+    # --- RESP encoding ---
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            else:
+                data = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count == -1:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"unexpected redis reply: {line!r}")
+
+    # --- Connection management ---
+
+    async def _connect(self):
+        # rediss:// verifies the server certificate; AUTH never goes out in cleartext
+        self._reader, self._writer = await asyncio.open_connection(
+            self._host, self._port, ssl=True if self._tls else None,
+        )
+        if self._password:
+            await self._roundtrip("AUTH", self._password)
+        if self._db:
+            await self._roundtrip("SELECT", self._db)
+
+    def _reset(self):
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except RuntimeError:
+                pass  # owning loop already closed
+        self._reader = self._writer = None
+
+    async def _roundtrip(self, *args):
+        self._writer.write(self._encode(*args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    def _backing_off(self) -> bool:
+        if time.monotonic() < self._down_until:
+            self._skipped += 1
+            return True
+        return False
+
+    async def _execute_locked(self, *args):
+        async with self._lock:
+            if self._backing_off():
+                return None  # an earlier command in the queue just failed
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._roundtrip(*args)
+            except RedisError:
+                self._errors += 1
+                return None
+            except BaseException:
+                # Failed, timed out or cancelled mid-command: the reply may still be
+                # in flight, and the next command on this connection would read it
+                self._reset()
+                raise
+
+    async def execute(self, *args):
+        """Run one command. Returns None (and backs off for a while) on any transport error."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams are bound to the loop that created them
+            self._reset()
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._down_until = 0.0
+        if self._backing_off():
+            return None
+        try:
+            return await asyncio.wait_for(self._execute_locked(*args), self._timeout)
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self._errors += 1
+            self._down_until = time.monotonic() + self._retry_after
+            return None
+
+    # --- SharedStore surface ---
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        reply = await self.execute("MGET", *keys)
+        return reply if isinstance(reply, list) else [None] * len(keys)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        if ttl:
+            reply = await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+        else:
+            reply = await self.execute("SET", key, value)
+        return reply == "OK"
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self.execute("DEL", key))
+
+    async def incrby(self, key: str, amount: int = 1) -> Optional[int]:
+        return await self.execute("INCRBY", key, amount)
+
+    async def ping(self) -> bool:
+        return await self.execute("PING") == "PONG"
+
+
+def create_store(url: Optional[str]) -> Optional[SharedStore]:
+    """Build the L2 backend from a URL (see module docstring)."""
+    if not url:
+        return None
+    scheme = urllib.parse.urlparse(url).scheme
+    if scheme in ("redis", "rediss"):
+        return RedisStore.from_url(url)
+    if scheme == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unsupported SHARED_STORE_URL scheme: {scheme!r}")
+
+
+# ============================================================
+# WRITE-BEHIND
+# ============================================================
+
+# Strong references so pending writes are not garbage-collected mid-flight
+_pending_writes: Set[asyncio.Task] = set()
+
+
+def schedule_write(coro) -> None:
+    """
+    Fire-and-forget an L2 write from synchronous code.
+    Outside a running event loop (scripts, startup) the write is dropped —
+    L1 already holds the value.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        coro.close()
+        return
+    task = loop.create_task(coro)
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def flush_writes() -> None:
+    """Wait for queued write-behind tasks (used on shutdown)."""
+    if _pending_writes:
+        await asyncio.gather(*list(_pending_writes), return_exceptions=True)
+
+
+# Global instance — None when running single-worker without an L2
+shared_store: Optional[SharedStore] = create_store(os.environ.get("SHARED_STORE_URL"))
@@ -0,0 +1,256 @@
+"""
+Request Tracing — per-phase spans for /search
+AgentLog durations only cover the three coarse agents. A search is now traced
+as a tree of spans:
+
+  search
+  ├── cache_lookup
+  ├── orchestrate
+  │   ├── scrape            one child per platform (amazon_in, blinkit, ...)
+  │   ├── quick_commerce
+  │   └── normalize
+  ├── group
+  ├── related
+  ├── insights          one child per section (coupons, oracle, carbon, ...)
+  ├── encode
+  └── serialize
+
+`span(name)` opens a child of the current span (a contextvar, so tasks spawned
+by asyncio.gather nest under the span that spawned them) and is a no-op when
+no trace is active — background prefetch / prewarm scrapes cost nothing.
+
+The finished tree goes out three ways: a `Server-Timing` header (spans named
+by dotted path, e.g. orchestrate.scrape.amazon_in), `agent_telemetry.trace`
+in the response body, and — when TRACE_EXPORT_PATH is set — a sampled
+JSON-lines file for offline analysis.
+
+Every HTTP request also gets a request id (the client's X-Request-ID if it
+sent a sane one, else a fresh one), echoed back in the X-Request-ID response
+header and available anywhere in the request via current_request_id() —
+exported traces and event-loop stall reports carry it. The stall watchdog
+runs on another thread, where that context variable cannot be read
+(Task.get_context() is 3.12+ only), so request ids are also kept per task:
+the middleware registers the request's own task, and the loop's task factory
+(install_task_factory) stamps every task created while a request id is set.
+task_request_id(task) reads the map from any thread.
+
+Configuration (environment):
+  TRACE_EXPORT_PATH   JSON-lines file for sampled traces  ("" disables)
+  TRACE_SAMPLE_RATE   fraction of traces exported          (0.01)
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+
+class Span:
+    """One timed phase; children are the phases it ran."""
+
+    __slots__ = ("name", "attrs", "started", "ended", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def finish(self):
+        if self.ended is None:
+            self.ended = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.ended or time.perf_counter()) - self.started) * 1000
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Nested {name, start_ms (from the root), duration_ms, attrs, children}."""
+        origin = self.started if origin is None else origin
+        node: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 2),
+            "duration_ms": round(self.duration_ms, 2),
+        }
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if self.children:
+            node["children"] = [c.to_dict(origin) for c in self.children]
+        return node
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# task -> request id, for readers outside the task's context (see module docstring)
+_task_request_ids: Dict[asyncio.Task, str] = {}
+
+
+def task_request_id(task: asyncio.Task) -> Optional[str]:
+    return _task_request_ids.get(task)
+
+
+def _forget_task(task: asyncio.Task):
+    _task_request_ids.pop(task, None)
+
+
+def install_task_factory(loop: asyncio.AbstractEventLoop):
+    """Stamp tasks created inside a request with its id (wraps any existing factory)."""
+    previous = loop.get_task_factory()
+    if getattr(previous, "stamps_request_ids", False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        if previous is None:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        else:
+            task = previous(loop, coro, **kwargs)
+        context = kwargs.get("context")  # 3.11+: the task runs in this context, not ours
+        request_id = context.get(_request_id) if context is not None else _request_id.get()
+        if request_id is not None:
+            _task_request_ids[task] = request_id
+            task.add_done_callback(_forget_task)
+        return task
+
+    factory.stamps_request_ids = True
+    loop.set_task_factory(factory)
+
+
+def start_trace(name: str, **attrs) -> Span:
+    """Make a new root span current for this request (and the tasks it spawns)."""
+    root = Span(name, attrs)
+    _current_span.set(root)
+    return root
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a phase as a child of the current span; no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+_METRIC_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def server_timing(root: Span) -> str:
+    """Server-Timing header value: every span by dotted path, then the total."""
+    metrics = []
+
+    def add(spans: List[Span], prefix: str):
+        for child in spans:
+            name = prefix + _METRIC_UNSAFE.sub("_", child.name)
+            metrics.append(f"{name};dur={child.duration_ms:.1f}")
+            add(child.children, name + ".")
+
+    add(root.children, "")
+    metrics.append(f"total;dur={root.duration_ms:.1f}")
+    return ", ".join(metrics)
+
+
+class TraceExporter:
+    """Appends a sample of finished traces to a JSON-lines file (off the event loop)."""
+
+    def __init__(self, path: Optional[str], sample_rate: float):
+        self.path = path or None
+        self.sample_rate = sample_rate
+        self._pending: Set[asyncio.Task] = set()
+        self.stats = {"exported": 0, "failed": 0}
+
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def _write(self, line: str):
+        try:
+            await asyncio.to_thread(self._append, line)
+            self.stats["exported"] += 1
+        except OSError as e:
+            self.stats["failed"] += 1
+            print(f"⚠️ Trace export failed: {e}")
+
+    def maybe_export(self, root: Span):
+        if self.path is None or random.random() >= self.sample_rate:
+            return
+        record = {
+            "trace_id": uuid.uuid4().hex,
+            "request_id": current_request_id(),
+            "timestamp": time.time(),
+            **root.to_dict(),
+        }
+        task = asyncio.create_task(self._write(json.dumps(record, default=str)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.path is not None,
+            "sample_rate": self.sample_rate,
+        }
+
+
+# Global instance
+trace_exporter = TraceExporter(
+    path=os.environ.get("TRACE_EXPORT_PATH", ""),
+    sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", 0.01)),
+)
+
+
+_REQUEST_ID_SAFE = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware: assigns the request id and echoes it in X-Request-ID."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_SAFE.match(incoming) else uuid.uuid4().hex[:16]
+        token = _request_id.set(request_id)
+        # The server created this task before the id existed, so the factory could not stamp it
+        task = asyncio.current_task()
+        previous = _task_request_ids.get(task)
+        _task_request_ids[task] = request_id
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message.get("headers") or [] if k.lower() != b"x-request-id"]
+                message = {**message, "headers": headers + [(b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
+            if previous is None:
+                _task_request_ids.pop(task, None)
+            else:
+                _task_request_ids[task] = previous
@@ -3,10 +3,16 @@ Behavioral Personalization Engine (K-Means Clustering)
 Classifies users into personas based on search history and intent.
 """
 
+import asyncio
+import json
 import math
 import time
-from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+from itertools import islice
+from typing import Deque, List, Dict, Tuple, Optional
+from collections import OrderedDict, deque
+
+from .keyword_engine import keyword_engine
+from .shared_store import shared_store, schedule_write
 
 # --- PERSONA DEFINITIONS ---
 class PersonaType:
@@ -29,31 +35,60 @@ INTENT_KEYWORDS = {
         "camera", "dslr", "watch", "smartwatch", "ac", "fridge", "monitor"
     ]
 }
+keyword_engine.register("intent", INTENT_KEYWORDS)
+
+# Per-session memory caps: history is a ring buffer, frequent items a bounded tally
+MAX_SEARCH_HISTORY = 20
+MAX_FREQUENT_ITEMS = 32
+
+# Emergency items to pre-warm for Emergency Buyers
+EMERGENCY_ESSENTIALS = ["charger", "paracetamol", "milk", "sanitizer", "battery"]
+MAX_PREFETCH_PER_SEARCH = 6
+
 
 class UserSession:
     """Tracks a single user's session data and enables anticipatory prefetching."""
+
+    # Slotted: no per-instance __dict__, which matters at millions of guest sessions
+    __slots__ = (
+        "session_id", "searches", "frequent_items", "last_active", "persona",
+        "price_sensitivity", "time_sensitivity",
+    )
+
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.searches: List[Dict] = []
-        self.frequent_items: Dict[str, int] = defaultdict(int)
+        # (query, timestamp, context) tuples, oldest dropped automatically
+        self.searches: Deque[Tuple[str, float, str]] = deque(maxlen=MAX_SEARCH_HISTORY)
+        self.frequent_items: Dict[str, int] = {}
         self.last_active = time.time()
         self.persona: str = PersonaType.UNKNOWN
-        self.features = {
-            "avg_price_sensitivity": 0.5, # 0=Low, 1=High (Bargain Hunter)
-            "avg_time_sensitivity": 0.5,  # 0=Low, 1=High (Emergency Buyer)
+        self.price_sensitivity = 0.5  # 0=Low, 1=High (Bargain Hunter)
+        self.time_sensitivity = 0.5   # 0=Low, 1=High (Emergency Buyer)
+
+    @property
+    def features(self) -> Dict[str, float]:
+        return {
+            "avg_price_sensitivity": self.price_sensitivity,
+            "avg_time_sensitivity": self.time_sensitivity,
         }
 
-    def add_search(self, query: str, context: str = "general"):
+    def add_search(self, query: str, context: str = "general",
+                   pincode: Optional[str] = None, country=None):
         query_clean = query.lower().strip()
-        self.searches.append({
-            "query": query_clean,
-            "timestamp": time.time(),
-            "context": context
-        })
-        self.frequent_items[query_clean] += 1
-        self.last_active = time.time()
+        now = time.time()
+        self.searches.append((query_clean, now, context))
+        self._count_item(query_clean)
+        self.last_active = now
         self._update_persona()
-        self._trigger_predictive_prefetching(query_clean)
+        if pincode:
+            self._trigger_predictive_prefetching(query_clean, pincode, country)
+
+    def _count_item(self, item: str):
+        counts = self.frequent_items
+        if item not in counts and len(counts) >= MAX_FREQUENT_ITEMS:
+            # Evict the least-searched item (oldest first on ties)
+            del counts[min(counts, key=counts.get)]
+        counts[item] = counts.get(item, 0) + 1
 
     def _update_persona(self):
         """Update persona using a lightweight classification logic."""
@@ -61,15 +96,15 @@ class UserSession:
             return
 
         # Simple feature extraction from last 5 searches
-        recent = self.searches[-5:]
+        recent = list(islice(reversed(self.searches), 5))
         urgency_score = 0
         value_score = 0
         
-        for s in recent:
-            q = s["query"].lower()
-            if any(k in q for k in INTENT_KEYWORDS["urgency"]):
+        for q, _, _ in recent:
+            intents = keyword_engine.labels(q, "intent")
+            if "urgency" in intents:
                 urgency_score += 1
-            if any(k in q for k in INTENT_KEYWORDS["high_value"]):
+            if "high_value" in intents:
                 value_score += 1
 
         total = len(recent)
@@ -85,25 +120,66 @@ class UserSession:
         else:
             self.persona = PersonaType.UNKNOWN
 
-    def _trigger_predictive_prefetching(self, last_query: str):
+    def predict_next_queries(self, last_query: str) -> List[str]:
+        """Queries this user is likely to run next, most likely first."""
+        from .mock_data import RELATED_PRODUCTS
+
+        predicted: List[str] = []
+        if self.persona == PersonaType.EMERGENCY_BUYER:
+            predicted.extend(EMERGENCY_ESSENTIALS)
+
+        # Regulars: anything searched at least twice, most frequent first
+        regulars = sorted(self.frequent_items.items(), key=lambda kv: -kv[1])
+        predicted.extend(item for item, count in regulars[:3] if count >= 2)
+
+        # Accessories / complements of what was just searched
+        for key, related in RELATED_PRODUCTS.items():
+            if key in last_query or last_query in key:
+                predicted.extend(related[:3])
+                break
+
+        seen = {last_query}
+        unique = []
+        for q in predicted:
+            if q not in seen:
+                seen.add(q)
+                unique.append(q)
+        return unique[:MAX_PREFETCH_PER_SEARCH]
+
+    def _trigger_predictive_prefetching(self, last_query: str, pincode: str, country=None):
         """
-        Anticipatory Agent: If the persona is Emergency Buyer, pre-warm cache for popular items.
-        In a real app, this would trigger background scraping tasks.
+        Anticipatory Agent: queue background warming of the PriceCache for the
+        predicted next searches so they are served in <200ms.
         """
-        if self.persona == PersonaType.EMERGENCY_BUYER:
-            # Emergency items to pre-scrape
-            emergency_essentials = ["charger", "paracetamol", "milk", "sanitizer", "battery"]
-            
-            # Use price_cache from data_engine (imported later or injected)
-            from .data_engine import price_cache
-            from .scrapers import get_quick_commerce_results # For synthetic/simulated data
-            from .models import CountryCode
-            
-            for item in emergency_essentials:
-                if not price_cache.get(item, "PREFETCH"):
-                    # Populate cache with fast simulated results to enable <200ms searches
-                    # This simulates a background worker having finished the job
-                    pass 
+        from .prefetcher import prefetcher
+        from .models import CountryCode
+
+        predictions = self.predict_next_queries(last_query)
+        if predictions:
+            prefetcher.submit(predictions, pincode, country or CountryCode.IN)
+
+    def to_dict(self) -> Dict:
+        """Serialize for the shared L2 store."""
+        return {
+            "session_id": self.session_id,
+            "searches": list(self.searches),
+            "frequent_items": self.frequent_items,
+            "last_active": self.last_active,
+            "persona": self.persona,
+            "features": self.features,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "UserSession":
+        session = cls(data["session_id"])
+        session.searches.extend(tuple(s) for s in data.get("searches", []))
+        session.frequent_items.update(data.get("frequent_items", {}))
+        session.last_active = data.get("last_active", time.time())
+        session.persona = data.get("persona", PersonaType.UNKNOWN)
+        features = data.get("features", {})
+        session.price_sensitivity = features.get("avg_price_sensitivity", 0.5)
+        session.time_sensitivity = features.get("avg_time_sensitivity", 0.5)
+        return session
 
     def get_reorder_suggestions(self) -> List[Dict]:
         """Identify items the user buys frequently and find imaginary discounts."""
@@ -119,31 +195,141 @@ class UserSession:
                 })
         return suggestions[:2]
 
-# In-memory storage for active sessions
-_sessions: Dict[str, UserSession] = {}
+# ============================================================
+# SESSION STORE — idle-TTL eviction with a background sweeper
+# ============================================================
+
+SESSION_TTL_SECONDS = 3600
+MAX_SESSIONS = 200_000
+SWEEP_INTERVAL_SECONDS = 60
+_SESSION_PREFIX = "px:session:"
+
+
+class SessionStore:
+    """
+    In-memory storage for active sessions (L1), kept in last-access order so
+    idle sessions sit at the front: a sweep pops only what has expired, and
+    the hard cap evicts least-recently-active sessions first. With a shared
+    store configured, sessions are also persisted to L2 so any worker can
+    serve the next request (and an evicted session can come back from L2).
+    """
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS):
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
+        self._ttl = ttl_seconds
+        self._max = max_sessions
+        self._sweeper: Optional[asyncio.Task] = None
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[UserSession]:
+        return self._sessions.get(session_id)
+
+    def touch(self, session_id: str) -> UserSession:
+        """Get-or-create a session and mark it most recently active."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = UserSession(session_id)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self._max:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def adopt(self, session: UserSession):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+
+    def sweep(self) -> int:
+        """Drop sessions idle for longer than the TTL. Returns the number removed."""
+        cutoff = time.time() - self._ttl
+        removed = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_active > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        self.evicted += removed
+        return removed
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def start_sweeper(self, interval: float = SWEEP_INTERVAL_SECONDS):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval))
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+
+session_store = SessionStore()
+
+
+async def load_session(session_id: str):
+    """
+    Refresh a session from L2 before it is mutated. Another worker may have
+    served this user since our L1 copy was made; writing the stale copy back
+    would overwrite its update, so the L2 copy wins whenever it is newer.
+    """
+    if shared_store is None:
+        return
+    raw = await shared_store.get(_SESSION_PREFIX + session_id)
+    if not raw:
+        return
+    try:
+        remote = UserSession.from_dict(json.loads(raw))
+    except (ValueError, KeyError, TypeError):
+        return
+    local = session_store.get(session_id)
+    if local is None or remote.last_active > local.last_active:
+        session_store.adopt(remote)
+
+
+def _persist_session(session: UserSession):
+    if shared_store is None:
+        return
+    schedule_write(shared_store.set(
+        _SESSION_PREFIX + session.session_id,
+        json.dumps(session.to_dict()).encode(),
+        ttl=SESSION_TTL_SECONDS,
+    ))
 
 def get_user_persona(session_id: str) -> str:
     """Get the current persona for a session."""
-    if session_id not in _sessions:
+    session = session_store.get(session_id)
+    if session is None:
         return PersonaType.UNKNOWN
-    return _sessions[session_id].persona
+    return session.persona
 
 def get_reorder_suggestions(session_id: str) -> List[Dict]:
     """Get smart reorder suggestions for the anticipatory agent."""
-    if session_id not in _sessions: return []
-    return _sessions[session_id].get_reorder_suggestions()
+    session = session_store.get(session_id)
+    if session is None: return []
+    return session.get_reorder_suggestions()
 
-def track_user_search(session_id: str, query: str):
-    """Update user session with new search data."""
-    if session_id not in _sessions:
-        _sessions[session_id] = UserSession(session_id)
-    
-    _sessions[session_id].add_search(query)
+def track_user_search(session_id: str, query: str, pincode: Optional[str] = None, country=None):
+    """Update user session with new search data (and queue prefetching for its location)."""
+    session = session_store.touch(session_id)
+    session.add_search(query, pincode=pincode, country=country)
+    _persist_session(session)
 
 def get_active_sessions_count() -> int:
-    # Cleanup old sessions > 1 hour
-    now = time.time()
-    expired = [sid for sid, s in _sessions.items() if (now - s.last_active) > 3600]
-    for sid in expired:
-        del _sessions[sid]
-    return len(_sessions)
+    session_store.sweep()
+    return len(session_store)
@@ -0,0 +1,209 @@
+"""
+Wire Formats — binary and columnar encodings of search results
+Machine clients (analytics, partner feeds) parse millions of rows a day and
+spend most of that decoding JSON. /search and /search/batch pick a body
+encoding from the request's Accept header:
+
+  application/json                      the default (also for */* or no Accept)
+  application/msgpack                   the same nested payload as MessagePack
+                                        (optional `msgpack` package)
+  application/vnd.apache.arrow.stream   flat product rows as an Arrow IPC stream
+                                        (optional `pyarrow` package)
+  application/vnd.parallax.columns+json flat product rows as column arrays
+                                        (no extra dependency)
+
+The columnar formats carry one row per product of the requested page (sort /
+limit / offset apply) with the PRODUCT_COLUMNS below; `fields` selects
+columns by name. Formats whose package is not installed are never
+negotiated — the client gets JSON instead.
+
+Batch bodies are streams: concatenated MessagePack objects, newline-delimited
+column objects, or one Arrow stream with a record batch per item (plus an
+`item` column holding the request index).
+"""
+
+import io
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .compression import accept_weights
+
+try:
+    import msgpack
+except ImportError:  # optional dependency: no MessagePack
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional dependency: no Arrow IPC
+    pyarrow = None
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+COLUMNS = "application/vnd.parallax.columns+json"
+COLUMNAR_FORMATS = (ARROW, COLUMNS)
+
+# Other names clients send for the same formats
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+
+def _breakdown(field: str) -> Callable[[Dict], Any]:
+    return lambda p: (p.get("price_breakdown") or {}).get(field)
+
+
+# column -> (arrow type name, extractor over a JSON-ready product dict)
+PRODUCT_COLUMNS: Dict[str, Tuple[str, Callable[[Dict], Any]]] = {
+    "id": ("string", lambda p: p.get("id")),
+    "platform": ("string", lambda p: p.get("platform")),
+    "title": ("string", lambda p: p.get("title")),
+    "base_price": ("float64", _breakdown("base_price")),
+    "delivery_fee": ("float64", _breakdown("delivery_fee")),
+    "platform_fee": ("float64", _breakdown("platform_fee")),
+    "handling_fee": ("float64", _breakdown("handling_fee")),
+    "discount": ("float64", _breakdown("discount")),
+    "total_landed_cost": ("float64", _breakdown("total_landed_cost")),
+    "currency": ("string", _breakdown("currency")),
+    "eta_minutes": ("int32", lambda p: p.get("eta_minutes")),
+    "delivery_speed": ("string", lambda p: p.get("delivery_speed")),
+    "rating": ("float64", lambda p: p.get("rating")),
+    "reviews_count": ("int64", lambda p: p.get("reviews_count")),
+    "in_stock": ("bool_", lambda p: p.get("in_stock")),
+    "url": ("string", lambda p: p.get("url")),
+}
+
+
+def supported_formats() -> List[str]:
+    """Server preference order (ties go to the earlier format)."""
+    return (
+        [JSON]
+        + ([MSGPACK] if msgpack is not None else [])
+        + ([ARROW] if pyarrow is not None else [])
+        + [COLUMNS]
+    )
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    The media type to answer with. Only an explicit Accept entry selects a
+    non-JSON format; wildcards (*/*, application/*) mean JSON.
+    """
+    weights: Dict[str, float] = {}
+    for token, q in accept_weights(accept).items():
+        token = _ALIASES.get(token, token)
+        weights[token] = max(q, weights.get(token, 0.0))
+    best, best_q = JSON, weights.get(JSON, 0.0)
+    for media_type in supported_formats()[1:]:
+        q = weights.get(media_type, 0.0)
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def select_columns(fields: Optional[str]) -> List[str]:
+    """Column names picked by `fields` (all columns if none of them match)."""
+    wanted = [f.strip() for f in (fields or "").split(",") if f.strip() in PRODUCT_COLUMNS]
+    return wanted or list(PRODUCT_COLUMNS)
+
+
+def product_columns(groups: List[Dict], columns: List[str]) -> Dict[str, list]:
+    """Flatten JSON-ready product groups into {column: values} + group_id."""
+    table: Dict[str, list] = {"group_id": []}
+    table.update({name: [] for name in columns})
+    for group in groups:
+        for product in group.get("products", []):
+            table["group_id"].append(group.get("group_id"))
+            for name in columns:
+                table[name].append(PRODUCT_COLUMNS[name][1](product))
+    return table
+
+
+def encode_payload(media_type: str, payload: Dict, compact: bool = False) -> bytes:
+    """Encode a nested (JSON-ready) payload as JSON or MessagePack."""
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    # ensure_ascii=True escapes any surviving surrogates into \uXXXX
+    separators = (",", ":") if compact else None
+    return json.dumps(payload, ensure_ascii=True, separators=separators).encode()
+
+
+def _arrow_schema(table: Dict[str, list], metadata: Dict[str, Any]):
+    types = {"item": "int32", "group_id": "string"}
+    types.update({name: arrow_type for name, (arrow_type, _) in PRODUCT_COLUMNS.items()})
+    return pyarrow.schema(
+        [pyarrow.field(name, getattr(pyarrow, types[name])()) for name in table],
+        metadata={k: json.dumps(v) for k, v in metadata.items()},
+    )
+
+
+def encode_columns(media_type: str, table: Dict[str, list], metadata: Dict[str, Any]) -> bytes:
+    """Encode one flat product table (search metadata alongside)."""
+    if media_type == ARROW:
+        schema = _arrow_schema(table, metadata)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(pyarrow.record_batch(table, schema=schema))
+        return sink.getvalue().to_pybytes()
+    rows = len(table["group_id"])
+    return json.dumps({**metadata, "rows": rows, "columns": table}, ensure_ascii=True,
+                      separators=(",", ":")).encode()
+
+
+class BatchEncoder:
+    """Incremental body of a /search/batch stream in one negotiated format."""
+
+    def __init__(self, media_type: str, columns: List[str], compact: bool = False):
+        self.media_type = media_type
+        self.columns = columns
+        self.compact = compact
+        self._arrow_buffer: Optional[io.BytesIO] = None
+        self._arrow_writer = None
+        self._arrow_schema = None
+
+    @property
+    def columnar(self) -> bool:
+        return self.media_type in COLUMNAR_FORMATS
+
+    def _line(self, obj: Dict) -> bytes:
+        if self.media_type == MSGPACK:
+            return msgpack.packb(obj, use_bin_type=True)
+        return encode_payload(JSON, obj, self.compact or self.columnar) + b"\n"
+
+    def item(self, index: int, payload: Optional[Dict] = None, table: Optional[Dict[str, list]] = None,
+             metadata: Optional[Dict[str, Any]] = None) -> bytes:
+        """One item's result: a nested payload, or a product table for columnar formats."""
+        if table is None:
+            return self._line({"index": index, **(payload or {})})
+        if self.media_type != ARROW:
+            return self._line({"index": index, **(metadata or {}), "rows": len(table["group_id"]),
+                               "columns": table})
+        self._start_arrow()
+        table = {"item": [index] * len(table["group_id"]), **table}
+        self._arrow_writer.write_batch(pyarrow.record_batch(table, schema=self._arrow_schema))
+        return self._drain()
+
+    def error(self, index: int, details: Dict) -> bytes:
+        # Arrow streams carry rows only: a failed item simply has none
+        return b"" if self.media_type == ARROW else self._line({"index": index, **details})
+
+    def summary(self, summary: Dict) -> bytes:
+        if self.media_type != ARROW:
+            return self._line({"summary": summary})
+        self._start_arrow()
+        self._arrow_writer.close()  # end-of-stream marker
+        return self._drain()
+
+    def _start_arrow(self):
+        if self._arrow_writer is None:
+            # Schema first: every item's batch has the same columns
+            self._arrow_schema = _arrow_schema({"item": [], "group_id": [], **{c: [] for c in self.columns}}, {})
+            self._arrow_buffer = io.BytesIO()
+            self._arrow_writer = pyarrow.ipc.new_stream(self._arrow_buffer, self._arrow_schema)
+
+    def _drain(self) -> bytes:
+        chunk = self._arrow_buffer.getvalue()
+        self._arrow_buffer.seek(0)
+        self._arrow_buffer.truncate()
+        return chunk
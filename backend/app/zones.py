@@ -0,0 +1,93 @@
+"""
+Delivery Zones — pincode → cache zone mapping per platform
+Scraped results depend on location far more coarsely than the exact pincode:
+the quick-commerce scrapers send the same lat/lon for every pincode sharing a
+3-digit prefix (see get_coordinates_from_pincode), and the marketplace
+scrapers (Amazon, Flipkart, Myntra, Ajio, ...) send no location at all.
+Caching on the exact pincode therefore scrapes the same result set once per
+pincode in a metro. Cache keys use the zone instead.
+
+Per-platform policy = number of leading pincode digits that matter:
+  0     national — results keyed by query alone
+  3     prefix zone (default for hyperlocal platforms)
+  None  exact postal code (platforms we have not characterised)
+
+Override per platform with ZONE_DIGITS, e.g. ZONE_DIGITS="blinkit=4,amazon_in=0".
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+from .models import PlatformType, CountryCode, COUNTRY_CONFIG
+
+
+NATIONAL_ZONE = "national"
+
+PLATFORM_ZONE_DIGITS: Dict[PlatformType, Optional[int]] = {
+    # Hyperlocal dark-store platforms: results vary by serviceable area
+    PlatformType.BLINKIT: 3,
+    PlatformType.ZEPTO: 3,
+    PlatformType.SWIGGY_INSTAMART: 3,
+    PlatformType.BIGBASKET: 3,
+    PlatformType.JIOMART: 3,
+    PlatformType.ZOMATO: 3,
+    # Marketplaces: our scrapers do not send a location
+    PlatformType.AMAZON_IN: 0,
+    PlatformType.FLIPKART: 0,
+    PlatformType.MYNTRA: 0,
+    PlatformType.AJIO: 0,
+    PlatformType.MEESHO: 0,
+    PlatformType.NYKAA: 0,
+    PlatformType.TATA_CLIQ: 0,
+}
+
+
+def _apply_overrides(spec: Optional[str]):
+    """Parse "platform=digits,..." from the environment into the policy table."""
+    for item in (spec or "").split(","):
+        name, _, digits = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            platform = PlatformType(name)
+        except ValueError:
+            print(f"⚠️ ZONE_DIGITS: unknown platform '{name}'")
+            continue
+        digits = digits.strip()
+        PLATFORM_ZONE_DIGITS[platform] = int(digits) if digits.isdigit() else None
+
+
+_apply_overrides(os.environ.get("ZONE_DIGITS"))
+
+
+def _zone(pincode: str, digits: Optional[int]) -> str:
+    pincode = pincode.strip().upper()
+    if digits == 0:
+        return NATIONAL_ZONE
+    if digits is None or not pincode[:digits].isdigit() or len(pincode) < digits:
+        return pincode
+    return pincode[:digits]
+
+
+def platform_zone(pincode: str, platform: PlatformType) -> str:
+    """Cache zone for one platform's results at this pincode."""
+    return _zone(pincode, PLATFORM_ZONE_DIGITS.get(platform))
+
+
+def result_zone(pincode: str, country: CountryCode = CountryCode.IN,
+                platforms: Optional[Iterable[PlatformType]] = None) -> str:
+    """
+    Cache zone for a merged result set: the finest granularity any of its
+    platforms needs (so one hyperlocal platform makes the set zone-scoped).
+    """
+    if platforms is None:
+        platforms = COUNTRY_CONFIG[country]["platforms"]
+    finest: Optional[int] = 0
+    for platform in platforms:
+        digits = PLATFORM_ZONE_DIGITS.get(platform)
+        if digits is None:
+            finest = None
+            break
+        finest = max(finest, digits)
+    return f"{country.value}:{_zone(pincode, finest)}"
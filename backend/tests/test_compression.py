@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import json
+import time
+
+import pytest
+
+from app import compression, main
+from app.compression import CompressionMiddleware, GzipPrefix, negotiate
+from app.models import CountryCode
+from app.result_sets import ResultSet, result_sets
+
+
+def test_gzip_prefix_splices_into_one_valid_member():
+    prefix = GzipPrefix(b'{"groups": [1, 2]')
+    body = prefix.finish(b', "trace": "abc"}')
+    assert gzip.decompress(body) == b'{"groups": [1, 2], "trace": "abc"}'
+    # Reused: every finish() is independent of the previous one
+    assert gzip.decompress(prefix.finish(b"}")) == b'{"groups": [1, 2]}'
+
+
+def test_negotiate(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate("gzip, br") == "gzip"
+    assert negotiate("*") == "gzip"
+    assert negotiate("br;q=1, gzip;q=0") is None
+    assert negotiate(None) is None
+
+
+class FakeBrotli:
+    @staticmethod
+    def compress(body, quality):
+        return b"br:" + body
+
+
+def test_middleware_matches_exact_paths():
+    body = b"x" * 4096
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    async def call(path):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [(b"accept-encoding", b"gzip")]}
+        await CompressionMiddleware(app, paths=("/search",), cached_paths=())(scope, None, send)
+        return dict(sent[0]["headers"]), sent[1]["body"]
+
+    headers, encoded = asyncio.run(call("/search"))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(encoded) == body
+    headers, passed = asyncio.run(call("/search/batch"))
+    assert b"content-encoding" not in headers
+    assert passed == body
+
+
+@pytest.fixture
+def cached_search(monkeypatch):
+    """/search over a fixed result set, so only the per-request fields differ."""
+    built = []
+
+    async def fake_build(query, postal_code, country, orchestrator):
+        built.append(query)
+        result_set = ResultSet(products=[], groups=[], sort_fields=[], expires_at=time.time() + 60)
+        result_sets.put(query, postal_code, country, result_set)
+        return result_set, None
+
+    monkeypatch.setattr(main, "build_result_set", fake_build)
+    monkeypatch.setattr(main, "generate_product_insights", lambda **kwargs: {"tip": "x" * 2000})
+    monkeypatch.setattr(main, "get_related_products", lambda query, country: [])
+    return built
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_search_splices_per_request_fields_onto_a_cached_page(cached_search, compact, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)  # "gzip, br" must negotiate gzip
+    query = f"splice milk {compact}"
+
+    async def search(accept_encoding):
+        return await main.perform_search(query, "560001", CountryCode.IN, "splice-session",
+                                         compact, accept_encoding=accept_encoding)
+
+    plain = asyncio.run(search(None))
+    first = asyncio.run(search("gzip"))
+    second = asyncio.run(search("gzip, br"))
+    assert "content-encoding" not in plain.headers
+    assert first.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in first.headers["vary"]
+
+    expected = json.loads(plain.body)
+    for response in (first, second):
+        decoded = json.loads(gzip.decompress(response.body))
+        # Per-request fields are still fresh on every response
+        assert decoded.keys() == expected.keys()
+        assert decoded["insights"] == expected["insights"]
+        assert decoded["product_groups"] == expected["product_groups"]
+
+    # The page itself was compressed once and reused
+    view = result_sets.get(query, "560001", CountryCode.IN).view(query, "560001")
+    assert len(view._pages) == 1
+
+
+def test_search_leaves_br_to_the_middleware(cached_search, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", FakeBrotli)
+
+    async def search(accept_encoding):
+        return await main.perform_search("splice br milk", "560001", CountryCode.IN, "splice-session",
+                                         False, accept_encoding=accept_encoding)
+
+    preferred = asyncio.run(search("br, gzip"))
+    assert "content-encoding" not in preferred.headers
+    json.loads(preferred.body)
+    assert asyncio.run(search("br;q=0.5, gzip")).headers["content-encoding"] == "gzip"
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+from app import data_engine
+from app.data_engine import PriceCache
+from app.models import CountryCode
+from app.shared_store import MemoryStore
+
+
+def test_result_store_is_bounded(monkeypatch):
+    monkeypatch.setattr(data_engine, "MAX_RESULT_ENTRIES", 3)
+    cache = PriceCache()
+    for i in range(5):
+        cache.put(f"bounded query {i}", "560001", [])
+
+    assert len(cache._store) == 3
+    assert cache.get("bounded query 0", "560001") is None
+    assert cache.get("bounded query 4", "560001") == []
+    stats = cache.get_stats()
+    assert stats["evictions"] == 2
+    assert stats["l1_bytes"]["results"] == sum(cache._sizes[k] for k in cache._store)
+
+
+def test_l2_promotions_respect_the_cap(monkeypatch):
+    monkeypatch.setattr(data_engine, "MAX_RESULT_ENTRIES", 2)
+    l2 = MemoryStore()
+    writer = PriceCache(l2=l2)
+    reader = PriceCache(l2=l2)
+
+    async def scenario():
+        for i in range(4):
+            query = f"promoted query {i}"
+            key = writer._make_key(query, "560001", CountryCode.IN)
+            entry = {"data": [], "timestamp": data_engine.time.time(), "query": query}
+            await l2.set(PriceCache.L2_PREFIX + key, json.dumps(entry).encode())
+            assert await reader.fetch(query, "560001") == []
+
+    asyncio.run(scenario())
+    assert len(reader._store) == 2
+    assert reader.get_stats()["evictions"] == 2
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import zlib
+
+import httpx
+
+from app.http_cache import EVICT_SCAN_FRACTION, HttpRevalidationCache
+
+
+def response(body: bytes) -> httpx.Response:
+    return httpx.Response(200, headers={"etag": '"v1"'}, content=body)
+
+
+def disk_bytes(directory) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".z"))
+
+
+def test_workers_see_each_others_entries(tmp_path):
+    first = HttpRevalidationCache(str(tmp_path), max_bytes=1 << 20)
+    second = HttpRevalidationCache(str(tmp_path), max_bytes=1 << 20)
+
+    async def scenario():
+        await first.store("GET https://shop/a", response(b"page a"), "digest-a")
+        meta, compressed = await second.lookup("GET https://shop/a")
+        assert meta["etag"] == '"v1"' and zlib.decompress(compressed) == b"page a"
+        assert second.get_stats()["entries"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cap_holds_for_the_shared_directory(tmp_path):
+    cap = 64 * 1024
+    workers = [HttpRevalidationCache(str(tmp_path), max_bytes=cap) for _ in range(4)]
+
+    async def scenario():
+        for i in range(200):
+            body = os.urandom(2048)  # incompressible
+            await workers[i % 4].store(f"GET https://shop/{i}", response(body), f"d{i}")
+
+    asyncio.run(scenario())
+    assert disk_bytes(tmp_path) <= cap + len(workers) * cap / EVICT_SCAN_FRACTION + 4096
+    # The newest entries survive, whoever wrote them
+    assert asyncio.run(workers[0].lookup("GET https://shop/199")) is not None
+
+
+def test_entry_evicted_by_another_worker_is_a_clean_miss(tmp_path):
+    first = HttpRevalidationCache(str(tmp_path), max_bytes=1 << 20)
+
+    async def scenario():
+        await first.store("GET https://shop/a", response(b"page a"), "digest-a")
+        second = HttpRevalidationCache(str(tmp_path), max_bytes=1 << 20)
+        for entry in os.scandir(tmp_path):
+            if entry.name.endswith(".z"):
+                os.remove(entry.path)
+        assert await second.lookup("GET https://shop/a") is None
+        assert second.get_stats()["entries"] == 0
+        assert second.get_stats()["disk_bytes"] == 0
+
+    asyncio.run(scenario())
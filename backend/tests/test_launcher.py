@@ -0,0 +1,34 @@
+import pytest
+
+from app import launcher
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+
+    def set_cpus(affinity: int, quota):
+        monkeypatch.setattr(launcher.os, "sched_getaffinity", lambda pid: set(range(affinity)), raising=False)
+        monkeypatch.setattr(launcher, "_cgroup_cpu_limit", lambda: quota)
+
+    return set_cpus
+
+
+def test_default_workers_follow_the_cgroup_quota(cpus):
+    cpus(64, 1.5)
+    assert launcher.default_workers() == 2
+    cpus(64, 0.1)
+    assert launcher.default_workers() == 1
+
+
+def test_default_workers_are_capped(cpus):
+    cpus(64, None)
+    assert launcher.default_workers() == launcher.MAX_DEFAULT_WORKERS
+    cpus(2, None)
+    assert launcher.default_workers() == 2
+
+
+def test_web_concurrency_wins(cpus, monkeypatch):
+    cpus(64, 1.0)
+    monkeypatch.setenv("WEB_CONCURRENCY", "6")
+    assert launcher.default_workers() == 6
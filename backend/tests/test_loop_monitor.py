@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from app.loop_monitor import LoopLagMonitor, _running_request
+from app.tracing import RequestIdMiddleware, _task_request_ids, install_task_factory
+
+
+def request_scope(request_id: str):
+    return {"type": "http", "path": "/search", "headers": [(b"x-request-id", request_id.encode())]}
+
+
+async def call(app, scope):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def test_request_id_is_visible_per_task_without_the_tasks_context():
+    seen = {}
+
+    async def app(scope, receive, send):
+        loop = asyncio.get_running_loop()
+        seen["handler"] = _running_request(loop)["request_id"]
+
+        async def child():
+            seen["child"] = _running_request(loop)["request_id"]
+
+        await asyncio.gather(child())
+
+    async def scenario():
+        install_task_factory(asyncio.get_running_loop())
+        await asyncio.create_task(call(RequestIdMiddleware(app), request_scope("req-1")))
+
+    asyncio.run(scenario())
+    assert seen == {"handler": "req-1", "child": "req-1"}
+    assert not _task_request_ids  # forgotten once the tasks are done
+
+
+def test_stall_report_names_the_blocking_request():
+    monitor = LoopLagMonitor(interval_ms=20, threshold_ms=50)
+
+    async def app(scope, receive, send):
+        async def parse():
+            time.sleep(0.3)  # a sync stage holding the loop
+
+        await asyncio.create_task(parse())
+
+    async def scenario():
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(call(RequestIdMiddleware(app), request_scope("slow-req")))
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+    asyncio.run(scenario())
+    sampled = [s for s in monitor.recent_stalls if s["stack"]]
+    assert sampled and sampled[0]["request_id"] == "slow-req"
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from app.latency import RollingHistogram
+from app.metrics import MetricFamily, MetricsRegistry, merge_snapshots
+
+
+def dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = RollingHistogram()
+    for ms in (0.5, 3, 3, 40, 2000):
+        histogram.record(ms)
+    buckets = dict(histogram.cumulative((1, 5, 50, 1000, 5000)))
+    assert buckets == {1: 1, 5: 3, 50: 4, 1000: 4, 5000: 5}
+
+
+def test_merge_sums_counters_and_keeps_gauges_per_live_worker():
+    def families(requests: int, sessions: int):
+        counter = MetricFamily("requests_total", "counter", "Requests").add(requests, {"path": "/search"})
+        gauge = MetricFamily("active_sessions", "gauge", "Sessions").add(sessions)
+        latency = MetricFamily("latency_seconds", "histogram", "Latency")
+        latency.add(requests, {"le": "+Inf"}, "_bucket").add(requests, suffix="_count")
+        return [counter, gauge, latency]
+
+    gone = dead_pid()
+    merged = {f.name: f for f in merge_snapshots({os.getpid(): families(3, 7), gone: families(2, 5)})}
+
+    assert merged["parallax_requests_total"].samples == [("", {"path": "/search"}, 5.0)]
+    # An exited worker's sessions are gone; its counts are not
+    assert merged["parallax_active_sessions"].samples == [("", {"worker": str(os.getpid())}, 7)]
+    assert ("_bucket", {"le": "+Inf"}, 5.0) in merged["parallax_latency_seconds"].samples
+
+
+def test_shared_registry_renders_every_workers_snapshot(tmp_path):
+    (tmp_path / "1.json").write_text("stale from a previous run")
+    registry = MetricsRegistry()
+    registry.share(str(tmp_path))
+    assert not (tmp_path / "1.json").exists()
+
+    hits = registry.counter("hits_total", "Hits", ("cache",))
+    hits.inc("price", amount=4)
+    other = dead_pid()
+    (tmp_path / f"{other}.json").write_text(json.dumps([
+        ["parallax_hits_total", "counter", "Hits", [["", {"cache": "price"}, 6]]],
+    ]))
+
+    text = asyncio.run(registry.render())
+    assert 'parallax_hits_total{cache="price"} 10' in text
+    # The answering worker published its own snapshot too
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+
+def test_unshared_registry_reports_this_process_only():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits").inc(amount=2)
+    assert asyncio.run(registry.render()).splitlines()[-1] == "parallax_hits_total 2"
+
+
+def test_snapshot_files_are_touched_off_the_event_loop(tmp_path):
+    registry = MetricsRegistry()
+    registry.share(str(tmp_path))
+    registry.counter("hits_total", "Hits").inc()
+    threads = []
+    write, read = registry.write_snapshot, registry.read_snapshots
+    registry.write_snapshot = lambda families: threads.append(threading.get_ident()) or write(families)
+    registry.read_snapshots = lambda: threads.append(threading.get_ident()) or read()
+
+    async def scrape_then_stop():
+        text = await registry.render()
+        await registry.stop()
+        return text
+
+    assert "parallax_hits_total 1" in asyncio.run(scrape_then_stop())
+    assert len(threads) == 3 and threading.get_ident() not in threads
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+
+from app.outbound import OutboundScheduler, TokenBucket
+
+
+def test_token_bucket_refuses_waits_past_max_wait():
+    bucket = TokenBucket(rate=10, capacity=1)
+
+    async def scenario():
+        assert await bucket.acquire(max_wait=0.5)
+        # Next token is 0.1s away: too far for 0.05s, fine for 0.5s
+        assert not await bucket.acquire(max_wait=0.05)
+        assert await bucket.acquire(max_wait=0.5)
+
+    asyncio.run(scenario())
+    bucket._refill()
+    assert -0.1 < bucket.tokens < 0.1  # the refused waiter left no debt behind
+
+
+def test_cancelled_waiter_returns_its_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    async def scenario():
+        assert await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        assert bucket.tokens < -0.9  # reserved
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+    bucket._refill()
+    assert bucket.tokens > -0.1
+
+
+def test_slot_waits_count_against_the_deadline():
+    scheduler = OutboundScheduler(max_concurrency=1)
+    scheduler.configure({"shop": (100.0, 10.0)}, {"shop": 5.0})
+
+    async def scenario():
+        async with scheduler.slot("shop"):
+            started = time.time()
+            with pytest.raises(asyncio.TimeoutError):
+                async with scheduler.slot("shop", deadline=time.time() + 0.05):
+                    pass
+            assert time.time() - started < 0.5
+        # The timed-out waiter gave back its slot, controller permit and token
+        async with scheduler.slot("shop", deadline=time.time() + 0.05):
+            pass
+        assert scheduler._active == 0
+        assert scheduler._adaptive["shop"].inflight == 0
+
+    asyncio.run(scenario())
+    assert scheduler._buckets["shop"].tokens > 8
+
+
+def test_share_limits_splits_rates_across_workers():
+    scheduler = OutboundScheduler()
+    scheduler.configure({"shop": (4.0, 8.0), "slow": (0.5, 1.0)})
+    scheduler.share_limits(4)
+    assert (scheduler._buckets["shop"].rate, scheduler._buckets["shop"].capacity) == (1.0, 2.0)
+    assert (scheduler._buckets["slow"].rate, scheduler._buckets["slow"].capacity) == (0.125, 1.0)
@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+from app.prewarmer import SpaceSaving
+
+
+def test_space_saving_evicts_minimum_and_inherits_its_count():
+    sketch = SpaceSaving(capacity=3)
+    for key, hits in (("a", 5), ("b", 2), ("c", 3)):
+        for _ in range(hits):
+            sketch.add(key)
+    sketch.add("d")
+    assert "b" not in sketch
+    assert dict(sketch.top(3)) == {"a": 5, "c": 3, "d": 3}
+
+
+def test_space_saving_keeps_heavy_hitters_in_bounded_memory():
+    rng = random.Random(7)
+    sketch = SpaceSaving(capacity=32)
+    for _ in range(50_000):
+        sketch.add("hot" if rng.random() < 0.2 else f"cold-{rng.randrange(10_000)}")
+    assert len(sketch) == 32
+    assert len(sketch._heap) <= 4 * 32
+    assert sketch.top(1)[0][0] == "hot"
+
+
+def test_space_saving_decay_halves_and_drops_zeros():
+    sketch = SpaceSaving(capacity=4)
+    sketch.add("a", 5)
+    sketch.add("b", 1)
+    sketch.decay()
+    assert sketch.top(4) == [("a", 2)]
+    for key in "cdef":
+        sketch.add(key)
+    assert len(sketch) == 4 and "a" in sketch
+
+
+def test_warms_are_charged_only_to_the_stale_platforms(monkeypatch):
+    from app import prewarmer as module
+    from app.data_engine import price_cache
+    from app.models import CountryCode, PlatformType
+
+    async def expiring(query, pincode, country):
+        return 0.0
+
+    async def stale(query, pincode, platforms):
+        assert PlatformType.FLIPKART in platforms
+        return [PlatformType.AMAZON_IN]
+
+    async def warmed(query, pincode, country):
+        return True
+
+    monkeypatch.setattr(price_cache, "time_to_expiry", expiring)
+    monkeypatch.setattr(price_cache, "stale_platforms", stale)
+    monkeypatch.setattr(module, "warm_query", warmed)
+
+    warmer = module.PopularityPrewarmer(top_n=5, platform_budget_per_min=2)
+    for _ in range(module.MIN_HITS):
+        warmer.record("budget milk", "560001", CountryCode.IN)
+
+    # Budget of 2 per platform: two warms go through, the third is refused
+    assert [asyncio.run(warmer.refresh_once()) for _ in range(3)] == [1, 1, 0]
+    assert set(warmer._buckets) == {"amazon_in"}
+    assert warmer.stats["over_budget"] == 1
+
+
+def test_disabled_prewarmer_neither_records_nor_runs():
+    from app.models import CountryCode
+    from app.prewarmer import PopularityPrewarmer
+
+    warmer = PopularityPrewarmer()
+    warmer.enabled = False
+    warmer.record("milk", "560001", CountryCode.IN)
+    assert len(warmer.sketch) == 0
+
+    async def scenario():
+        warmer.start()
+        assert warmer._task is None
+
+    asyncio.run(scenario())
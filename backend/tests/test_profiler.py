@@ -0,0 +1,10 @@
+from app import profiler
+
+
+def test_is_admin_compares_any_header_value(monkeypatch):
+    monkeypatch.setattr(profiler, "ADMIN_TOKEN", "s3cret")
+    assert profiler.is_admin("s3cret")
+    assert not profiler.is_admin("s3creté")  # non-ASCII: rejected, not a TypeError
+    assert not profiler.is_admin(None)
+    monkeypatch.setattr(profiler, "ADMIN_TOKEN", "")
+    assert not profiler.is_admin("")
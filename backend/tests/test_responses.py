@@ -0,0 +1,41 @@
+import asyncio
+import copy
+import json
+
+from app import main
+from app.data_engine import price_cache
+from app.mock_data import search_mock_products
+from app.models import CountryCode
+from app.responses import compact_search_payload
+
+
+def search(query, compact):
+    response = asyncio.run(main.perform_search(query, "560001", CountryCode.IN, "compact-session", compact))
+    return response.body
+
+
+def test_compact_search_is_much_smaller_and_lossless():
+    price_cache.put("milk", "560001", search_mock_products("milk", "560001", CountryCode.IN), CountryCode.IN)
+    full_body = search("milk", False)
+    # The shape's goal: well over 40% smaller on the mock catalogue
+    assert len(search("milk", True)) < 0.6 * len(full_body)
+
+    full = json.loads(full_body)
+    compact = compact_search_payload(copy.deepcopy(full))
+    products = compact["products"]
+    for full_group, group in zip(full["product_groups"], compact["product_groups"]):
+        for product, pid in zip(full_group["products"], group["products"]):
+            entry = products[pid]
+            assert entry.get("title", group["canonical_title"]) == product["title"]
+            assert entry.get("image_url", group.get("image_url")) == product["image_url"]
+
+    reviews = compact["insights"]["reviews"]
+    rebuilt = []
+    for entry in copy.deepcopy(reviews["sentiments"]):
+        entry = {**copy.deepcopy(reviews["platforms"][entry["platform"]]), **entry}
+        for aspect in entry["aspect_scores"]:
+            aspect["icon"] = reviews["aspect_icons"][aspect["name"]]
+        entry["bot_detection"].update(reviews["alert_levels"][entry["bot_detection"]["alert_level"]])
+        rebuilt.append(entry)
+    originals = full["insights"]["reviews"]["sentiments"]
+    assert rebuilt and rebuilt == [e for i, e in enumerate(originals) if e not in originals[:i]]
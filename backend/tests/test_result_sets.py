@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from app import main
+from app.models import CountryCode
+from app.result_sets import MAX_LOCAL_VIEWS, ResultSet, result_sets
+
+
+@pytest.fixture
+def per_pincode_insights(monkeypatch):
+    """Insights that record which query and pincode they were computed for."""
+    calls = []
+
+    def fake_insights(products, query, pincode, symbol):
+        calls.append((query, pincode))
+        return {"for": [query, pincode]}
+
+    monkeypatch.setattr(main, "generate_product_insights", fake_insights)
+    monkeypatch.setattr(main, "get_related_products", lambda query, country: [])
+    return calls
+
+
+def empty_set() -> ResultSet:
+    return ResultSet(products=[], groups=[], sort_fields=[], expires_at=time.time() + 60)
+
+
+def test_local_views_are_per_pincode_within_a_zone(per_pincode_insights):
+    assert result_sets.key("milk", "560001", CountryCode.IN) == result_sets.key("milk", "560002", CountryCode.IN)
+    result_set = empty_set()
+
+    first = main.local_view(result_set, "milk", "560001", CountryCode.IN)
+    second = main.local_view(result_set, "milk", "560002", CountryCode.IN)
+    assert first.insights == {"for": ["milk", "560001"]}
+    assert second.insights == {"for": ["milk", "560002"]}
+
+    # Later pages for the same pincode reuse its view
+    assert main.local_view(result_set, "milk", "560001", CountryCode.IN) is first
+    assert per_pincode_insights == [("milk", "560001"), ("milk", "560002")]
+
+    payload = main.search_payload("milk", "560002", CountryCode.IN, result_set, second, limit=10,
+                                  include_pagination=True)
+    assert payload["insights"] == {"for": ["milk", "560002"]}
+    assert payload["postal_code"] == "560002"
+
+
+def test_local_views_are_bounded(per_pincode_insights):
+    result_set = empty_set()
+    for i in range(MAX_LOCAL_VIEWS + 5):
+        main.local_view(result_set, "milk", f"5600{i:02d}", CountryCode.IN)
+    assert len(result_set._views) == MAX_LOCAL_VIEWS
+    assert result_set.view("milk", "560000") is None
+
+
+def test_batch_items_in_one_zone_share_the_scrape_not_the_insights(monkeypatch, per_pincode_insights):
+    import asyncio
+    import json
+
+    from app.models import BatchSearchRequest
+
+    built = []
+
+    async def fake_build(query, postal_code, country, orchestrator):
+        built.append((query, postal_code))
+        result_set = empty_set()
+        result_sets.put(query, postal_code, country, result_set)
+        return result_set, None
+
+    monkeypatch.setattr(main, "build_result_set", fake_build)
+    request = BatchSearchRequest(items=[
+        {"query": "batch zone milk", "postal_code": "560001"},
+        {"query": "batch zone milk", "postal_code": "560002"},
+    ])
+
+    async def collect():
+        return [json.loads(line) async for line in main.stream_batch(request)]
+
+    lines = asyncio.run(collect())
+    items = {line["index"]: line for line in lines if "index" in line}
+    assert len(built) == 1
+    assert items[0]["insights"] == {"for": ["batch zone milk", "560001"]}
+    assert items[1]["insights"] == {"for": ["batch zone milk", "560002"]}
+    assert lines[-1]["summary"]["unique_searches"] == 1
+
+
+def test_batch_items_scrape_under_the_batch_flow(monkeypatch, per_pincode_insights):
+    from app import outbound, scrapers
+    from app.models import BatchSearchRequest
+
+    flows = []
+
+    async def record_flow(query, pincode):
+        flow = outbound._current_flow.get()
+        flows.append((flow.id, flow.name))
+        return []
+
+    for name in ("scrape_amazon_india", "scrape_flipkart", "scrape_blinkit", "scrape_zepto",
+                 "scrape_swiggy_instamart", "scrape_bigbasket", "scrape_jiomart", "scrape_meesho",
+                 "scrape_myntra", "scrape_ajio", "scrape_nykaa", "scrape_tata_cliq"):
+        monkeypatch.setattr(scrapers, name, record_flow)
+    request = BatchSearchRequest(items=[
+        {"query": "flow test milk", "postal_code": "110001"},
+        {"query": "flow test bread", "postal_code": "400001"},
+        {"query": "flow test eggs", "postal_code": "700001"},
+    ])
+
+    async def collect():
+        return [line async for line in main.stream_batch(request)]
+
+    asyncio.run(collect())
+    assert len(flows) == 3 * 12
+    assert {name for _, name in flows} == {"batch:3"}
+    assert len({flow_id for flow_id, _ in flows}) == 1
@@ -0,0 +1,231 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app import scrapers
+from app.data_engine import CircuitBreaker, price_cache
+from app.models import CountryCode, PlatformType
+from app.outbound import RetryPolicy, begin_flow
+from app.scrapers import get_fashion_fallback, report_scrape_failure, report_synthetic_results
+
+IN_SCRAPERS = (
+    "scrape_amazon_india", "scrape_flipkart", "scrape_blinkit", "scrape_zepto",
+    "scrape_swiggy_instamart", "scrape_bigbasket", "scrape_jiomart", "scrape_meesho",
+    "scrape_myntra", "scrape_ajio", "scrape_nykaa", "scrape_tata_cliq",
+)
+
+
+@pytest.fixture
+def offline_scrapers(monkeypatch):
+    """Every India scraper returns nothing unless a test overrides it."""
+
+    async def empty(query, pincode):
+        return []
+
+    for name in IN_SCRAPERS:
+        monkeypatch.setattr(scrapers, name, empty)
+    return monkeypatch
+
+
+def test_synthetic_scraper_results_are_served_but_not_cached(offline_scrapers):
+    async def live(query, pincode):
+        return get_fashion_fallback(query, PlatformType.AMAZON_IN)  # stands in for a live page
+
+    async def made_up(query, pincode):
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.NYKAA))
+
+    async def failed_then_made_up(query, pincode):
+        report_scrape_failure("blocked")
+        return report_synthetic_results(get_fashion_fallback(query, PlatformType.MYNTRA))
+
+    offline_scrapers.setattr(scrapers, "scrape_amazon_india", live)
+    offline_scrapers.setattr(scrapers, "scrape_nykaa", made_up)
+    offline_scrapers.setattr(scrapers, "scrape_myntra", failed_then_made_up)
+
+    def outcomes(platform):
+        return {outcome: scrapers.SCRAPE_OUTCOMES._values.get((platform, outcome), 0)
+                for outcome in ("ok", "fallback")}
+
+    before = {p: outcomes(p) for p in ("amazon_in", "nykaa", "myntra")}
+
+    async def scenario():
+        query, pincode = "synthetic test shirt", "560001"
+        results = await scrapers.scrape_all_platforms(query, pincode, CountryCode.IN)
+        platforms = {r.platform for r in results}
+        assert {PlatformType.AMAZON_IN, PlatformType.NYKAA, PlatformType.MYNTRA} <= platforms
+
+        cached, negative = await price_cache.fetch_platforms(
+            query, pincode, [PlatformType.AMAZON_IN, PlatformType.NYKAA, PlatformType.MYNTRA],
+        )
+        assert set(cached) == {PlatformType.AMAZON_IN}
+        assert negative == {PlatformType.MYNTRA: "blocked"}
+
+    asyncio.run(scenario())
+    # Scraper-made results are counted as fallbacks, never as ok scrapes
+    after = {p: outcomes(p) for p in before}
+    assert after["amazon_in"]["ok"] == before["amazon_in"]["ok"] + 1
+    for platform in ("nykaa", "myntra"):
+        assert after[platform] == {"ok": before[platform]["ok"], "fallback": before[platform]["fallback"] + 1}
+
+
+@pytest.mark.parametrize("timeout", [0.02, 0.15])  # before / after the hedge starts
+def test_hedged_scrape_cancels_its_tasks_when_cancelled(monkeypatch, timeout):
+    monkeypatch.setattr(scrapers.outbound_scheduler, "hedge_delay", lambda platform: 0.05)
+    monkeypatch.setattr(scrapers.outbound_scheduler, "try_hedge", lambda platform: True)
+    started, cancelled = [], []
+
+    async def hanging(query, pincode):
+        started.append(query)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                scrapers._hedged_scrape(hanging, PlatformType.BLINKIT, "milk", "560001"), timeout,
+            )
+        await asyncio.sleep(0)
+        assert started and len(cancelled) == len(started)
+
+    asyncio.run(scenario())
+
+
+# --- fetch_with_retry against a stub upstream ---
+
+class StubUpstream:
+    """httpx.MockTransport that answers with a scripted list of statuses (or exceptions)."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.requests = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        step = self.script[min(self.requests, len(self.script)) - 1]
+        if isinstance(step, Exception):
+            raise step
+        return httpx.Response(step, request=request)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture
+def retry_env(monkeypatch):
+    """Fresh circuit breaker, a fast 3-attempt policy, and recorded backoff sleeps."""
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=120)
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05)
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(delay, *args, **kwargs):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(scrapers, "circuit_breaker", breaker)
+    monkeypatch.setattr(scrapers.outbound_scheduler, "retry_policy", lambda platform: policy)
+    monkeypatch.setattr(scrapers.asyncio, "sleep", recording_sleep)
+    return breaker, policy, sleeps
+
+
+def fetch(upstream: StubUpstream, budget=None, deadline=None):
+    async def scenario():
+        flow = begin_flow("test")
+        if budget is not None:
+            flow.retry_budget = budget
+        if deadline is not None:
+            scrapers._scrape_deadline.set(time.time() + deadline)
+        async with upstream.client() as client:
+            return await scrapers.fetch_with_retry(client, "GET", "https://stub.test/s", PlatformType.BLINKIT)
+
+    return asyncio.run(scenario())
+
+
+def test_retry_recovers_from_transient_errors(retry_env):
+    breaker, policy, sleeps = retry_env
+    upstream = StubUpstream(503, httpx.ConnectError("reset"), 200)
+    assert fetch(upstream).status_code == 200
+    assert upstream.requests == 3
+    assert len(sleeps) == 2 and all(policy.base_delay <= d <= policy.max_delay for d in sleeps)
+    assert breaker.states()["blinkit"] == "closed" and breaker._failures["blinkit"] == 0
+
+
+def test_exhausted_retries_count_as_one_circuit_failure(retry_env):
+    breaker, _, _ = retry_env
+    upstream = StubUpstream(503)
+    assert fetch(upstream).status_code == 503
+    assert upstream.requests == 3
+    assert breaker._failures["blinkit"] == 1
+    assert breaker.can_proceed("blinkit")
+
+    with pytest.raises(httpx.ConnectError):
+        fetch(StubUpstream(httpx.ConnectError("refused")))
+    assert breaker._failures["blinkit"] == 2
+
+
+def test_non_retryable_errors_are_not_retried(retry_env):
+    breaker, _, sleeps = retry_env
+    upstream = StubUpstream(httpx.TooManyRedirects("loop"))
+    with pytest.raises(httpx.TooManyRedirects):
+        fetch(upstream)
+    assert upstream.requests == 1 and not sleeps
+    assert breaker._failures["blinkit"] == 1
+
+
+def test_retry_budget_is_shared_per_request(retry_env):
+    _, _, sleeps = retry_env
+    upstream = StubUpstream(503)
+    assert fetch(upstream, budget=1).status_code == 503
+    assert upstream.requests == 2 and len(sleeps) == 1
+
+
+def test_no_retry_past_the_scrape_deadline(retry_env):
+    breaker, _, sleeps = retry_env
+    upstream = StubUpstream(503, 200)
+    assert fetch(upstream, deadline=scrapers.RETRY_MIN_REMAINING / 2).status_code == 503
+    assert upstream.requests == 1 and not sleeps
+    assert breaker._failures["blinkit"] == 1
+
+
+@pytest.mark.parametrize("status", sorted(scrapers.BLOCKED_STATUS))
+def test_blocking_statuses_fail_the_circuit_without_retrying(retry_env, status):
+    breaker, _, _ = retry_env
+    breaker.record_failure("blinkit")
+    breaker.record_failure("blinkit")
+    upstream = StubUpstream(status)
+    assert fetch(upstream).status_code == status
+    assert upstream.requests == 1
+    assert breaker.states()["blinkit"] == "open"
+
+
+def test_open_circuit_fails_fast(retry_env):
+    breaker, _, _ = retry_env
+    for _ in range(3):
+        fetch(StubUpstream(503))
+    assert breaker.states()["blinkit"] == "open"
+    upstream = StubUpstream(200)
+    with pytest.raises(scrapers.CircuitOpenError):
+        fetch(upstream)
+    assert upstream.requests == 0
+
+
+def test_open_circuit_fallbacks_are_synthetic(offline_scrapers):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=120)
+    breaker.record_failure("meesho")
+    offline_scrapers.setattr(scrapers, "circuit_breaker", breaker)
+
+    async def offline_catalogue(query, pincode):
+        return get_fashion_fallback(query, PlatformType.MEESHO)  # no flag: the dispatcher knows
+
+    async def scenario():
+        results, reason, synthetic = await scrapers._run_scraper(
+            offline_catalogue, PlatformType.MEESHO, "open circuit shirt", "560001",
+        )
+        assert results and synthetic and reason == "blocked"
+
+    asyncio.run(scenario())
@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+
+from app.shared_store import MemoryStore, RedisError, RedisStore, create_store
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# --- MemoryStore ---
+
+def test_memory_store_roundtrip():
+    async def scenario():
+        store = MemoryStore()
+        assert await store.get("k") is None
+        assert await store.set("k", b"v")
+        assert await store.get("k") == b"v"
+        assert await store.mget(["k", "missing"]) == [b"v", None]
+        assert await store.delete("k")
+        assert not await store.delete("k")
+        assert await store.ping()
+
+    run(scenario())
+
+
+def test_memory_store_expiry(monkeypatch):
+    async def scenario():
+        store = MemoryStore()
+        now = [1000.0]
+        monkeypatch.setattr("app.shared_store.time.time", lambda: now[0])
+        await store.set("k", b"v", ttl=5)
+        now[0] += 4.9
+        assert await store.get("k") == b"v"
+        now[0] += 0.2
+        assert await store.get("k") is None
+
+    run(scenario())
+
+
+def test_memory_store_incrby_keeps_ttl(monkeypatch):
+    async def scenario():
+        store = MemoryStore()
+        now = [1000.0]
+        monkeypatch.setattr("app.shared_store.time.time", lambda: now[0])
+        assert await store.incrby("n") == 1
+        assert await store.incrby("n", 4) == 5
+        await store.set("t", b"10", ttl=5)
+        assert await store.incrby("t") == 11
+        now[0] += 6
+        assert await store.get("t") is None
+
+    run(scenario())
+
+
+# --- RESP ---
+
+def _reader_with(data: bytes) -> RedisStore:
+    store = RedisStore()
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    store._reader = reader
+    return store
+
+
+def test_resp_encode():
+    assert RedisStore._encode("SET", "k", b"v\r\n", 5) == (
+        b"*4\r\n$3\r\nSET\r\n$1\r\nk\r\n$3\r\nv\r\n\r\n$1\r\n5\r\n"
+    )
+
+
+def test_resp_replies():
+    async def scenario():
+        store = _reader_with(
+            b"+OK\r\n:42\r\n$5\r\nhe\r\nl\r\n$-1\r\n*3\r\n$1\r\na\r\n$-1\r\n*1\r\n:1\r\n*-1\r\n"
+        )
+        assert await store._read_reply() == "OK"
+        assert await store._read_reply() == 42
+        assert await store._read_reply() == b"he\r\nl"  # binary-safe bulk string
+        assert await store._read_reply() is None
+        assert await store._read_reply() == [b"a", None, [1]]
+        assert await store._read_reply() is None
+
+    run(scenario())
+
+
+def test_resp_error_and_eof():
+    async def scenario():
+        store = _reader_with(b"-ERR wrong type\r\n")
+        with pytest.raises(RedisError, match="wrong type"):
+            await store._read_reply()
+        with pytest.raises(ConnectionError):
+            await store._read_reply()
+
+    run(scenario())
+
+
+# --- Connection handling against a stub server ---
+
+async def _stub_server(delays):
+    """Answers GET <key> with value-of-<key>, after delays.get(key, 0) seconds."""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                if args[0] == "GET":
+                    await asyncio.sleep(delays.get(args[1], 0))
+                    value = f"value-of-{args[1]}".encode()
+                    writer.write(b"$%d\r\n%s\r\n" % (len(value), value))
+                else:
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_cancelled_command_does_not_leak_its_reply():
+    async def scenario():
+        server, port = await _stub_server({"A": 0.3})
+        async with server:
+            store = RedisStore(port=port, timeout=2.0)
+            try:
+                slow = asyncio.ensure_future(store.get("A"))
+                await asyncio.sleep(0.05)
+                slow.cancel()
+                try:
+                    await slow
+                except asyncio.CancelledError:
+                    pass
+                await asyncio.sleep(0.4)  # the reply to A has arrived by now
+                assert await store.get("B") == b"value-of-B"
+            finally:
+                store._reset()  # the server waits for its connections on close
+
+    run(scenario())
+
+
+def test_timed_out_command_does_not_leak_its_reply():
+    async def scenario():
+        server, port = await _stub_server({"A": 0.3})
+        async with server:
+            store = RedisStore(port=port, timeout=0.1, retry_after=0.2)
+            try:
+                assert await store.get("A") is None
+                await asyncio.sleep(0.4)
+                assert await store.get("B") == b"value-of-B"
+            finally:
+                store._reset()
+
+    run(scenario())
+
+
+def test_unreachable_store_degrades_to_none():
+    async def scenario():
+        server, port = await _stub_server({})
+        server.close()
+        await server.wait_closed()
+        store = RedisStore(port=port, timeout=0.2)
+        assert await store.get("k") is None
+        assert not await store.set("k", b"v")
+
+    run(scenario())
+
+
+def test_slow_store_costs_one_timeout_per_burst_then_backs_off():
+    async def scenario():
+        server, port = await _stub_server({"slow": 0.5})
+        async with server:
+            store = RedisStore(port=port, timeout=0.1, retry_after=0.3)
+            try:
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                replies = await asyncio.gather(*(store.get("slow") for _ in range(10)))
+                assert replies == [None] * 10
+                assert loop.time() - started < 0.3  # not 10 x timeout
+                # Timed out together, or saw the backoff once the lock came free
+                assert store._errors + store._skipped == 10
+
+                # Backing off: answered locally, nothing is sent
+                assert await store.get("fast") is None
+                assert store._writer is None and store._skipped >= 1
+
+                await asyncio.sleep(0.35)
+                assert await store.get("fast") == b"value-of-fast"
+            finally:
+                store._reset()
+
+    run(scenario())
+
+
+def test_create_store_schemes():
+    assert create_store(None) is None
+    assert isinstance(create_store("memory://"), MemoryStore)
+    plain = create_store("redis://:secret@cache:6380/2")
+    assert (plain._host, plain._port, plain._db, plain._password, plain._tls) == ("cache", 6380, 2, "secret", False)
+    assert create_store("rediss://cache/0")._tls
+    with pytest.raises(ValueError):
+        create_store("memcached://cache")
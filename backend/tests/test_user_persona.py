@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+from app import user_persona
+from app.shared_store import MemoryStore
+from app.user_persona import SessionStore, UserSession, load_session
+
+
+def test_load_session_prefers_newer_l2_copy(monkeypatch):
+    async def scenario():
+        store = MemoryStore()
+        sessions = SessionStore()
+        monkeypatch.setattr(user_persona, "shared_store", store)
+        monkeypatch.setattr(user_persona, "session_store", sessions)
+
+        stale = sessions.touch("s1")
+        stale.searches.append(("milk", 100.0, "general"))
+        stale.last_active = 100.0
+
+        # Another worker served the same user since
+        fresh = UserSession("s1")
+        fresh.searches.extend([("milk", 100.0, "general"), ("bread", 200.0, "general")])
+        fresh.last_active = 200.0
+        await store.set("px:session:s1", json.dumps(fresh.to_dict()).encode())
+
+        await load_session("s1")
+        assert [q for q, _, _ in sessions.get("s1").searches] == ["milk", "bread"]
+
+        # Our own newer (not yet written back) copy is kept
+        sessions.get("s1").last_active = 300.0
+        await load_session("s1")
+        assert sessions.get("s1").last_active == 300.0
+
+    asyncio.run(scenario())